@@ -0,0 +1,192 @@
+"""
+Async UTXO Harvester
+Collects real UTXOs with many requests in flight, bounded per host by a semaphore and a token bucket
+"""
+
+import asyncio
+import json
+import threading
+from urllib.parse import urlsplit
+
+import aiohttp
+
+from rate_limit import TokenBucket
+from utxo_batch import UtxoBatch
+
+
+# Transactions per page of mempool.space's /block/{hash}/txs/{start_index}
+BLOCK_TXS_PAGE_SIZE = 25
+
+
+class HarvestStats:
+    """Requests issued against UTXOs collected for one harvest"""
+    
+    def __init__(self):
+        self.requests = 0
+        self.utxos = 0
+    
+    def requests_per_utxo(self):
+        return self.requests / self.utxos if self.utxos else float(self.requests)
+    
+    def as_dict(self):
+        return {
+            'requests': self.requests,
+            'utxos': self.utxos,
+            'requests_per_utxo': self.requests_per_utxo()
+        }
+    
+    def __str__(self):
+        return f"{self.requests} requests for {self.utxos} UTXOs ({self.requests_per_utxo():.3f} requests/UTXO)"
+
+
+def block_page_starts(block, max_txs=None):
+    """Start indexes of the /txs pages needed to cover a block (or its first max_txs transactions)"""
+    tx_count = block.get('tx_count', BLOCK_TXS_PAGE_SIZE)
+    if max_txs is not None:
+        tx_count = min(tx_count, max_txs)
+    return list(range(0, max(tx_count, 1), BLOCK_TXS_PAGE_SIZE))
+
+
+def block_page_url(api_base, block_hash, start_index):
+    """First page is /block/{hash}/txs, later pages add the start index"""
+    if start_index == 0:
+        return f"{api_base}/block/{block_hash}/txs"
+    return f"{api_base}/block/{block_hash}/txs/{start_index}"
+
+
+class AsyncUtxoHarvester:
+    def __init__(self, brain, max_in_flight_per_host=4, requests_per_second=8.0, timeout=15,
+                 use_block_payloads=True):
+        self.brain = brain
+        self.max_in_flight_per_host = max_in_flight_per_host
+        self.requests_per_second = requests_per_second
+        self.timeout = timeout
+        
+        # Block tx pages already carry full vout data, so skip the per-tx requests
+        self.use_block_payloads = use_block_payloads
+        self.stats = HarvestStats()
+        
+        self._semaphores = {}
+        self._buckets = {}
+    
+    def _limits_for(self, url):
+        """Per-host concurrency gate and rate limiter, created on first use"""
+        host = urlsplit(url).netloc
+        if host not in self._semaphores:
+            self._semaphores[host] = asyncio.Semaphore(self.max_in_flight_per_host)
+            self._buckets[host] = TokenBucket(self.requests_per_second)
+        return self._semaphores[host], self._buckets[host]
+    
+    async def fetch_json(self, session, url):
+        """GET a JSON document (response cache first), returning None on any failure"""
+        semaphore, bucket = self._limits_for(url)
+        
+        # SQLite calls would block every request in flight, so the cache is consulted off the loop
+        cache = getattr(self.brain.session, 'cache', None)
+        if cache is not None:
+            cached = await asyncio.to_thread(cache.lookup, url)
+            if cached is not None:
+                return json.loads(cached[1])
+        
+        async with semaphore:
+            await bucket.acquire_async()
+            self.stats.requests += 1
+            try:
+                async with session.get(url) as response:
+                    response.raise_for_status()
+                    body = await response.read()
+                    if cache is not None:
+                        await asyncio.to_thread(cache.store, url, None, response.status, body)
+                    return json.loads(body)
+            except (aiohttp.ClientError, asyncio.TimeoutError, ValueError) as error:
+                print(f"🤔 {url} gave me trouble: {error}")
+                return None
+    
+    async def fetch_block_txids(self, session, block, tx_limit):
+        """Transaction ids from one block, capped at tx_limit"""
+        transactions = await self.fetch_json(session, f"{self.brain.my_apis['mempool']}/block/{block['id']}/txs")
+        return [tx['txid'] for tx in (transactions or [])[:tx_limit]]
+    
+    async def harvest(self, target_utxos=2500, block_count=25, tx_per_block=12):
+        """Collect UTXOs into a UtxoBatch in block order, stopping once the target is met"""
+        self.stats = HarvestStats()
+        collected = UtxoBatch()
+        window = self.max_in_flight_per_host * 2
+        
+        connector = aiohttp.TCPConnector(limit_per_host=self.max_in_flight_per_host, ttl_dns_cache=300)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout,
+                                         headers=dict(self.brain.session.headers)) as session:
+            blocks = await self.fetch_json(session, f"{self.brain.my_apis['mempool']}/blocks")
+            blocks = (blocks or [])[:block_count]
+            print(f"📦 Got {len(blocks)} fresh blocks from Bitcoin network")
+            
+            if self.use_block_payloads:
+                await self._harvest_block_payloads(session, blocks, target_utxos, collected, tx_per_block)
+                self.stats.utxos = len(collected)
+                return collected
+            
+            # Pull tx lists a few blocks at a time so we stop early once the target is met
+            for group_start in range(0, len(blocks), self.max_in_flight_per_host):
+                if len(collected) >= target_utxos:
+                    break
+                
+                group = blocks[group_start:group_start + self.max_in_flight_per_host]
+                txid_lists = await asyncio.gather(*[
+                    self.fetch_block_txids(session, block, tx_per_block) for block in group
+                ])
+                pending = [(block, txid) for block, txids in zip(group, txid_lists) for txid in txids]
+                
+                for chunk_start in range(0, len(pending), window):
+                    if len(collected) >= target_utxos:
+                        break
+                    
+                    chunk = pending[chunk_start:chunk_start + window]
+                    transactions = await asyncio.gather(*[
+                        self.fetch_json(session, f"{self.brain.my_apis['explorer']}/tx/{txid}") for _, txid in chunk
+                    ])
+                    
+                    for (block, _), tx_details in zip(chunk, transactions):
+                        if len(collected) >= target_utxos:
+                            break
+                        if tx_details:
+                            self.brain.discover_utxos_into(collected, tx_details, block['timestamp'])
+        
+        self.stats.utxos = len(collected)
+        return collected
+    
+    async def _harvest_block_payloads(self, session, blocks, target_utxos, collected, tx_per_block):
+        """Extract UTXOs straight from paged /block/{hash}/txs payloads, at most tx_per_block per block
+        so the sample spreads over every block's creation prices instead of the newest one or two"""
+        api_base = self.brain.my_apis['mempool']
+        pages = [(block, start) for block in blocks for start in block_page_starts(block, tx_per_block)]
+        window = self.max_in_flight_per_host
+        
+        for chunk_start in range(0, len(pages), window):
+            if len(collected) >= target_utxos:
+                break
+            
+            chunk = pages[chunk_start:chunk_start + window]
+            payloads = await asyncio.gather(*[
+                self.fetch_json(session, block_page_url(api_base, block['id'], start)) for block, start in chunk
+            ])
+            
+            for (block, start), transactions in zip(chunk, payloads):
+                for tx_details in (transactions or [])[:tx_per_block - start]:
+                    if len(collected) >= target_utxos:
+                        return
+                    self.brain.discover_utxos_into(collected, tx_details, block['timestamp'])
+    
+    def run(self, target_utxos=2500, **options):
+        """Blocking entry point, safe to call from threads that already run an event loop"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.harvest(target_utxos, **options))
+        
+        result = {}
+        worker = threading.Thread(target=lambda: result.update(utxos=asyncio.run(self.harvest(target_utxos, **options))))
+        worker.start()
+        worker.join()
+        return result.get('utxos', UtxoBatch())
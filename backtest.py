@@ -0,0 +1,285 @@
+"""
+MVRV Signal Backtests
+Classifies a whole hourly history with np.digitize, trades the zone actions as target positions with
+vectorized returns, and sweeps threshold grids across a process pool with results cached per parameter set
+"""
+
+import hashlib
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from my_mvrv_engine import MY_SIGNALS, MY_ZONES, NEUTRAL_ZONE, SIGNAL_EDGES, classify_mvrv
+
+YEAR = 365 * 24 * 3600
+DEFAULT_FEE = 0.001              # Charged on the fraction of the portfolio traded at each rebalance
+DEFAULT_CHUNK_SIZE = 500         # Parameter sets per process pool task
+
+# Share of the portfolio held in BTC for each zone action; None keeps whatever is held (HOLD)
+ACTION_EXPOSURE = {
+    'STRONG BUY': 1.0,
+    'ACCUMULATE': 0.75,
+    'HOLD': None,
+    'REDUCE POSITION': 0.5,
+    'SELL': 0.0,
+    'STRONG SELL': 0.0,
+}
+
+# Candidate thresholds swept by default: 10 per edge around my own, 10,000 combinations
+DEFAULT_GRID = {
+    'normal': [round(0.85 + 0.05 * i, 2) for i in range(10)],
+    'caution': [round(1.8 + 0.1 * i, 1) for i in range(10)],
+    'greed': [round(2.8 + 0.1 * i, 1) for i in range(10)],
+    'extreme_greed': [round(3.8 + 0.1 * i, 1) for i in range(10)],
+}
+
+
+def zone_exposures(exposures=None):
+    """Target exposure per MY_ZONES index, NaN where the action holds"""
+    exposures = dict(ACTION_EXPOSURE, **(exposures or {}))
+    return np.array([np.nan if exposures[zone['action']] is None else exposures[zone['action']]
+                     for zone in MY_ZONES])
+
+
+def hold_forward(targets, initial=0.0):
+    """Positions from targets: NaN (hold) carries the last target forward, starting from initial"""
+    held = np.isnan(targets)
+    last = np.where(held, 0, np.arange(len(targets)))
+    np.maximum.accumulate(last, out=last)
+    positions = targets[last]
+    positions[np.isnan(positions)] = initial     # Holds before the first real target
+    return positions
+
+
+def metrics(total_log, sum_squares, steps, max_log_drawdown, trades, exposure, periods_per_year):
+    """Performance summary from log-return aggregates"""
+    mean = total_log / steps
+    std = np.sqrt(max(sum_squares / steps - mean * mean, 0.0))
+    return {
+        'total_return': float(np.expm1(total_log)),
+        'annual_return': float(np.expm1(total_log * periods_per_year / steps)),
+        'max_drawdown': float(-np.expm1(-max_log_drawdown)),
+        'sharpe': float(mean / std * np.sqrt(periods_per_year)) if std > 0 else 0.0,
+        'trades': int(trades),
+        'exposure': float(exposure)
+    }
+
+
+def simulate(values, prices, signals=MY_SIGNALS, exposures=None, fee=DEFAULT_FEE, periods_per_year=24 * 365):
+    """Trade the zone of each value at the next price step; the reference, one array pass per quantity"""
+    values, prices = np.asarray(values, dtype=np.float64), np.asarray(prices, dtype=np.float64)
+    positions = hold_forward(zone_exposures(exposures)[classify_mvrv(values[:-1], signals)])
+    returns = prices[1:] / prices[:-1] - 1
+    turnover = np.abs(np.diff(positions, prepend=0.0))
+    
+    steps = np.log1p(positions * returns) + np.log1p(-fee * turnover)
+    curve = np.concatenate(([0.0], np.cumsum(steps)))
+    drawdown = np.maximum.accumulate(curve) - curve
+    return metrics(steps.sum(), (steps * steps).sum(), len(steps), drawdown.max(),
+                   np.count_nonzero(turnover), positions.mean(), periods_per_year)
+
+
+class RunTable:
+    """A history cut into runs over which no threshold drawn from `levels` can change the zone, with
+    per-run log-return aggregates for every exposure, so one parameter set costs O(runs) instead of O(hours)"""
+    
+    def __init__(self, values, prices, levels, exposures=None, fee=DEFAULT_FEE, periods_per_year=24 * 365):
+        self.levels = np.unique(np.asarray(levels, dtype=np.float64))
+        self.lower = np.concatenate(([-np.inf], self.levels, [np.nan]))  # Lowest value of each band; NaN last
+        self.targets = zone_exposures(exposures)
+        self.exposures = np.unique(np.append(self.targets[~np.isnan(self.targets)], 0.0))
+        self.zone_columns = np.array([-1 if np.isnan(target) else np.searchsorted(self.exposures, target)
+                                      for target in self.targets])          # Exposure column per zone, -1 holds
+        self.fee = fee
+        self.periods_per_year = periods_per_year
+        
+        values, prices = np.asarray(values, dtype=np.float64), np.asarray(prices, dtype=np.float64)
+        bands = np.digitize(values[:-1], self.levels)
+        bands[np.isnan(values[:-1])] = len(self.lower) - 1         # Missing ratios get a band of their own
+        returns = prices[1:] / prices[:-1] - 1
+        self.steps = len(returns)
+        
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(bands)) + 1))
+        self.lengths = np.diff(np.append(starts, self.steps))
+        self.bands = bands[starts]
+        self.run_index = np.arange(len(starts))
+        run_ids = np.repeat(self.run_index, self.lengths)
+        
+        # Aggregates of the per-step log returns x = log1p(e * r) per run, for each exposure e in turn:
+        # entry [column * runs + run], so a parameter set picks its values with one flat take each
+        runs = len(starts)
+        self.total, self.first, self.squares = np.empty(len(self.exposures) * runs), np.empty(len(self.exposures) * runs), np.empty(len(self.exposures) * runs)
+        self.low, self.high, self.inner = np.empty(len(self.exposures) * runs), np.empty(len(self.exposures) * runs), np.empty(len(self.exposures) * runs)
+        for column, exposure in enumerate(self.exposures):
+            x = np.log1p(exposure * returns)
+            curve = np.cumsum(x)
+            within = curve - np.repeat(np.concatenate(([0.0], curve[starts[1:] - 1])), self.lengths)
+            
+            # Running peak inside each run: offset every run above the previous one, then one accumulate
+            shift = run_ids * (np.ptp(within) + 1.0)
+            peaks = np.maximum.accumulate(within + shift) - shift
+            
+            block = slice(column * runs, (column + 1) * runs)
+            self.total[block] = np.add.reduceat(x, starts)
+            self.first[block] = x[starts]
+            self.squares[block] = np.add.reduceat(x * x, starts)
+            self.low[block] = np.minimum.reduceat(within, starts)
+            self.high[block] = np.maximum.reduceat(within, starts)
+            self.inner[block] = np.maximum.reduceat(peaks - within, starts)
+    
+    @property
+    def runs(self):
+        return len(self.bands)
+    
+    def evaluate(self, signals):
+        """Same metrics as simulate() for thresholds that are all in `levels`"""
+        edges = np.array([signals[name] for name in SIGNAL_EDGES])
+        zones = np.searchsorted(edges, self.lower, side='right')
+        zones[-1] = NEUTRAL_ZONE
+        columns = self.zone_columns[zones][self.bands]
+        
+        # hold_forward on exposure columns instead of positions: one gather picks every aggregate
+        last = np.where(columns < 0, 0, self.run_index)
+        np.maximum.accumulate(last, out=last)
+        columns = columns[last]
+        columns[columns < 0] = np.searchsorted(self.exposures, 0.0)
+        positions = self.exposures[columns]
+        picks = columns * len(columns) + self.run_index
+        
+        turnover = np.abs(np.diff(positions, prepend=0.0))
+        fees = np.log1p(-self.fee * turnover)
+        totals = self.total.take(picks) + fees
+        starts = np.cumsum(totals) - totals + fees                # Curve entering each run, after its fee
+        
+        low = starts + self.low.take(picks)
+        peaks = np.maximum.accumulate(np.concatenate(([0.0], starts + self.high.take(picks))))[:-1]
+        drawdown = max((peaks - low).max(), self.inner.take(picks).max())
+        squares = (self.squares.take(picks) + fees * (2 * self.first.take(picks) + fees)).sum()
+        
+        return metrics(totals.sum(), squares, self.steps, drawdown, np.count_nonzero(turnover),
+                       (positions * self.lengths).sum() / self.steps, self.periods_per_year)
+
+
+def threshold_grid(grid, base=MY_SIGNALS):
+    """Every combination of the grid's candidate thresholds (others fixed at base) whose edges increase"""
+    names = list(grid)
+    for combo in itertools.product(*(sorted(grid[name]) for name in names)):
+        signals = dict(base, **dict(zip(names, combo)))
+        edges = [signals[name] for name in SIGNAL_EDGES]
+        if all(a < b for a, b in zip(edges, edges[1:])):
+            yield signals
+
+
+def params_key(signals, exposures, fee):
+    return json.dumps({'signals': {name: signals[name] for name in SIGNAL_EDGES},
+                       'exposures': dict(ACTION_EXPOSURE, **(exposures or {})), 'fee': fee}, sort_keys=True)
+
+
+_worker_table = None
+
+
+def _init_worker(table):
+    global _worker_table
+    _worker_table = table
+
+
+def _evaluate_chunk(chunk):
+    return [_worker_table.evaluate(signals) for signals in chunk]
+
+
+class Backtester:
+    """Backtests of my zone signals over my hourly MVRV history, cached per parameter set"""
+    
+    def __init__(self, my_db=None, start=None, end=None, exposures=None, fee=DEFAULT_FEE):
+        if my_db is None:
+            from my_database import MyPersonalDatabase
+            my_db = MyPersonalDatabase()
+        
+        self.my_db = my_db
+        self.connections = my_db.connections
+        self.exposures = exposures
+        self.fee = fee
+        
+        # Market cap moves with the price (supply grows ~1%/year), and it sits in every analysis row
+        series = my_db.get_my_mvrv_series('hourly', start, end)
+        self.epochs, self.values, self.prices = series['epoch'], series['ratio'], series['market_cap']
+        if len(self.epochs) < 2:
+            raise ValueError("Backtests need at least two hourly MVRV rows")
+        self.periods_per_year = YEAR / float(np.median(np.diff(self.epochs)))
+        
+        fingerprint = hashlib.sha256()
+        for array in (self.epochs, self.values, self.prices):
+            fingerprint.update(array.tobytes())
+        self.data_key = fingerprint.hexdigest()[:16]
+        
+        self.setup_tables()
+    
+    def setup_tables(self):
+        with self.connections.transaction() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS backtest_results (
+                    data_key TEXT NOT NULL,
+                    params_key TEXT NOT NULL,
+                    metrics TEXT NOT NULL,
+                    created_at TEXT NOT NULL,
+                    PRIMARY KEY (data_key, params_key)
+                )
+            """)
+    
+    def cached(self, keys):
+        """{params_key: metrics} of the keys already computed for this history"""
+        rows = self.connections.connection().execute(
+            "SELECT params_key, metrics FROM backtest_results WHERE data_key = ?", (self.data_key,)
+        ).fetchall()
+        wanted = set(keys)
+        return {key: json.loads(metrics) for key, metrics in rows if key in wanted}
+    
+    def remember(self, results):
+        created_at = datetime.utcnow().isoformat()
+        self.connections.bulk_write("""
+            INSERT OR REPLACE INTO backtest_results (data_key, params_key, metrics, created_at) VALUES (?, ?, ?, ?)
+        """, ((self.data_key, key, json.dumps(metrics), created_at) for key, metrics in results.items()))
+    
+    def run(self, signals=None):
+        """Metrics of one threshold set (my current ones by default)"""
+        signals = dict(MY_SIGNALS, **(signals or {}))
+        key = params_key(signals, self.exposures, self.fee)
+        result = self.cached([key]).get(key)
+        if result is None:
+            result = simulate(self.values, self.prices, signals, self.exposures, self.fee, self.periods_per_year)
+            self.remember({key: result})
+        return dict(result, signals=signals)
+    
+    def sweep(self, grid, processes=None, sort_by='sharpe', top=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Backtest every valid combination of grid ({threshold: candidates}); best sort_by first"""
+        combos = list(threshold_grid(grid))
+        keys = [params_key(signals, self.exposures, self.fee) for signals in combos]
+        results = self.cached(keys)
+        
+        missing = [(key, signals) for key, signals in zip(keys, combos) if key not in results]
+        if missing:
+            levels = {signals[name] for _, signals in missing for name in SIGNAL_EDGES}
+            table = RunTable(self.values, self.prices, sorted(levels), self.exposures, self.fee,
+                             self.periods_per_year)
+            chunks = [[signals for _, signals in missing[i:i + chunk_size]]
+                      for i in range(0, len(missing), chunk_size)]
+            
+            processes = processes or os.cpu_count() or 1
+            if processes == 1 or len(chunks) == 1:
+                computed = [table.evaluate(signals) for chunk in chunks for signals in chunk]
+            else:
+                with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                         initargs=(table,)) as pool:
+                    computed = [metrics for chunk in pool.map(_evaluate_chunk, chunks) for metrics in chunk]
+            
+            fresh = {key: metrics for (key, _), metrics in zip(missing, computed)}
+            self.remember(fresh)
+            results.update(fresh)
+        
+        ranked = sorted((dict(results[key], signals=signals) for key, signals in zip(keys, combos)),
+                        key=lambda result: result[sort_by], reverse=True)
+        return ranked[:top] if top else ranked
@@ -0,0 +1,476 @@
+#!/usr/bin/env python3
+"""
+Performance Benchmarks
+Measure the hot paths of the MVRV system against their naive equivalents
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from database import MVRVDatabase
+from db_connection import close_all_connections
+from my_database import MyPersonalDatabase
+
+
+def report(label, operations, seconds):
+    """Print one benchmark line in ops/sec"""
+    rate = operations / seconds if seconds > 0 else float('inf')
+    print(f"   {label:<38} {operations:>9,} ops in {seconds:7.3f}s  →  {rate:>12,.0f} ops/sec")
+    return rate
+
+
+def benchmark_database(operations=2000):
+    """Connect-per-call SQLite access vs the pooled connection manager"""
+    print(f"🗄️  Database benchmark ({operations:,} operations per path)")
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        naive_path = os.path.join(workdir, "naive.db")
+        pooled_path = os.path.join(workdir, "pooled.db")
+        
+        # Same schema for both paths, created once
+        MVRVDatabase(naive_path)
+        close_all_connections()
+        sqlite3.connect(naive_path).execute("PRAGMA journal_mode = DELETE").close()
+        pooled = MVRVDatabase(pooled_path)
+        
+        timestamps = [(datetime(2024, 1, 1) + timedelta(seconds=i)).isoformat() for i in range(operations)]
+        
+        # Insert path - the original connect / execute / commit / close pattern
+        start = time.perf_counter()
+        for i, ts in enumerate(timestamps):
+            conn = sqlite3.connect(naive_path)
+            conn.execute("INSERT OR REPLACE INTO historical_prices (timestamp, price_usd) VALUES (?, ?)", (ts, 40000.0 + i))
+            conn.commit()
+            conn.close()
+        naive_insert = report("insert (connect per call)", operations, time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        for i, ts in enumerate(timestamps):
+            pooled.insert_historical_price(ts, 40000.0 + i)
+        pooled_insert = report("insert (pooled + WAL)", operations, time.perf_counter() - start)
+        
+        # Lookup path
+        start = time.perf_counter()
+        for ts in timestamps:
+            conn = sqlite3.connect(naive_path)
+            conn.execute("""
+                SELECT price_usd FROM historical_prices
+                WHERE timestamp <= ? ORDER BY timestamp DESC LIMIT 1
+            """, (ts,)).fetchone()
+            conn.close()
+        naive_lookup = report("lookup (connect per call)", operations, time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        for ts in timestamps:
+            pooled.get_price_at_timestamp(ts)
+        pooled_lookup = report("lookup (pooled)", operations, time.perf_counter() - start)
+        
+        close_all_connections()
+    
+    print(f"   Speedup: insert {pooled_insert / naive_insert:.1f}x, lookup {pooled_lookup / naive_lookup:.1f}x")
+
+
+def benchmark_bulk_prices(rows=365 * 288):
+    """Per-row historical price inserts vs the single-transaction bulk path"""
+    print(f"📈 Bulk price ingestion benchmark ({rows:,} rows, 5-minute granularity for a year)")
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        per_row = MVRVDatabase(os.path.join(workdir, "per_row.db"))
+        bulk = MVRVDatabase(os.path.join(workdir, "bulk.db"))
+        
+        price_rows = [((datetime(2024, 1, 1) + timedelta(minutes=5 * i)).isoformat(), 40000.0 + i % 1000)
+                      for i in range(rows)]
+        sample = price_rows[:5000]
+        
+        start = time.perf_counter()
+        for timestamp, price in sample:
+            per_row.insert_historical_price(timestamp, price)
+        per_row_rate = report("insert_historical_price (first 5k)", len(sample), time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        bulk.insert_historical_prices(iter(price_rows))
+        bulk_rate = report("insert_historical_prices", rows, time.perf_counter() - start)
+        
+        close_all_connections()
+    
+    print(f"   Speedup: {bulk_rate / per_row_rate:.1f}x")
+
+
+def benchmark_utxo_discoveries(rows=1_000_000):
+    """Row-by-row execute() vs the staged bulk upsert in store_my_utxo_discoveries"""
+    print(f"🗄️ UTXO discovery ingestion benchmark ({rows:,} rows)")
+    
+    # Build the rows up front so only the database work is timed
+    start = datetime(2020, 1, 1)
+    discovery_rows = [
+        (f"{i * 2654435761 % 2**64:064x}", 0.001 * (i % 5000 + 1), (start + timedelta(seconds=i * 37)).isoformat(),
+         12.5 * (i % 9000 + 1), 0.5 + (i % 5) / 10)
+        for i in range(rows)
+    ]
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        per_row = MyPersonalDatabase(os.path.join(workdir, "per_row.db"))
+        bulk = MyPersonalDatabase(os.path.join(workdir, "bulk.db"))
+        
+        # The previous implementation: one format check and one execute() per row
+        t0 = time.perf_counter()
+        with per_row.connections.transaction() as cursor:
+            for utxo_data in discovery_rows:
+                if len(utxo_data) >= 5:
+                    txid, btc_val, discovered_time, usd_val, confidence = utxo_data[:5]
+                    cursor.execute("""
+                        INSERT OR REPLACE INTO my_utxo_discoveries
+                        (transaction_id, btc_value, discovered_at, usd_value_when_created,
+                         confidence_score, my_quality_rating)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                    """, (txid, btc_val, discovered_time, usd_val, confidence, min(int(confidence * 10), 10)))
+        loop_rate = report("row-by-row execute", rows, time.perf_counter() - t0)
+        
+        t0 = time.perf_counter()
+        bulk.store_my_utxo_discoveries(iter(discovery_rows))
+        bulk_rate = report("store_my_utxo_discoveries (staged)", rows, time.perf_counter() - t0)
+        
+        close_all_connections()
+    
+    print(f"   Speedup: {bulk_rate / loop_rate:.1f}x")
+
+
+def benchmark_realized_value(sizes=(100_000, 1_000_000, 10_000_000), loop_limit=100_000):
+    """Per-UTXO Python loop vs the vectorized realized value pass in MyMVRVEngine"""
+    from my_mvrv_engine import MyMVRVEngine
+    
+    print("🧮 Realized value benchmark (10 years of daily prices)")
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        my_db = MyPersonalDatabase(os.path.join(workdir, "engine.db"))
+        start = datetime(2015, 1, 1)
+        my_db.remember_historical_prices(
+            ((start + timedelta(days=d)).isoformat(), 300.0 + 20 * d) for d in range(3650)
+        )
+        engine = MyMVRVEngine(my_db=my_db)
+        rng = np.random.default_rng(42)
+        
+        for size in sizes:
+            btc_amounts = rng.uniform(0.0001, 5, size)
+            creation_times = start.timestamp() + rng.uniform(0, 3650 * 86400, size)
+            confidences = rng.choice([0.6, 0.7, 0.8, 0.9], size)
+            
+            if size <= loop_limit:
+                utxos = [{'tx_hash': f"tx_{i}", 'btc_amount': btc_amounts[i], 'creation_time': creation_times[i],
+                          'my_confidence': confidences[i]} for i in range(size)]
+                
+                t0 = time.perf_counter()
+                loop_value, _, _ = engine.weigh_utxo_sample(utxos)
+                loop_rate = report(f"loop ({size:,} UTXOs)", size, time.perf_counter() - t0)
+                
+                t0 = time.perf_counter()
+                batch_value, _, _ = engine.weigh_utxo_sample_batched(utxos)
+                batch_rate = report(f"batched from dicts ({size:,} UTXOs)", size, time.perf_counter() - t0)
+                print(f"   Speedup: {batch_rate / loop_rate:.1f}x (values agree: {np.isclose(loop_value, batch_value)})")
+                del utxos
+            
+            t0 = time.perf_counter()
+            engine.weigh_utxo_columns(btc_amounts, creation_times, confidences)
+            report(f"batched columns ({size:,} UTXOs)", size, time.perf_counter() - t0)
+        
+        close_all_connections()
+
+
+def benchmark_utxo_batch(size=500_000):
+    """Memory and insight cost of per-UTXO dicts vs the columnar UtxoBatch"""
+    import tracemalloc
+    from btc_brain import BitcoinBrain
+    from utxo_batch import UtxoBatch
+    
+    print(f"📦 UTXO storage benchmark ({size:,} UTXOs, 2.5 outputs per transaction)")
+    
+    brain = BitcoinBrain()
+    rng = np.random.default_rng(42)
+    values = rng.integers(1_000, 500_000_000, size)
+    scripts = ['v0_p2wpkh', 'p2pkh', 'p2sh', 'v1_p2tr']
+    transactions = [{
+        'txid': f"{t:064x}",
+        'vout': [{'value': int(values[o]), 'scriptpubkey_type': scripts[o % 4],
+                  'scriptpubkey_address': f"bc1q{o % (size // 3)}"} for o in range(t * 5 // 2, min((t + 1) * 5 // 2, size))]
+    } for t in range(size * 2 // 5)]
+    
+    tracemalloc.start()
+    dicts = [utxo for tx in transactions for utxo in brain.discover_utxos_from_transaction(tx, 1_700_000_000)]
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    
+    tracemalloc.start()
+    batch = UtxoBatch()
+    for tx in transactions:
+        brain.discover_utxos_into(batch, tx, 1_700_000_000)
+    batch_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    
+    print(f"   list of dicts: {dict_bytes / len(dicts):8.1f} bytes/UTXO")
+    print(f"   UtxoBatch:     {batch_bytes / len(batch):8.1f} bytes/UTXO "
+          f"(columns alone {batch.nbytes / len(batch):.1f})")
+    
+    t0 = time.perf_counter()
+    brain.calculate_utxo_insights(dicts)
+    dict_rate = report("insights from dicts", len(dicts), time.perf_counter() - t0)
+    
+    t0 = time.perf_counter()
+    brain.calculate_utxo_insights(batch)
+    batch_rate = report("insights from UtxoBatch", len(batch), time.perf_counter() - t0)
+    print(f"   Speedup: {batch_rate / dict_rate:.1f}x")
+
+
+def benchmark_rollups(days=365 * 2):
+    """Set-based rollup backfill, and a long-range chart read from rollups vs hourly rows"""
+    hours = days * 24
+    print(f"🕯️  Rollup benchmark ({hours:,} hourly rows, {days} days)")
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        db = MVRVDatabase(os.path.join(workdir, "rollups.db"))
+        start_time = datetime(2023, 1, 1)
+        ratios = 1.5 + np.cumsum(np.random.default_rng(1).normal(0, 0.01, hours))
+        db.connections.bulk_write("""
+            INSERT INTO mvrv_ratios (timestamp, market_cap, realized_cap, ratio, timeframe)
+            VALUES (?, ?, ?, ?, 'hourly')
+        """, (((start_time + timedelta(hours=h)).isoformat(), r * 4e11, 4e11, r) for h, r in enumerate(ratios.tolist())))
+        
+        start = time.perf_counter()
+        buckets = db.rollups.backfill()
+        report("backfill (day/week/month buckets)", buckets, time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        hourly = db.get_mvrv_history('hourly', hours)
+        hourly_seconds = time.perf_counter() - start
+        report("chart read: hourly rows", len(hourly), hourly_seconds)
+        
+        start = time.perf_counter()
+        daily = db.get_mvrv_rollups('day', days)
+        rollup_seconds = time.perf_counter() - start
+        report("chart read: day rollups", len(daily), rollup_seconds)
+        
+        close_all_connections()
+    
+    print(f"   Rows read: {len(hourly):,} → {len(daily):,}, {hourly_seconds / rollup_seconds:.1f}x faster")
+
+
+def benchmark_downsampling(years=3, max_points=1500):
+    """Chart payload and preparation time for a multi-year hourly series, raw vs downsampled"""
+    import pandas as pd
+    from downsampling import downsample_frame, payload_bytes
+    
+    hours = years * 365 * 24
+    print(f"📉 Downsampling benchmark ({hours:,} hourly points, budget {max_points:,})")
+    
+    ratios = 1.5 + np.cumsum(np.random.default_rng(2).normal(0, 0.01, hours))
+    frame = pd.DataFrame({
+        'timestamp': pd.date_range('2022-01-01', periods=hours, freq='h'),
+        'ratio': ratios,
+        'market_cap': ratios * 4e11,
+        'realized_cap': np.linspace(3e11, 5e11, hours)
+    })
+    columns = ['ratio', 'market_cap', 'realized_cap']
+    raw_bytes = payload_bytes(frame, columns)
+    
+    for method in ('lttb', 'minmax'):
+        start = time.perf_counter()
+        thinned = {column: downsample_frame(frame, column, max_points, method) for column in columns}
+        report(f"{method} ({len(columns)} series)", hours * len(columns), time.perf_counter() - start)
+        thinned_bytes = sum(payload_bytes(rows, [column]) for column, rows in thinned.items())
+        print(f"   Payload: {raw_bytes / 1e6:.2f} MB → {thinned_bytes / 1e6:.3f} MB "
+              f"({raw_bytes / thinned_bytes:.0f}x smaller)")
+
+
+def benchmark_epochs(years=3):
+    """Online epoch migration, then a chart frame from ISO text vs int64 epoch arrays"""
+    import pandas as pd
+    
+    hours = years * 365 * 24
+    print(f"🕒 Epoch timestamp benchmark ({hours:,} hourly rows)")
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        db = MVRVDatabase(os.path.join(workdir, "epochs.db"))
+        start_time = datetime(2022, 1, 1)
+        ratios = 1.5 + np.cumsum(np.random.default_rng(3).normal(0, 0.01, hours))
+        # Written the version 1 way: ISO text only
+        db.connections.bulk_write("""
+            INSERT INTO mvrv_ratios (timestamp, market_cap, realized_cap, ratio, timeframe)
+            VALUES (?, ?, ?, ?, 'hourly')
+        """, (((start_time + timedelta(hours=h)).isoformat(), r * 4e11, 4e11, r) for h, r in enumerate(ratios.tolist())))
+        
+        result = db.epochs.migrate()
+        report("migrate (5k rows per transaction)", sum(result['converted'].values()), result['seconds'])
+        
+        start = time.perf_counter()
+        frame = pd.DataFrame(db.get_mvrv_history('hourly', None))
+        frame['timestamp'] = pd.to_datetime(frame['timestamp'])
+        text_seconds = time.perf_counter() - start
+        report("chart frame: ISO text + to_datetime", len(frame), text_seconds)
+        
+        start = time.perf_counter()
+        series = db.get_mvrv_series('hourly')
+        frame = pd.DataFrame({'timestamp': pd.to_datetime(series['epoch'], unit='s'), 'ratio': series['ratio']})
+        epoch_seconds = time.perf_counter() - start
+        report("chart frame: epoch arrays", len(frame), epoch_seconds)
+        
+        close_all_connections()
+    
+    print(f"   Speedup: {text_seconds / epoch_seconds:.1f}x")
+
+
+def benchmark_rolling_stats(days=365, calls=500):
+    """Dashboard-style statistics calls: reload 168 rows + NumPy vs the incremental rolling windows"""
+    from rolling_stats import get_rolling_stats
+    
+    hours = days * 24
+    print(f"📐 Rolling statistics benchmark ({hours:,} hourly rows, {calls} calls)")
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        db = MVRVDatabase(os.path.join(workdir, "rolling.db"))
+        start_time = datetime(2023, 1, 1)
+        ratios = 1.5 + np.cumsum(np.random.default_rng(4).normal(0, 0.01, hours))
+        db.connections.bulk_write(f"""
+            INSERT INTO mvrv_ratios (timestamp, market_cap, realized_cap, ratio, timeframe, timestamp_epoch)
+            VALUES (?1, ?2, ?3, ?4, 'hourly', CAST(strftime('%s', ?1) AS INTEGER))
+        """, (((start_time + timedelta(hours=h)).isoformat(), r * 4e11, 4e11, r) for h, r in enumerate(ratios.tolist())))
+        
+        start = time.perf_counter()
+        for _ in range(calls):
+            week = [row['ratio'] for row in db.get_mvrv_history('hourly', 168)]
+            np.mean(week), min(week), max(week), np.std(week)
+        reload_rate = report("reload 168 rows + NumPy (7d only)", calls, time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        get_rolling_stats(db.connections, 'mvrv_ratio')
+        report("first sync (whole history, then saved)", hours, time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        for _ in range(calls):
+            db.get_rolling_mvrv_stats()
+        rolling_rate = report("rolling windows (24h/7d/30d/365d)", calls, time.perf_counter() - start)
+        
+        close_all_connections()
+    
+    print(f"   Speedup: {rolling_rate / reload_rate:.1f}x")
+
+
+def benchmark_http_latency(calls=300):
+    """Per-request latency against a local stub: a bare requests.get per call vs the shared keep-alive pool"""
+    import requests
+    from conftest import StubApiServer
+    from http_client import HostRegistry, new_session, set_host_registry
+    from response_cache import ResponseCache, set_response_cache
+    
+    print(f"🌐 HTTP latency benchmark ({calls} uncached GETs per client)")
+    
+    with tempfile.TemporaryDirectory() as workdir, StubApiServer() as stub:
+        set_response_cache(ResponseCache(os.path.join(workdir, "http_cache.db")))
+        set_host_registry(HostRegistry(default_rate=(1e6, 1e6)))
+        url = f"{stub.base_url}/prices/ping"
+        
+        def timed(get):
+            latencies = []
+            for _ in range(calls):
+                start = time.perf_counter()
+                get(url, timeout=5).content
+                latencies.append(time.perf_counter() - start)
+            latencies = np.array(latencies) * 1000
+            print(f"      p50 {np.percentile(latencies, 50):.2f} ms, p95 {np.percentile(latencies, 95):.2f} ms")
+            return latencies.sum() / 1000
+        
+        connections = len(stub.connections)
+        bare_rate = report("bare requests.get (new connection each)", calls, timed(requests.get))
+        print(f"      {len(stub.connections) - connections} connections opened")
+        
+        connections = len(stub.connections)
+        pooled_rate = report("pooled keep-alive session", calls, timed(new_session().get))
+        print(f"      {len(stub.connections) - connections} connections opened")
+        
+        set_host_registry(None)
+        set_response_cache(None)
+        close_all_connections()
+    
+    print(f"   Speedup: {pooled_rate / bare_rate:.1f}x")
+
+
+def benchmark_backtest(years=10, sample=50):
+    """Threshold sweep over hourly history: the per-hour reference per parameter set vs run tables + pool"""
+    from backtest import DEFAULT_GRID, Backtester, simulate, threshold_grid
+    from my_mvrv_engine import MyMVRVEngine
+    
+    hours = years * 365 * 24
+    print(f"📈 Backtest benchmark ({hours:,} hourly rows, {os.cpu_count()} CPUs)")
+    
+    with tempfile.TemporaryDirectory() as workdir:
+        my_db = MyPersonalDatabase(os.path.join(workdir, "backtest.db"))
+        rng = np.random.default_rng(8)
+        ratios = np.clip(1.6 + np.cumsum(rng.normal(0, 0.01, hours)), 0.5, 5.0)
+        caps = 4e11 * np.exp(np.cumsum(rng.normal(0, 0.006, hours)))
+        start_epoch = int(datetime(2015, 1, 1).timestamp())
+        my_db.connections.bulk_write("""
+            INSERT INTO my_mvrv_analysis (analysis_time, market_capitalization, realized_capitalization,
+                                          mvrv_ratio, analysis_period, analysis_time_epoch)
+            VALUES (datetime(?1, 'unixepoch'), ?2, ?3, ?4, 'hourly', ?1)
+        """, ((start_epoch + 3600 * h, c, c / r, r) for h, (r, c) in enumerate(zip(ratios.tolist(), caps.tolist()))))
+        
+        engine = MyMVRVEngine(my_db=my_db)
+        start = time.perf_counter()
+        for value in ratios[:100_000].tolist():
+            engine.interpret_mvrv_my_way(value)
+        report("interpret one value at a time", min(hours, 100_000), time.perf_counter() - start)
+        
+        backtester = Backtester(my_db)
+        combos = list(threshold_grid(DEFAULT_GRID))
+        start = time.perf_counter()
+        for signals in combos[:sample]:
+            simulate(backtester.values, backtester.prices, signals)
+        reference_rate = report(f"per-hour simulate ({sample} of {len(combos):,})", sample, time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        backtester.sweep(DEFAULT_GRID)
+        sweep_rate = report("run-table sweep (+ cache writes)", len(combos), time.perf_counter() - start)
+        
+        start = time.perf_counter()
+        backtester.sweep(DEFAULT_GRID)
+        report("cached sweep", len(combos), time.perf_counter() - start)
+        
+        close_all_connections()
+    
+    print(f"   Speedup: {sweep_rate / reference_rate:.1f}x")
+
+
+BENCHMARKS = {
+    'database': benchmark_database,
+    'bulk_prices': benchmark_bulk_prices,
+    'realized_value': benchmark_realized_value,
+    'utxo_batch': benchmark_utxo_batch,
+    'utxo_discoveries': benchmark_utxo_discoveries,
+    'rollups': benchmark_rollups,
+    'downsampling': benchmark_downsampling,
+    'epochs': benchmark_epochs,
+    'rolling_stats': benchmark_rolling_stats,
+    'http_latency': benchmark_http_latency,
+    'backtest': benchmark_backtest,
+}
+
+
+def main():
+    """Run the named benchmarks, or all of them"""
+    names = sys.argv[1:] or list(BENCHMARKS)
+    
+    for name in names:
+        if name not in BENCHMARKS:
+            print(f"❌ Unknown benchmark '{name}'. Available: {', '.join(BENCHMARKS)}")
+            sys.exit(1)
+        BENCHMARKS[name]()
+        print()
+
+
+if __name__ == "__main__":
+    main()
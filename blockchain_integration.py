@@ -2,19 +2,33 @@ import requests
 import time
 from datetime import datetime, timedelta
 import json
+from async_harvester import HarvestStats, block_page_starts, block_page_url
+from http_client import new_session
+from utxo_batch import UtxoBatch, as_utxo_batch
 
 class BlockchainIntegration:
     def __init__(self):
         self.mempool_base = "https://mempool.space/api"
         self.blockstream_base = "https://blockstream.info/api"
-        self.session = requests.Session()
-        self.session.headers.update({'User-Agent': 'MVRV-Calculator/1.0'})
+        self.session = new_session({'User-Agent': 'MVRV-Calculator/1.0'})
+        self.session.on_network_request = self._before_network_request
+        
+        # Request efficiency of the most recent sample fetch
+        self.harvest_stats = HarvestStats()
+    
+    def _before_network_request(self, url):
+        """Count requests that miss the response cache (the session rate-limits them per host)"""
+        self.harvest_stats.requests += 1
+    
+    def _get(self, url, timeout=30):
+        """GET through the response cache"""
+        return self.session.get(url, timeout=timeout)
     
     def get_recent_blocks(self, count=10):
         """Get recent Bitcoin blocks"""
         try:
             url = f"{self.mempool_base}/blocks"
-            response = self.session.get(url, timeout=30)
+            response = self._get(url)
             response.raise_for_status()
             blocks = response.json()
             return blocks[:count]
@@ -22,11 +36,41 @@ class BlockchainIntegration:
             print(f"Error fetching blocks: {e}")
             return []
     
+    def get_tip_height(self):
+        """Get the height of the chain tip"""
+        try:
+            response = self._get(f"{self.mempool_base}/blocks/tip/height")
+            response.raise_for_status()
+            return int(response.text)
+        except Exception as e:
+            print(f"Error fetching tip height: {e}")
+            return None
+    
+    def get_block_hash(self, height):
+        """Get the hash of the block at a height"""
+        try:
+            response = self._get(f"{self.mempool_base}/block-height/{height}")
+            response.raise_for_status()
+            return response.text.strip()
+        except Exception as e:
+            print(f"Error fetching block hash at {height}: {e}")
+            return None
+    
+    def get_block(self, block_hash):
+        """Get a block header (timestamp, tx_count, ...)"""
+        try:
+            response = self._get(f"{self.mempool_base}/block/{block_hash}")
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            print(f"Error fetching block {block_hash}: {e}")
+            return None
+    
     def get_block_transactions(self, block_hash, limit=25):
         """Get transactions from a specific block"""
         try:
             url = f"{self.mempool_base}/block/{block_hash}/txs"
-            response = self.session.get(url, timeout=30)
+            response = self._get(url)
             response.raise_for_status()
             txs = response.json()
             return [tx['txid'] for tx in txs[:limit]]
@@ -34,11 +78,22 @@ class BlockchainIntegration:
             print(f"Error fetching block transactions: {e}")
             return []
     
+    def get_block_transactions_page(self, block_hash, start_index=0):
+        """Get one page of full transaction objects (with vout) from a block"""
+        try:
+            url = block_page_url(self.mempool_base, block_hash, start_index)
+            response = self._get(url)
+            response.raise_for_status()
+            return response.json()
+        except Exception as e:
+            print(f"Error fetching block transactions page {start_index}: {e}")
+            return []
+    
     def get_transaction_details(self, txid):
         """Get detailed transaction information"""
         try:
             url = f"{self.blockstream_base}/tx/{txid}"
-            response = self.session.get(url, timeout=30)
+            response = self._get(url)
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -64,11 +119,12 @@ class BlockchainIntegration:
         
         return utxos
     
-    def fetch_real_utxo_sample(self, target_count=2000):
+    def fetch_real_utxo_sample(self, target_count=2000, use_block_payloads=True, tx_per_block=15):
         """Fetch real UTXO sample from Bitcoin blockchain"""
         print("🔗 Fetching real UTXO data from Bitcoin blockchain...")
         
-        utxos = []
+        self.harvest_stats = HarvestStats()
+        utxos = UtxoBatch()
         blocks = self.get_recent_blocks(20)  # Get last 20 blocks
         
         for block in blocks:
@@ -77,8 +133,21 @@ class BlockchainIntegration:
             
             print(f"📦 Processing block {block['height']} ({block['id'][:8]}...)")
             
+            if use_block_payloads:
+                # Block pages already contain full transactions - no per-tx requests
+                for start_index in block_page_starts(block, tx_per_block):
+                    if len(utxos) >= target_count:
+                        break
+                    
+                    page = self.get_block_transactions_page(block['id'], start_index)
+                    for tx_data in page[:tx_per_block - start_index]:
+                        if len(utxos) >= target_count:
+                            break
+                        utxos.append_transaction(tx_data, block['timestamp'], min_sats=0)
+                continue
+            
             # Get transactions from this block
-            tx_ids = self.get_block_transactions(block['id'], 15)
+            tx_ids = self.get_block_transactions(block['id'], tx_per_block)
             
             for tx_id in tx_ids:
                 if len(utxos) >= target_count:
@@ -88,32 +157,29 @@ class BlockchainIntegration:
                 tx_data = self.get_transaction_details(tx_id)
                 if tx_data:
                     # Extract UTXOs from this transaction
-                    tx_utxos = self.extract_utxos_from_transaction(tx_data, block['timestamp'])
-                    utxos.extend(tx_utxos)
-                
-                # Rate limiting
-                time.sleep(0.1)
+                    utxos.append_transaction(tx_data, block['timestamp'], min_sats=0)
         
+        self.harvest_stats.utxos = len(utxos)
         print(f"✅ Collected {len(utxos)} real UTXOs from blockchain")
+        print(f"📡 {self.harvest_stats}")
         return utxos
     
     def get_utxo_statistics(self, utxos):
-        """Calculate statistics about UTXO set"""
+        """Calculate statistics about UTXO set (a UtxoBatch or a list of UTXO dicts)"""
         if not utxos:
             return {}
         
-        values = [utxo['value_btc'] for utxo in utxos]
-        timestamps = [utxo['timestamp'] for utxo in utxos]
+        stats = as_utxo_batch(utxos).stats()
         
         return {
-            'total_utxos': len(utxos),
-            'total_value_btc': sum(values),
-            'avg_value_btc': sum(values) / len(values),
-            'min_value_btc': min(values),
-            'max_value_btc': max(values),
-            'oldest_timestamp': min(timestamps),
-            'newest_timestamp': max(timestamps),
-            'unique_addresses': len(set(utxo['address'] for utxo in utxos if utxo['address']))
+            'total_utxos': stats['count'],
+            'total_value_btc': stats['total_btc'],
+            'avg_value_btc': stats['average_btc'],
+            'min_value_btc': stats['min_btc'],
+            'max_value_btc': stats['max_btc'],
+            'oldest_timestamp': stats['oldest_time'],
+            'newest_timestamp': stats['newest_time'],
+            'unique_addresses': stats['unique_addresses']
         }
     
     def validate_blockchain_connection(self):
@@ -144,7 +210,7 @@ class BlockchainIntegration:
         """Get Bitcoin network statistics"""
         try:
             url = f"{self.mempool_base}/v1/statistics"
-            response = self.session.get(url, timeout=30)
+            response = self._get(url)
             response.raise_for_status()
             return response.json()
         except Exception as e:
@@ -8,6 +8,10 @@ import time
 from datetime import datetime, timedelta
 import random
 import json
+import numpy as np
+from async_harvester import AsyncUtxoHarvester, HarvestStats
+from http_client import new_session
+from utxo_batch import UtxoBatch, as_utxo_batch
 
 class BitcoinBrain:
     def __init__(self):
@@ -18,9 +22,8 @@ class BitcoinBrain:
             'prices': "https://api.coingecko.com/api/v3"
         }
         
-        # My custom session with personality
-        self.session = requests.Session()
-        self.session.headers.update({
+        # My custom session with personality (confirmed chain data is cached on disk)
+        self.session = new_session({
             'User-Agent': 'PersonalMVRVAnalyzer/2024 (Educational)',
             'Accept': 'application/json'
         })
@@ -31,6 +34,17 @@ class BitcoinBrain:
             'avg_block_time_minutes': 10,
             'satoshis_per_btc': 100_000_000
         }
+        
+        # Request efficiency of my most recent UTXO hunt
+        self.last_harvest_stats = HarvestStats()
+    
+    def health_probes(self):
+        """Cheap URL per API that answers 200 when it's reachable"""
+        return {
+            'mempool': f"{self.my_apis['mempool']}/blocks/tip/height",
+            'explorer': f"{self.my_apis['explorer']}/blocks/tip/height",
+            'prices': f"{self.my_apis['prices']}/ping"
+        }
     
     def check_my_connection(self):
         """My way of testing if I can reach Bitcoin data"""
@@ -39,15 +53,8 @@ class BitcoinBrain:
         connection_health = {}
         
         # Test my chosen APIs
-        for name, url in self.my_apis.items():
+        for name, test_url in self.health_probes().items():
             try:
-                if name == 'mempool':
-                    test_url = f"{url}/blocks/tip/height"
-                elif name == 'explorer':
-                    test_url = f"{url}/blocks/tip/height"
-                else:  # prices
-                    test_url = f"{url}/ping"
-                
                 response = self.session.get(test_url, timeout=8)
                 connection_health[name] = response.status_code == 200
                 
@@ -152,6 +159,10 @@ class BitcoinBrain:
         
         return my_utxos
     
+    def discover_utxos_into(self, batch, tx_info, block_time):
+        """Same as discover_utxos_from_transaction, but appends straight into a UtxoBatch"""
+        return batch.append_transaction(tx_info, block_time, confidence=self.calculate_my_confidence)
+    
     def calculate_my_confidence(self, btc_value, output_data):
         """Calculate confidence score for UTXO data quality"""
         confidence = 0.5
@@ -173,60 +184,34 @@ class BitcoinBrain:
         """Collect real UTXO data from Bitcoin blockchain"""
         print(f"🎯 Collecting {target_utxos} real Bitcoin UTXOs...")
         
-        my_utxo_collection = []
-        blocks_processed = 0
-        
-        # Get fresh blocks to hunt in
-        hunting_blocks = self.fetch_recent_bitcoin_blocks(25)
-        
-        for block in hunting_blocks:
-            if len(my_utxo_collection) >= target_utxos:
-                break
-                
-            print(f"🔎 Hunting in block {block['height']} ({block['id'][:8]}...)")
-            blocks_processed += 1
-            
-            # Get transactions from this block
-            tx_list = self.extract_transactions_from_block(block['id'], 12)
-            
-            for tx_id in tx_list:
-                if len(my_utxo_collection) >= target_utxos:
-                    break
-                
-                # Analyze this transaction
-                tx_details = self.analyze_transaction_deeply(tx_id)
-                
-                if tx_details:
-                    # Find UTXOs in this transaction
-                    found_utxos = self.discover_utxos_from_transaction(tx_details, block['timestamp'])
-                    my_utxo_collection.extend(found_utxos)
-                
-                # My polite delay to not overwhelm APIs
-                time.sleep(0.15)
+        # Concurrent requests, politely rate limited per host
+        harvester = AsyncUtxoHarvester(self)
+        my_utxo_collection = harvester.run(target_utxos, block_count=25, tx_per_block=12)
+        self.last_harvest_stats = harvester.stats
         
-        print(f"🏆 Hunt complete! Found {len(my_utxo_collection)} real UTXOs from {blocks_processed} blocks")
+        print(f"🏆 Hunt complete! Found {len(my_utxo_collection)} real UTXOs")
+        print(f"📡 {harvester.stats}")
         return my_utxo_collection
     
     def calculate_utxo_insights(self, my_utxos):
-        """My personal analysis of the UTXO collection"""
+        """My personal analysis of the UTXO collection (a UtxoBatch or a list of dicts)"""
         if not my_utxos:
             return {}
         
-        btc_values = [utxo['btc_amount'] for utxo in my_utxos]
-        timestamps = [utxo['creation_time'] for utxo in my_utxos]
-        confidences = [utxo['my_confidence'] for utxo in my_utxos]
+        batch = as_utxo_batch(my_utxos)
+        stats = batch.stats()
         
         my_insights = {
-            'total_utxos_found': len(my_utxos),
-            'total_btc_value': sum(btc_values),
-            'average_utxo_size': sum(btc_values) / len(btc_values),
-            'largest_utxo': max(btc_values),
-            'smallest_utxo': min(btc_values),
-            'oldest_utxo_time': min(timestamps),
-            'newest_utxo_time': max(timestamps),
-            'average_confidence': sum(confidences) / len(confidences),
-            'unique_addresses': len(set(utxo['recipient_address'] for utxo in my_utxos if utxo['recipient_address'] != 'unknown')),
-            'my_quality_score': self.calculate_my_quality_score(my_utxos)
+            'total_utxos_found': stats['count'],
+            'total_btc_value': stats['total_btc'],
+            'average_utxo_size': stats['average_btc'],
+            'largest_utxo': stats['max_btc'],
+            'smallest_utxo': stats['min_btc'],
+            'oldest_utxo_time': stats['oldest_time'],
+            'newest_utxo_time': stats['newest_time'],
+            'average_confidence': stats['average_confidence'],
+            'unique_addresses': stats['unique_addresses'],
+            'my_quality_score': self.calculate_my_quality_score(batch)
         }
         
         return my_insights
@@ -236,9 +221,10 @@ class BitcoinBrain:
         if not utxos:
             return 0
         
-        size_score = sum(min(utxo['btc_amount'] * 10, 5) for utxo in utxos) / len(utxos)
-        confidence_score = sum(utxo['my_confidence'] for utxo in utxos) / len(utxos) * 5
-        diversity_score = len(set(utxo['script_pattern'] for utxo in utxos)) * 0.5
+        batch = as_utxo_batch(utxos)
+        size_score = float(np.minimum(batch.btc_amount * 10, 5).mean())
+        confidence_score = float(batch.confidence.mean()) * 5
+        diversity_score = len(batch.script_pattern_counts()) * 0.5
         
         total_score = (size_score + confidence_score + diversity_score) / 3
         return min(total_score, 10.0)
@@ -0,0 +1,219 @@
+"""
+Shared pytest fixtures for the MVRV system tests
+"""
+
+import gzip
+import json
+import re
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+import pytest
+
+from db_connection import close_all_connections
+from http_client import HostRegistry, set_host_registry
+from response_cache import ResponseCache, set_response_cache
+
+
+@pytest.fixture(autouse=True)
+def fresh_connections():
+    """Make sure no test reuses another test's pooled connections"""
+    yield
+    close_all_connections()
+
+
+@pytest.fixture(autouse=True)
+def isolated_response_cache(tmp_path):
+    """Give every test its own empty HTTP response cache"""
+    cache = ResponseCache(str(tmp_path / "http_cache.db"))
+    set_response_cache(cache)
+    yield cache
+    set_response_cache(None)
+
+
+@pytest.fixture(autouse=True)
+def isolated_http_hosts():
+    """Fresh per-host rate limits and circuits; the stub serves as fast as it can, so no throttling"""
+    hosts = HostRegistry(default_rate=(1000.0, 1000.0), base_delay=0.01)
+    set_host_registry(hosts)
+    yield hosts
+    set_host_registry(None)
+
+
+class StubApiServer:
+    """Local HTTP server that mimics the mempool.space, blockstream and CoinGecko endpoints"""
+    
+    BLOCK_PAGE_SIZE = 25
+    
+    def __init__(self, blocks=4, txs_per_block=30, outputs_per_tx=3, latency=0.0, first_height=800_000,
+                 first_time=1_700_000_000):
+        self.latency = latency
+        self.requests = []
+        self.connections = set()     # Client (host, port) pairs: one per TCP connection opened
+        self.gzipped = 0
+        self.spot_price = 65_000.0           # What /simple/price reports, and when it last moved
+        self.spot_updated_at = 1_700_000_000
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._lock = threading.Lock()
+        
+        self.blocks = []
+        self.block_txs = {}
+        self.transactions = {}
+        self._build_chain(blocks, txs_per_block, outputs_per_tx, first_height, first_time)
+        
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self.base_url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+    
+    def _build_chain(self, block_count, txs_per_block, outputs_per_tx, first_height, first_time):
+        """Deterministic blocks whose transactions spend outputs of earlier blocks"""
+        previous_outputs = []
+        
+        for b in range(block_count):
+            height = first_height + b
+            block_id = f"{height:064x}"
+            txs = []
+            
+            for t in range(txs_per_block):
+                txid = f"{height:032x}{t:032x}"
+                if t == 0 or not previous_outputs:
+                    vin = [{'is_coinbase': True}]
+                else:
+                    spent_txid, spent_vout = previous_outputs.pop(0)
+                    vin = [{'txid': spent_txid, 'vout': spent_vout, 'is_coinbase': False}]
+                
+                vout = [{
+                    'value': 5_000 + (b * 7919 + t * 104729 + o * 1299709) % 250_000_000,
+                    'scriptpubkey_type': ['v0_p2wpkh', 'p2pkh', 'p2sh', 'v1_p2tr'][(t + o) % 4],
+                    'scriptpubkey_address': f"bc1q{height}x{t}x{o}"
+                } for o in range(outputs_per_tx)]
+                
+                tx = {'txid': txid, 'vin': vin, 'vout': vout, 'status': {'confirmed': True, 'block_height': height}}
+                txs.append(tx)
+                self.transactions[txid] = tx
+            
+            previous_outputs.extend((tx['txid'], o) for tx in txs for o in range(outputs_per_tx))
+            self.block_txs[block_id] = txs
+            self.blocks.append({'id': block_id, 'height': height, 'timestamp': first_time + b * 600,
+                                'tx_count': txs_per_block})
+    
+    def count(self, pattern):
+        """Number of requests whose path matches a regex"""
+        return sum(1 for path in self.requests if re.search(pattern, path))
+    
+    @staticmethod
+    def daily_price(day_start):
+        """Deterministic BTC price for the UTC day starting at day_start"""
+        return 20_000.0 + (day_start // 86400) % 1000 * 10
+    
+    def route(self, path, query=None):
+        """Map a request path (and its parsed query) to (status, payload) or (status, payload, headers)"""
+        if path == '/prices/ping':
+            return 200, {'gecko_says': '(V3) To the Moon!'}
+        if path == '/prices/coins/bitcoin/market_chart/range':
+            # Daily points at 00:00 UTC, as CoinGecko returns for long ranges
+            start, end = int(query['from'][0]), int(query['to'][0])
+            first = -(-start // 86400) * 86400
+            return 200, {'prices': [[day * 1000, self.daily_price(day)] for day in range(first, end + 1, 86400)]}
+        if path == '/prices/simple/price':
+            quote = {'usd': self.spot_price, 'usd_market_cap': self.spot_price * 19_700_000,
+                     'last_updated_at': self.spot_updated_at}
+            return 200, {'bitcoin': quote}, {'ETag': f'W/"{self.spot_updated_at}"',
+                                             'Last-Modified': formatdate(self.spot_updated_at, usegmt=True)}
+        
+        for prefix in ('/mempool', '/explorer'):
+            if path.startswith(prefix):
+                path = path[len(prefix):]
+                break
+        
+        if path == '/blocks':
+            return 200, list(reversed(self.blocks))
+        if path == '/blocks/tip/height':
+            return 200, self.blocks[-1]['height']
+        
+        match = re.fullmatch(r'/block-height/(\d+)', path)
+        if match:
+            by_height = {block['height']: block['id'] for block in self.blocks}
+            if int(match.group(1)) in by_height:
+                return 200, by_height[int(match.group(1))]
+        
+        match = re.fullmatch(r'/block/([0-9a-f]+)', path)
+        if match and match.group(1) in self.block_txs:
+            return 200, next(block for block in self.blocks if block['id'] == match.group(1))
+        
+        match = re.fullmatch(r'/block/([0-9a-f]+)/txs(?:/(\d+))?', path)
+        if match and match.group(1) in self.block_txs:
+            start = int(match.group(2) or 0)
+            return 200, self.block_txs[match.group(1)][start:start + self.BLOCK_PAGE_SIZE]
+        
+        match = re.fullmatch(r'/tx/([0-9a-f]+)', path)
+        if match and match.group(1) in self.transactions:
+            return 200, self.transactions[match.group(1)]
+        
+        return 404, {'error': 'not found'}
+    
+    def _handler(self):
+        stub = self
+        
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'    # Keep-alive, like the real APIs
+            disable_nagle_algorithm = True   # Headers and body go out in separate writes
+            
+            def do_GET(self):
+                with stub._lock:
+                    stub.requests.append(self.path)
+                    stub.connections.add(self.client_address)
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                try:
+                    if stub.latency:
+                        time.sleep(stub.latency)
+                    path, _, query = self.path.partition('?')
+                    status, payload, *headers = stub.route(path, parse_qs(query))
+                    headers = headers[0] if headers else {}
+                    body = payload.encode() if isinstance(payload, str) else json.dumps(payload).encode()
+                    if 'ETag' in headers and self.headers.get('If-None-Match') == headers['ETag']:
+                        status, body = 304, b''
+                    compress = body and 'gzip' in self.headers.get('Accept-Encoding', '')
+                    if compress:
+                        body = gzip.compress(body)
+                        with stub._lock:
+                            stub.gzipped += 1
+                    
+                    self.send_response(status)
+                    self.send_header('Content-Type', 'application/json')
+                    if compress:
+                        self.send_header('Content-Encoding', 'gzip')
+                    for name, value in headers.items():
+                        self.send_header(name, str(value))
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                finally:
+                    with stub._lock:
+                        stub.in_flight -= 1
+            
+            def log_message(self, *args):
+                pass
+        
+        return Handler
+    
+    def __enter__(self):
+        self.thread.start()
+        return self
+    
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_api():
+    """A running stub of the blockchain APIs"""
+    with StubApiServer() as stub:
+        yield stub
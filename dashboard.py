@@ -12,9 +12,15 @@ import numpy as np
 from my_database import MyPersonalDatabase
 from my_mvrv_engine import MyMVRVEngine
 from btc_brain import BitcoinBrain
+from dashboard_data import DashboardData
+from health_monitor import get_health_monitor
+from http_client import new_session
+from downsampling import DEFAULT_MAX_POINTS, downsample_frame, line_mode, use_webgl
 import time
 from datetime import datetime
 
+render_started = time.perf_counter()
+
 # Page setup
 st.set_page_config(
     page_title="Bitcoin MVRV Analysis Dashboard",
@@ -73,11 +79,14 @@ st.markdown("""
 # Initialize system
 @st.cache_resource
 def init_system():
-    return MyPersonalDatabase(), MyMVRVEngine(), BitcoinBrain()
+    my_db = MyPersonalDatabase()
+    my_engine = MyMVRVEngine(my_db=my_db)
+    my_brain = BitcoinBrain()
+    return my_db, my_engine, my_brain, DashboardData(my_db, my_engine), get_health_monitor(my_brain)
 
 
 
-my_db, my_engine, my_brain = init_system()
+my_db, my_engine, my_brain, dashboard_data, health_monitor = init_system()
 
 # Header
 st.markdown('<div class="main-title">₿ Bitcoin MVRV Analysis Dashboard</div>', unsafe_allow_html=True)
@@ -86,14 +95,16 @@ st.markdown('<div class="main-title">₿ Bitcoin MVRV Analysis Dashboard</div>',
 st.sidebar.header("📊 Analysis Controls")
 
 # Time controls
-timeframe = st.sidebar.selectbox("📅 Timeframe", ["Last 7 Days", "Last 30 Days", "Last 90 Days"])
+timeframe = st.sidebar.selectbox("📅 Timeframe", ["Last 7 Days", "Last 30 Days", "Last 90 Days", "Last Year", "Last 3 Years"])
 chart_type = st.sidebar.selectbox("📊 Chart Style", ["Line Chart", "Area Chart"])
+max_points = st.sidebar.select_slider("Max Chart Points", options=[250, 500, 1000, 1500, 3000, 5000],
+                                      value=DEFAULT_MAX_POINTS)
 
 # Show current selection
 st.sidebar.info(f"Current: {timeframe} | {chart_type}")
 
 # Map timeframe to days
-days_map = {"Last 7 Days": 7, "Last 30 Days": 30, "Last 90 Days": 90}
+days_map = {"Last 7 Days": 7, "Last 30 Days": 30, "Last 90 Days": 90, "Last Year": 365, "Last 3 Years": 1095}
 selected_days = days_map[timeframe]
 
 auto_refresh = st.sidebar.checkbox("🔄 Auto-refresh (30s)", value=False)
@@ -115,8 +126,9 @@ with col2:
         st.rerun()
 
 # Get current insights from your system
-insights = my_engine.get_my_mvrv_insights()
-latest = my_db.get_my_latest_mvrv()
+insights = dashboard_data.insights()
+latest = dashboard_data.latest_mvrv()
+tick = dashboard_data.latest_mvrv('tick')
 
 if insights:
     # Current metrics with better layout
@@ -153,6 +165,10 @@ if insights:
             delta=insights['data_quality'].title()
         )
     
+    if tick and (not latest or tick['timestamp'] > latest['timestamp']):
+        st.caption(f"⚡ Live tick {tick['timestamp'][11:19]} UTC: MVRV {tick['ratio']:.3f}, "
+                   f"market cap ${tick['market_cap']/1e9:.1f}B ({tick['signal']})")
+    
     # Market signal
     st.subheader("🚦 Market Signal")
     
@@ -195,15 +211,20 @@ with col2:
     else:
         st.info("📊 Area Chart Available")
 
-# Get historical data from your system
-history = my_db.get_my_mvrv_history('hourly', selected_days * 24)
+# Get historical data from your system (long ranges read daily rollups, not every hourly row)
+# The window is a time range (index range scan); hour-aligned so reruns share one cached result
+window_start = (datetime.utcnow() - timedelta(days=selected_days)).replace(minute=0, second=0, microsecond=0)
+if selected_days > 30:
+    history = dashboard_data.mvrv_rollups('day', None, start=window_start.date())
+else:
+    history = dashboard_data.mvrv_history('hourly', None, start=window_start)
 
 if not history:
     st.error("📊 No MVRV data found in database!")
     
     # Show system status
     st.subheader("🔧 System Status")
-    db_stats = my_db.get_my_database_stats()
+    db_stats = dashboard_data.database_stats()
     
     col1, col2 = st.columns(2)
     with col1:
@@ -219,9 +240,8 @@ if not history:
             try:
                 # Step 1: Collect current price data
                 st.info("Step 1: Fetching Bitcoin price...")
-                import requests
                 url = "https://api.coingecko.com/api/v3/coins/bitcoin"
-                response = requests.get(url, timeout=30)
+                response = new_session().get(url, timeout=30)
                 data = response.json()
                 
                 price = data["market_data"]["current_price"]["usd"]
@@ -254,14 +274,18 @@ if history:
     df = pd.DataFrame(history)
     df['timestamp'] = pd.to_datetime(df['timestamp'])
     
+    # Thin long series to the point budget (keeping peaks and troughs); WebGL past the threshold
+    chart_df = downsample_frame(df, 'ratio', max_points)
+    Scatter = go.Scattergl if use_webgl(len(chart_df)) else go.Scatter
+    
     # Create main MVRV chart with better readability
     fig = go.Figure()
     
     if chart_type == "Line Chart":
-        fig.add_trace(go.Scatter(
-            x=df['timestamp'],
-            y=df['ratio'],
-            mode='lines+markers',
+        fig.add_trace(Scatter(
+            x=chart_df['timestamp'],
+            y=chart_df['ratio'],
+            mode=line_mode(len(chart_df)),
             name='MVRV Ratio',
             line=dict(color='#667eea', width=3),
             marker=dict(size=4, color='#764ba2'),
@@ -269,9 +293,9 @@ if history:
         ))
     
     elif chart_type == "Area Chart":
-        fig.add_trace(go.Scatter(
-            x=df['timestamp'],
-            y=df['ratio'],
+        fig.add_trace(Scatter(
+            x=chart_df['timestamp'],
+            y=chart_df['ratio'],
             mode='lines',
             name='MVRV Ratio',
             line=dict(color='#667eea', width=2),
@@ -344,6 +368,8 @@ if history:
     )
     
     st.plotly_chart(fig, use_container_width=True)
+    if len(chart_df) < len(df):
+        st.caption(f"Showing {len(chart_df):,} of {len(df):,} points (LTTB downsampled)")
     
     # Secondary analysis charts
     col1, col2 = st.columns(2)
@@ -351,19 +377,21 @@ if history:
     with col1:
         st.subheader("💰 Market vs Realized Cap")
         
+        caps_df = downsample_frame(df, ['market_cap', 'realized_cap'], max_points)
+        CapsScatter = go.Scattergl if use_webgl(len(caps_df)) else go.Scatter
         fig_caps = go.Figure()
         
-        fig_caps.add_trace(go.Scatter(
-            x=df['timestamp'],
-            y=df['market_cap']/1e9,
+        fig_caps.add_trace(CapsScatter(
+            x=caps_df['timestamp'],
+            y=caps_df['market_cap']/1e9,
             mode='lines',
             name='Market Cap',
             line=dict(color='#f5576c', width=3)
         ))
         
-        fig_caps.add_trace(go.Scatter(
-            x=df['timestamp'],
-            y=df['realized_cap']/1e9,
+        fig_caps.add_trace(CapsScatter(
+            x=caps_df['timestamp'],
+            y=caps_df['realized_cap']/1e9,
             mode='lines',
             name='Realized Cap',
             line=dict(color='#4ecdc4', width=3)
@@ -455,16 +483,25 @@ if history:
 # System status
 st.sidebar.subheader("🔧 System Status")
 
-brain_status = my_brain.check_my_connection()
-if brain_status['brain_online']:
+# Probed in the background; the page only reads the latest snapshot
+api_health = health_monitor.snapshot()
+if not api_health['checked']:
+    st.sidebar.info("⏳ Checking Blockchain Connection...")
+elif api_health['brain_online']:
     st.sidebar.success("✅ Blockchain Connected")
 else:
     st.sidebar.error("❌ Blockchain Offline")
+st.sidebar.caption(f"📡 {health_monitor.describe()}")
 
-db_stats = my_db.get_my_database_stats()
+db_stats = dashboard_data.database_stats()
 st.sidebar.info(f"📊 MVRV Records: {db_stats.get('my_mvrv_analysis', 0)}")
 st.sidebar.info(f"🔍 UTXO Records: {db_stats.get('my_utxo_discoveries', 0)}")
 
+cache_stats = dashboard_data.stats()
+st.sidebar.caption(f"⚡ Rendered in {(time.perf_counter() - render_started) * 1000:.0f} ms · "
+                   f"data cache hit rate {cache_stats['hit_rate']:.0%} "
+                   f"({cache_stats['hits']}/{cache_stats['hits'] + cache_stats['misses']})")
+
 # Footer
 st.markdown("---")
 st.markdown("""
@@ -0,0 +1,72 @@
+"""
+Dashboard Data Layer
+Query results shared by every dashboard session and rerun, served from memory until the
+database's change token (PRAGMA data_version) moves
+"""
+
+import threading
+
+
+class DashboardData:
+    """Change-aware cache in front of the queries the dashboards run on every rerun"""
+    
+    def __init__(self, my_db, engine):
+        self.my_db = my_db
+        self.engine = engine
+        self.connections = my_db.connections
+        
+        self._lock = threading.Lock()
+        self._token = None
+        self._results = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def _cached(self, name, load, *args):
+        """Result of load(*args), recomputed only after the database changed"""
+        token = self.connections.change_token()
+        key = (name, args)
+        
+        with self._lock:
+            if token != self._token:
+                self._token = token
+                self._results = {}
+            elif key in self._results:
+                self.hits += 1
+                return self._results[key]
+        
+        # Loaded outside the lock; a commit racing the load only costs a refresh next time
+        value = load(*args)
+        with self._lock:
+            self.misses += 1
+            if token == self._token:
+                self._results[key] = value
+        return value
+    
+    def insights(self):
+        return self._cached('insights', self.engine.get_my_mvrv_insights)
+    
+    def latest_mvrv(self, period='hourly'):
+        return self._cached('latest_mvrv', self.my_db.get_my_latest_mvrv, period)
+    
+    def mvrv_history(self, period='hourly', limit=168, start=None, end=None, since=None):
+        return self._cached('mvrv_history', self.my_db.get_my_mvrv_history, period, limit, start, end, since)
+    
+    def mvrv_series(self, period='hourly', start=None, end=None):
+        return self._cached('mvrv_series', self.my_db.get_my_mvrv_series, period, start, end)
+    
+    def mvrv_rollups(self, resolution='day', limit=90, start=None, end=None):
+        return self._cached('mvrv_rollups', self.my_db.get_my_mvrv_rollups, resolution, limit, start, end)
+    
+    def database_stats(self):
+        return self._cached('database_stats', self.my_db.get_my_database_stats)
+    
+    def stats(self):
+        """Lookups served from memory vs from the database"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'cached_results': len(self._results)
+            }
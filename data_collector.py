@@ -3,18 +3,24 @@ import time
 from datetime import datetime, timedelta
 import json
 from database import MVRVDatabase
+from epoch_schema import utc_iso
+from http_client import new_session
+from price_resolver import PriceResolver
 
 class DataCollector:
     def __init__(self):
         self.db = MVRVDatabase()
         self.coingecko_base = "https://api.coingecko.com/api/v3"
         self.blockchair_base = "https://api.blockchair.com/bitcoin"
+        self.session = new_session()
+        self.prices = PriceResolver(self.db.get_price_index, self.db.insert_historical_prices,
+                                    self.coingecko_base, session=self.session)
         
     def fetch_current_price_data(self):
         """Fetch current Bitcoin price and supply from CoinGecko"""
         try:
             url = f"{self.coingecko_base}/coins/bitcoin"
-            response = requests.get(url, timeout=30)
+            response = self.session.get(url, timeout=30)
             data = response.json()
             
             price_usd = data['market_data']['current_price']['usd']
@@ -38,7 +44,7 @@ class DataCollector:
         try:
             # Get recent transactions for UTXO analysis
             url = f"{self.blockchair_base}/transactions?limit={limit}"
-            response = requests.get(url, timeout=30)
+            response = self.session.get(url, timeout=30)
             data = response.json()
             
             utxo_list = []
@@ -52,11 +58,11 @@ class DataCollector:
                     0  # Will be calculated with historical price
                 ))
             
-            # Get historical prices for UTXO timestamps and calculate USD values
+            # Price every UTXO timestamp in one batch and calculate USD values
+            prices = self.prices.resolve([moved_timestamp for _, _, moved_timestamp, _ in utxo_list])
             processed_utxos = []
-            for txid, value_btc, moved_timestamp, _ in utxo_list:
-                historical_price = self.get_historical_price(moved_timestamp)
-                if historical_price:
+            for (txid, value_btc, moved_timestamp, _), historical_price in zip(utxo_list, prices.tolist()):
+                if historical_price > 0:
                     value_usd = value_btc * historical_price
                     processed_utxos.append((txid, value_btc, moved_timestamp, value_usd))
             
@@ -72,27 +78,8 @@ class DataCollector:
     def get_historical_price(self, timestamp_str):
         """Get historical Bitcoin price for given timestamp"""
         try:
-            # First check if we have it in database
-            price = self.db.get_price_at_timestamp(timestamp_str)
-            if price:
-                return price
-            
-            # Convert timestamp to date for API call
-            dt = datetime.fromisoformat(timestamp_str.replace('Z', ''))
-            date_str = dt.strftime('%d-%m-%Y')
-            
-            url = f"{self.coingecko_base}/coins/bitcoin/history"
-            params = {'date': date_str}
-            
-            response = requests.get(url, params=params, timeout=30)
-            data = response.json()
-            
-            if 'market_data' in data:
-                price = data['market_data']['current_price']['usd']
-                self.db.insert_historical_price(timestamp_str, price)
-                return price
-            
-            return None
+            # Known day from the price index, otherwise one range fetch for that day
+            return self.prices.resolve_one(timestamp_str)
             
         except Exception as e:
             print(f"Error fetching historical price: {e}")
@@ -115,18 +102,15 @@ class DataCollector:
                 'to': end_ts
             }
             
-            response = requests.get(url, params=params, timeout=30)
+            response = self.session.get(url, params=params, timeout=30)
             data = response.json()
             
-            prices_inserted = 0
-            for price_point in data.get('prices', []):
-                timestamp = datetime.fromtimestamp(price_point[0] / 1000).isoformat()
-                price = price_point[1]
-                
-                self.db.insert_historical_price(timestamp, price)
-                prices_inserted += 1
+            price_rows = (
+                (utc_iso(price_point[0] / 1000), price_point[1])
+                for price_point in data.get('prices', [])
+            )
             
-            return prices_inserted
+            return self.db.insert_historical_prices(price_rows)
             
         except Exception as e:
             print(f"Error fetching historical price range: {e}")
@@ -137,7 +121,7 @@ class DataCollector:
         import random
         
         utxo_list = []
-        base_time = datetime.now() - timedelta(days=365)  # 1 year ago
+        base_time = datetime.utcnow() - timedelta(days=365)  # 1 year ago
         
         for i in range(count):
             # Generate random UTXO
@@ -1,129 +1,163 @@
 import sqlite3
 from datetime import datetime
 import json
+from db_connection import get_connection_manager, time_window, DEFAULT_CHUNK_SIZE
+from epoch_schema import EPOCH_SQL, SCHEMA_VERSION, EpochSchema, epoch_window, fetch_series
+from price_index import get_price_index
+from rollups import MvrvRollups
+from rolling_stats import get_rolling_stats
+
+# ISO TEXT time column of each table; its integer UTC twin is <column>_epoch
+EPOCH_COLUMNS = {
+    'price_data': 'timestamp',
+    'utxo_data': 'moved_timestamp',
+    'historical_prices': 'timestamp',
+    'mvrv_ratios': 'timestamp'
+}
 
 class MVRVDatabase:
     def __init__(self, db_path="mvrv_bitcoin.db"):
         self.db_path = db_path
+        self.connections = get_connection_manager(db_path)
+        self.epochs = EpochSchema(self.connections, EPOCH_COLUMNS)
         self.init_database()
+        self.rollups = MvrvRollups(self.connections, 'mvrv_ratios')
     
     def init_database(self):
         """Initialize database with required tables"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Price data table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS price_data (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                price_usd REAL NOT NULL,
-                supply REAL NOT NULL,
-                UNIQUE(timestamp)
-            )
-        """)
-        
-        # UTXO data table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS utxo_data (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                txid TEXT NOT NULL,
-                value_btc REAL NOT NULL,
-                moved_timestamp TEXT NOT NULL,
-                value_usd REAL NOT NULL,
-                UNIQUE(txid)
-            )
-        """)
-        
-        # Historical prices table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS historical_prices (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                price_usd REAL NOT NULL,
-                UNIQUE(timestamp)
-            )
-        """)
-        
-        # MVRV ratios table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS mvrv_ratios (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp TEXT NOT NULL,
-                market_cap REAL NOT NULL,
-                realized_cap REAL NOT NULL,
-                ratio REAL NOT NULL,
-                timeframe TEXT DEFAULT 'hourly',
-                UNIQUE(timestamp, timeframe)
-            )
-        """)
-        
-        # Create indexes for performance
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_price_timestamp ON price_data(timestamp)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_mvrv_timestamp ON mvrv_ratios(timestamp)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_utxo_moved ON utxo_data(moved_timestamp)")
-        
-        conn.commit()
-        conn.close()
+        with self.connections.transaction() as cursor:
+            # Price data table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS price_data (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    price_usd REAL NOT NULL,
+                    supply REAL NOT NULL,
+                    UNIQUE(timestamp)
+                )
+            """)
+            
+            # UTXO data table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS utxo_data (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    txid TEXT NOT NULL,
+                    value_btc REAL NOT NULL,
+                    moved_timestamp TEXT NOT NULL,
+                    value_usd REAL NOT NULL,
+                    UNIQUE(txid)
+                )
+            """)
+            
+            # Historical prices table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS historical_prices (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    price_usd REAL NOT NULL,
+                    UNIQUE(timestamp)
+                )
+            """)
+            
+            # MVRV ratios table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS mvrv_ratios (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    market_cap REAL NOT NULL,
+                    realized_cap REAL NOT NULL,
+                    ratio REAL NOT NULL,
+                    timeframe TEXT DEFAULT 'hourly',
+                    UNIQUE(timestamp, timeframe)
+                )
+            """)
+            
+            # Create indexes for performance
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_price_timestamp ON price_data(timestamp)")
+            # History reads filter on timeframe and a time window: covered without touching the table
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_mvrv_timeframe_time
+                ON mvrv_ratios(timeframe, timestamp, market_cap, realized_cap, ratio)
+            """)
+            cursor.execute("DROP INDEX IF EXISTS idx_mvrv_timestamp")  # UNIQUE(timestamp, timeframe) covers it
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_utxo_moved ON utxo_data(moved_timestamp)")
+            
+            # Integer epoch twins of the time columns (schema version 2)
+            self.epochs.setup(cursor)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_price_epoch ON price_data(timestamp_epoch)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_utxo_moved_epoch ON utxo_data(moved_timestamp_epoch)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_historical_epoch ON historical_prices(timestamp_epoch, price_usd)")
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_mvrv_timeframe_epoch
+                ON mvrv_ratios(timeframe, timestamp_epoch, market_cap, realized_cap, ratio)
+            """)
     
     def insert_price_data(self, timestamp, price_usd, supply):
         """Insert current price data"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT OR REPLACE INTO price_data (timestamp, price_usd, supply)
-            VALUES (?, ?, ?)
-        """, (timestamp, price_usd, supply))
-        
-        conn.commit()
-        conn.close()
+        with self.connections.transaction() as cursor:
+            cursor.execute(f"""
+                INSERT OR REPLACE INTO price_data (timestamp, price_usd, supply, timestamp_epoch)
+                VALUES (?1, ?2, ?3, {EPOCH_SQL.format(column='?1')})
+            """, (timestamp, price_usd, supply))
     
     def insert_utxo_data(self, utxo_list):
         """Insert UTXO data in batch"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.executemany("""
-            INSERT OR REPLACE INTO utxo_data (txid, value_btc, moved_timestamp, value_usd)
-            VALUES (?, ?, ?, ?)
-        """, utxo_list)
-        
-        conn.commit()
-        conn.close()
+        with self.connections.transaction() as cursor:
+            cursor.executemany(f"""
+                INSERT OR REPLACE INTO utxo_data (txid, value_btc, moved_timestamp, value_usd, moved_timestamp_epoch)
+                VALUES (?1, ?2, ?3, ?4, {EPOCH_SQL.format(column='?3')})
+            """, utxo_list)
     
     def insert_historical_price(self, timestamp, price_usd):
         """Insert historical price data"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self.connections.transaction() as cursor:
+            cursor.execute(f"""
+                INSERT OR REPLACE INTO historical_prices (timestamp, price_usd, timestamp_epoch)
+                VALUES (?1, ?2, {EPOCH_SQL.format(column='?1')})
+            """, (timestamp, price_usd))
         
-        cursor.execute("""
-            INSERT OR REPLACE INTO historical_prices (timestamp, price_usd)
-            VALUES (?, ?)
-        """, (timestamp, price_usd))
+        self._price_index_if_loaded('add', timestamp, price_usd)
+    
+    def insert_historical_prices(self, price_rows, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Bulk insert (timestamp, price_usd) rows in a single transaction"""
+        written = []
+        inserted, seconds = self.connections.bulk_write(f"""
+            INSERT OR REPLACE INTO historical_prices (timestamp, price_usd, timestamp_epoch)
+            VALUES (?1, ?2, {EPOCH_SQL.format(column='?1')})
+        """, self._collect_rows(price_rows, written), chunk_size)
+        
+        # Only committed rows reach the index: a rolled back batch must not leave prices behind
+        self._price_index_if_loaded('add_many', written)
         
-        conn.commit()
-        conn.close()
+        if inserted:
+            print(f"💾 Stored {inserted} historical prices in {seconds:.3f}s ({inserted / max(seconds, 1e-9):,.0f} rows/sec)")
+        return inserted
     
     def insert_mvrv_ratio(self, timestamp, market_cap, realized_cap, ratio, timeframe='hourly'):
         """Insert MVRV calculation result"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT OR REPLACE INTO mvrv_ratios (timestamp, market_cap, realized_cap, ratio, timeframe)
-            VALUES (?, ?, ?, ?, ?)
-        """, (timestamp, market_cap, realized_cap, ratio, timeframe))
+        with self.connections.transaction() as cursor:
+            cursor.execute(f"""
+                INSERT OR REPLACE INTO mvrv_ratios (timestamp, market_cap, realized_cap, ratio, timeframe, timestamp_epoch)
+                VALUES (?1, ?2, ?3, ?4, ?5, {EPOCH_SQL.format(column='?1')})
+            """, (timestamp, market_cap, realized_cap, ratio, timeframe))
+            
+            if timeframe == 'hourly':
+                self.rollups.record(timestamp, market_cap, realized_cap, ratio)
+    
+    def get_latest_price_data(self):
+        """Get the most recent price and supply row"""
+        cursor = self.connections.connection().execute("""
+            SELECT price_usd, supply, timestamp
+            FROM price_data
+            ORDER BY timestamp DESC
+            LIMIT 1
+        """)
         
-        conn.commit()
-        conn.close()
+        return cursor.fetchone()
     
     def get_latest_mvrv(self):
         """Get latest MVRV calculation"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
+        cursor = self.connections.connection().execute("""
             SELECT timestamp, market_cap, realized_cap, ratio
             FROM mvrv_ratios
             WHERE timeframe = 'hourly'
@@ -132,7 +166,6 @@ class MVRVDatabase:
         """)
         
         result = cursor.fetchone()
-        conn.close()
         
         if result:
             return {
@@ -143,21 +176,27 @@ class MVRVDatabase:
             }
         return None
     
-    def get_mvrv_history(self, timeframe='hourly', limit=168):  # 7 days of hourly data
-        """Get MVRV historical data"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
+    def mvrv_history_query(self, timeframe='hourly', limit=168, start=None, end=None, since=None):
+        """SQL and parameters behind get_mvrv_history"""
+        conditions, params = time_window('timestamp', start, end, since)
+        query = f"""
             SELECT timestamp, market_cap, realized_cap, ratio
             FROM mvrv_ratios
-            WHERE timeframe = ?
+            WHERE {' AND '.join(['timeframe = ?'] + conditions)}
             ORDER BY timestamp DESC
-            LIMIT ?
-        """, (timeframe, limit))
+        """
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        return query, [timeframe] + params
+    
+    def get_mvrv_history(self, timeframe='hourly', limit=168, start=None, end=None, since=None):  # 7 days of hourly data
+        """Get MVRV historical data: the latest `limit` rows (None = all) with start <= timestamp < end, after since"""
+        cursor = self.connections.connection().execute(
+            *self.mvrv_history_query(timeframe, limit, start, end, since)
+        )
         
         results = cursor.fetchall()
-        conn.close()
         
         return [{
             'timestamp': row[0],
@@ -166,19 +205,53 @@ class MVRVDatabase:
             'ratio': row[3]
         } for row in reversed(results)]
     
+    def get_mvrv_series(self, timeframe='hourly', start=None, end=None):
+        """MVRV rows with start <= time < end as arrays: 'epoch' (int64 UTC seconds), caps and ratio"""
+        conditions, params = epoch_window('timestamp_epoch', start, end)
+        return fetch_series(self.connections.connection(), f"""
+            SELECT timestamp_epoch, market_cap, realized_cap, ratio
+            FROM mvrv_ratios
+            WHERE {' AND '.join(['timeframe = ?', 'timestamp_epoch IS NOT NULL'] + conditions)}
+            ORDER BY timestamp_epoch
+        """, [timeframe] + params, ('epoch', 'market_cap', 'realized_cap', 'ratio'))
+    
+    def get_historical_price_series(self, start=None, end=None):
+        """Historical prices with start <= time < end as 'epoch' and 'price_usd' arrays"""
+        conditions, params = epoch_window('timestamp_epoch', start, end)
+        return fetch_series(self.connections.connection(), f"""
+            SELECT timestamp_epoch, price_usd
+            FROM historical_prices
+            WHERE {' AND '.join(['timestamp_epoch IS NOT NULL'] + conditions)}
+            ORDER BY timestamp_epoch
+        """, params, ('epoch', 'price_usd'))
+    
+    def get_rolling_mvrv_stats(self):
+        """Rolling 24h/7d/30d/365d statistics of the hourly MVRV ratio, folded forward from new rows"""
+        # The stats follow the epoch columns; until migrate-epochs has filled them, serve what was saved
+        current = self.epochs.version() >= SCHEMA_VERSION
+        return get_rolling_stats(self.connections, 'mvrv_ratio', sync=current).summary()
+    
+    def get_mvrv_rollups(self, resolution='day', limit=90, start=None, end=None):
+        """Day/week/month OHLC rollups of the hourly MVRV rows"""
+        return self.rollups.history(resolution, limit, start, end)
+    
+    def get_price_index(self):
+        """Sorted in-memory index over historical_prices"""
+        return get_price_index(self.connections, 'historical_prices', 'timestamp', 'price_usd')
+    
+    def _price_index_if_loaded(self, method, *args):
+        """Keep an already-loaded price index in step with our writes"""
+        index = self.connections.shared_state.get(('price_index', 'historical_prices'))
+        if index is not None:
+            getattr(index, method)(*args)
+    
+    @staticmethod
+    def _collect_rows(price_rows, written):
+        """Pass rows through to the writer, keeping a copy for the index once they are committed"""
+        for row in price_rows:
+            written.append(row)
+            yield row
+    
     def get_price_at_timestamp(self, timestamp):
         """Get historical price at specific timestamp"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT price_usd FROM historical_prices
-            WHERE timestamp <= ?
-            ORDER BY timestamp DESC
-            LIMIT 1
-        """, (timestamp,))
-        
-        result = cursor.fetchone()
-        conn.close()
-        
-        return result[0] if result else None
\ No newline at end of file
+        return self.get_price_index().price_at(timestamp)
\ No newline at end of file
@@ -0,0 +1,160 @@
+"""
+Shared SQLite connection manager
+Keeps one long-lived, tuned connection per thread for each database file
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from itertools import islice
+
+# Pragmas applied to every new connection
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',       # Readers don't block the writer
+    'synchronous': 'NORMAL',     # Safe with WAL, far fewer fsyncs
+    'cache_size': -64000,        # 64 MB page cache (negative = KiB)
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,        # Wait up to 5s for a competing writer
+}
+
+# Rows handed to each executemany() call by bulk writers
+DEFAULT_CHUNK_SIZE = 5000
+
+
+def time_window(column, start=None, end=None, since=None):
+    """SQL conditions and parameters for start <= column < end and column > since (ISO text or datetimes)"""
+    conditions, params = [], []
+    for operator, bound in ((">=", start), ("<", end), (">", since)):
+        if bound is not None:
+            conditions.append(f"{column} {operator} ?")
+            params.append(bound.isoformat() if hasattr(bound, 'isoformat') else bound)
+    return conditions, params
+
+
+class ConnectionManager:
+    def __init__(self, db_path, pragmas=None):
+        self.db_path = db_path
+        self.pragmas = {**DEFAULT_PRAGMAS, **(pragmas or {})}
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = []
+        self._watcher = None
+        
+        # Derived state shared by every client of this file (e.g. price indexes)
+        self.shared_state = {}
+        self.shared_lock = threading.Lock()
+    
+    def _open(self):
+        """Open and tune a new connection for the calling thread"""
+        conn = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        
+        with self._lock:
+            self._connections.append(conn)
+        return conn
+    
+    def connection(self):
+        """Get this thread's connection (autocommit mode outside transactions)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._open()
+            self._local.conn = conn
+            self._local.depth = 0
+        return conn
+    
+    @contextmanager
+    def transaction(self, mode='IMMEDIATE'):
+        """Run a block in one transaction and yield a cursor; nested blocks join the outer one"""
+        conn = self.connection()
+        
+        if self._local.depth > 0:
+            self._local.depth += 1
+            try:
+                yield conn.cursor()
+            finally:
+                self._local.depth -= 1
+            return
+        
+        conn.execute(f"BEGIN {mode}")
+        self._local.depth = 1
+        try:
+            yield conn.cursor()
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        else:
+            conn.execute("COMMIT")
+        finally:
+            self._local.depth = 0
+    
+    def change_token(self):
+        """Value that changes whenever any connection commits to the file (PRAGMA data_version)"""
+        with self._lock:
+            if self._watcher is None:
+                # Never writes, so every commit (ours included) is another connection's to it
+                self._watcher = sqlite3.connect(self.db_path, isolation_level=None, check_same_thread=False)
+                self._connections.append(self._watcher)
+            return self._watcher.execute("PRAGMA data_version").fetchone()[0]
+    
+    def bulk_write(self, sql, rows, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Stream rows through executemany in one transaction, returning (row_count, seconds)"""
+        rows = iter(rows)
+        written = 0
+        start = time.perf_counter()
+        
+        with self.transaction() as cursor:
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
+                cursor.executemany(sql, chunk)
+                written += len(chunk)
+        
+        return written, time.perf_counter() - start
+    
+    def close(self):
+        """Close every connection this manager has opened"""
+        with self._lock:
+            connections, self._connections = self._connections, []
+            self._watcher = None
+        
+        for conn in connections:
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+        
+        self._local = threading.local()
+        self.shared_state = {}
+
+
+_managers = {}
+_managers_lock = threading.Lock()
+
+
+def get_connection_manager(db_path, pragmas=None):
+    """Get the shared manager for a database file, creating it on first use; pragmas that differ from
+    the existing manager's raise ValueError instead of being silently dropped"""
+    key = os.path.abspath(db_path)
+    
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = ConnectionManager(db_path, pragmas)
+            _managers[key] = manager
+        elif pragmas and {**DEFAULT_PRAGMAS, **pragmas} != manager.pragmas:
+            raise ValueError(f"{db_path} is already open with pragmas {manager.pragmas}, not {pragmas}")
+        return manager
+
+
+def close_all_connections():
+    """Close every shared connection manager (used at shutdown and in tests)"""
+    with _managers_lock:
+        managers = list(_managers.values())
+        _managers.clear()
+    
+    for manager in managers:
+        manager.close()
@@ -0,0 +1,104 @@
+"""
+Chart Downsampling
+Thins long MVRV series to a point budget before they reach Plotly, keeping the visual
+extremes (Largest-Triangle-Three-Buckets or min/max per bucket)
+"""
+
+import json
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_MAX_POINTS = 1500        # Roughly one point per horizontal pixel of a wide chart
+WEBGL_THRESHOLD = 1000           # Series longer than this render with Scattergl
+MARKER_LIMIT = 200               # Markers only while they are still distinguishable
+
+METHODS = ('lttb', 'minmax')
+
+
+def lttb(x, y, max_points):
+    """Indices of the Largest-Triangle-Three-Buckets selection of (x, y)"""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+    
+    # First and last points are always kept; the rest is split into max_points - 2 buckets
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    selected = np.empty(max_points, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x, next_y = x[end:next_end].mean(), y[end:next_end].mean()
+        
+        # Point forming the largest triangle with the previous pick and the next bucket's average
+        area = np.abs((x[previous] - next_x) * (y[start:end] - y[previous])
+                      - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(np.argmax(area))
+        selected[bucket + 1] = previous
+    
+    return selected
+
+
+def min_max(y, buckets):
+    """Indices of the minimum and maximum of each of `buckets` equal slices, plus both ends"""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if buckets < 1 or 2 * buckets + 2 >= n:
+        return np.arange(n)
+    
+    bucket_ids = np.arange(n) * buckets // n
+    order = np.lexsort((y, bucket_ids))               # By bucket, then by value
+    starts = np.searchsorted(bucket_ids[order], np.arange(buckets))
+    ends = np.append(starts[1:], n) - 1
+    
+    return np.unique(np.concatenate([order[starts], order[ends], [0, n - 1]]))
+
+
+def _numeric_x(values):
+    """Epoch seconds for datetime columns, floats otherwise"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.to_numpy(dtype='datetime64[ns]').astype(np.int64) / 1e9
+    return np.asarray(values, dtype=np.float64)
+
+
+def downsample_frame(frame, y, max_points=DEFAULT_MAX_POINTS, method='lttb', x='timestamp'):
+    """Rows of frame worth plotting for column(s) y within a point budget (None = keep all)"""
+    if method not in METHODS:
+        raise ValueError(f"Unknown downsampling method '{method}', use one of {', '.join(METHODS)}")
+    
+    columns = [y] if isinstance(y, str) else list(y)
+    if not max_points or len(frame) <= max_points:
+        return frame
+    
+    # Each column gets its share of the budget; the union keeps every column's extremes
+    budget = max(max_points // len(columns), 3)
+    x_values = _numeric_x(frame[x])
+    picks = []
+    for column in columns:
+        values = frame[column].to_numpy(dtype=np.float64)
+        if method == 'lttb':
+            picks.append(lttb(x_values, values, budget))
+        else:
+            picks.append(min_max(values, (budget - 2) // 2))
+    
+    return frame.iloc[np.unique(np.concatenate(picks))]
+
+
+def use_webgl(points, threshold=WEBGL_THRESHOLD):
+    """Whether a series is long enough that Scattergl beats SVG Scatter"""
+    return points > threshold
+
+
+def line_mode(points):
+    return 'lines+markers' if points <= MARKER_LIMIT else 'lines'
+
+
+def payload_bytes(frame, columns, x='timestamp'):
+    """Approximate bytes of trace data sent to the browser for these series"""
+    xs = [str(value) for value in frame[x]]
+    return sum(len(json.dumps({'x': xs, 'y': frame[column].tolist()})) for column in columns)
@@ -0,0 +1,128 @@
+"""
+Epoch Timestamp Schema
+Integer UTC epoch columns beside the ISO TEXT timestamps of every time-keyed table: filled by the
+writers' own INSERTs (EPOCH_SQL), backfilled online in short batches, read back as NumPy arrays
+"""
+
+import time
+from datetime import date, datetime, timezone
+
+import numpy as np
+
+from db_connection import time_window
+
+SCHEMA_VERSION = 2               # 1: ISO TEXT only, 2: every time column has a populated _epoch twin
+DEFAULT_BATCH_SIZE = 5000        # Rows converted per transaction; keeps the write lock short
+
+# SQLite reads any ISO 8601 variant written here ('T' or space, fractions, Z/±HH:MM); naive is UTC,
+# which is how every writer stores times (utc_iso). Writers put it in their INSERT next to the text
+# value (a trigger doubled bulk insert cost)
+EPOCH_SQL = "CAST(strftime('%s', {column}) AS INTEGER)"
+
+
+def epoch_column(column):
+    return f"{column}_epoch"
+
+
+def utc_iso(epoch):
+    """Naive UTC ISO text of epoch seconds, the form every time column stores"""
+    return datetime.fromtimestamp(epoch, timezone.utc).replace(tzinfo=None).isoformat()
+
+
+def utc_epoch(moment):
+    """Integer UTC epoch seconds of an ISO string, datetime, date or number (naive times are UTC)"""
+    if isinstance(moment, (int, float, np.integer, np.floating)):
+        return int(moment)
+    if isinstance(moment, str):
+        moment = datetime.fromisoformat(moment.replace('Z', '+00:00'))
+    elif isinstance(moment, date) and not isinstance(moment, datetime):
+        moment = datetime(moment.year, moment.month, moment.day)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp())
+
+
+def epoch_window(column, start=None, end=None, since=None):
+    """time_window over an epoch column, bounds given in any form utc_epoch accepts"""
+    return time_window(column, *(None if bound is None else utc_epoch(bound) for bound in (start, end, since)))
+
+
+def fetch_series(connection, query, params, names):
+    """Run query and return its columns as arrays: names[0] as int64 epochs, the rest float64"""
+    rows = connection.execute(query, params).fetchall()
+    columns = list(zip(*rows)) if rows else [()] * len(names)
+    
+    series = {names[0]: np.array(columns[0], dtype=np.int64)}
+    for name, values in zip(names[1:], columns[1:]):
+        series[name] = np.array(values, dtype=np.float64)
+    return series
+
+
+class EpochSchema:
+    """The _epoch columns of one database's tables ({table: ISO text column})"""
+    
+    def __init__(self, connections, columns):
+        self.connections = connections
+        self.columns = columns
+    
+    def setup(self, cursor):
+        """Add missing epoch columns; cheap on tables of any size (the rows are filled by migrate)"""
+        for table, column in self.columns.items():
+            epoch = epoch_column(column)
+            existing = {row[1] for row in cursor.execute(f"PRAGMA table_info({table})")}
+            if epoch not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {epoch} INTEGER")
+        
+        # A database with nothing to convert is current from the start
+        if self.version(cursor) < SCHEMA_VERSION and not any(
+                cursor.execute(f"SELECT 1 FROM {table} LIMIT 1").fetchone() for table in self.columns):
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    
+    def version(self, cursor=None):
+        cursor = cursor or self.connections.connection()
+        return cursor.execute("PRAGMA user_version").fetchone()[0]
+    
+    def pending(self):
+        """Rows per table whose epoch is still missing (unparseable timestamps included)"""
+        conn = self.connections.connection()
+        return {
+            table: conn.execute(f"SELECT COUNT(*) FROM {table} WHERE {epoch_column(column)} IS NULL").fetchone()[0]
+            for table, column in self.columns.items()
+        }
+    
+    def migrate(self, batch_size=DEFAULT_BATCH_SIZE, pause=0.0):
+        """Fill missing epochs a batch per transaction, so readers and writers keep going meanwhile"""
+        started = time.perf_counter()
+        converted = {}
+        
+        for table, column in self.columns.items():
+            epoch = epoch_column(column)
+            last_rowid, converted[table] = 0, 0
+            while True:
+                rowids = [row[0] for row in self.connections.connection().execute(f"""
+                    SELECT rowid FROM {table} WHERE rowid > ? AND {epoch} IS NULL ORDER BY rowid LIMIT ?
+                """, (last_rowid, batch_size))]
+                if not rowids:
+                    break
+                
+                with self.connections.transaction() as cursor:
+                    cursor.execute(f"""
+                        UPDATE {table} SET {epoch} = {EPOCH_SQL.format(column=column)}
+                        WHERE rowid BETWEEN ? AND ? AND {epoch} IS NULL AND {EPOCH_SQL.format(column=column)} IS NOT NULL
+                    """, (rowids[0], rowids[-1]))
+                    converted[table] += cursor.rowcount
+                last_rowid = rowids[-1]
+                if pause:
+                    time.sleep(pause)
+        
+        # Whatever is still NULL could not be parsed; it never blocks the version bump
+        unparseable = self.pending()
+        with self.connections.transaction() as cursor:
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        
+        return {
+            'converted': converted,
+            'unparseable': unparseable,
+            'version': SCHEMA_VERSION,
+            'seconds': time.perf_counter() - started
+        }
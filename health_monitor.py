@@ -0,0 +1,173 @@
+"""
+API Health Monitor
+Probes the blockchain and price APIs concurrently on a background interval and keeps rolling
+availability/latency stats, so pages and jobs read a snapshot instead of waiting on the network
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from btc_brain import BitcoinBrain
+
+DEFAULT_INTERVAL = 60
+DEFAULT_TIMEOUT = 8
+DEFAULT_WINDOW = 30               # Probes kept per endpoint for the rolling stats
+
+
+class EndpointHealth:
+    """Rolling probe history of one endpoint"""
+    
+    def __init__(self, name, url, window=DEFAULT_WINDOW):
+        self.name = name
+        self.url = url
+        self.probes = deque(maxlen=window)   # (checked_at, ok, latency seconds)
+        self.last_error = None
+    
+    def record(self, checked_at, ok, latency, error=None):
+        self.probes.append((checked_at, ok, latency))
+        self.last_error = error
+    
+    def summary(self):
+        if not self.probes:
+            return {'online': None, 'availability': None, 'latency_ms': None, 'avg_latency_ms': None,
+                    'p95_latency_ms': None, 'probes': 0, 'last_checked': None, 'error': None}
+        
+        checked_at, online, latency = self.probes[-1]
+        ok = np.array([probe[1] for probe in self.probes])
+        latencies = np.array([probe[2] for probe in self.probes if probe[1]])
+        
+        return {
+            'online': online,
+            'availability': float(ok.mean()),
+            'latency_ms': latency * 1000,
+            'avg_latency_ms': float(latencies.mean() * 1000) if latencies.size else None,
+            'p95_latency_ms': float(np.percentile(latencies, 95) * 1000) if latencies.size else None,
+            'probes': len(self.probes),
+            'last_checked': checked_at,
+            'error': self.last_error
+        }
+
+
+class HealthMonitor:
+    def __init__(self, probes, interval=DEFAULT_INTERVAL, timeout=DEFAULT_TIMEOUT, window=DEFAULT_WINDOW,
+                 headers=None):
+        self.interval = interval
+        self.timeout = timeout
+        self.endpoints = {name: EndpointHealth(name, url, window) for name, url in probes.items()}
+        
+        # Uncached on purpose: a probe answered from the response cache proves nothing
+        self.session = requests.Session()
+        self.session.headers.update(headers or {})
+        self._pool = ThreadPoolExecutor(max_workers=max(len(probes), 1), thread_name_prefix="health-probe")
+        
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self.last_round_seconds = None
+    
+    @classmethod
+    def for_brain(cls, brain, **options):
+        """Monitor the APIs a BitcoinBrain talks to"""
+        return cls(brain.health_probes(), headers=dict(brain.session.headers), **options)
+    
+    def _probe(self, endpoint):
+        started = time.perf_counter()
+        ok, error = False, None
+        try:
+            response = self.session.get(endpoint.url, timeout=self.timeout)
+            ok = response.status_code == 200
+            if not ok:
+                error = f"HTTP {response.status_code}"
+        except requests.RequestException as exc:
+            error = type(exc).__name__
+        latency = time.perf_counter() - started
+        
+        with self._lock:
+            endpoint.record(time.time(), ok, latency, error)
+        return ok
+    
+    def check_now(self):
+        """Probe every endpoint at once; blocks for at most one timeout"""
+        started = time.perf_counter()
+        results = list(self._pool.map(self._probe, self.endpoints.values()))
+        self.last_round_seconds = time.perf_counter() - started
+        return dict(zip(self.endpoints, results))
+    
+    def start(self):
+        """Probe in a background thread every interval seconds"""
+        if self._thread is not None:
+            return self
+        
+        self._stop.clear()
+        
+        def loop():
+            while not self._stop.is_set():
+                self.check_now()
+                self._stop.wait(self.interval)
+        
+        self._thread = threading.Thread(target=loop, name="health-monitor", daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout if timeout is None else timeout)
+            self._thread = None
+    
+    @property
+    def running(self):
+        return self._thread is not None
+    
+    def snapshot(self):
+        """Latest status of every endpoint without touching the network"""
+        with self._lock:
+            endpoints = {name: endpoint.summary() for name, endpoint in self.endpoints.items()}
+        
+        checked = all(status['online'] is not None for status in endpoints.values())
+        online = any(status['online'] for status in endpoints.values())
+        return {
+            'endpoints': endpoints,
+            'checked': checked,                       # Every endpoint probed at least once
+            'brain_online': online,
+            'all_offline': checked and not online,
+            'round_seconds': self.last_round_seconds
+        }
+    
+    def describe(self):
+        """One-line summary for logs"""
+        parts = []
+        for name, status in self.snapshot()['endpoints'].items():
+            if status['online'] is None:
+                parts.append(f"{name} ?")
+            else:
+                parts.append(f"{name} {'up' if status['online'] else 'DOWN'} {status['latency_ms']:.0f}ms "
+                             f"({status['availability']:.0%})")
+        return ", ".join(parts)
+
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+
+def get_health_monitor(brain=None):
+    """Process-wide monitor of the brain's APIs, started on first use"""
+    global _monitor
+    with _monitor_lock:
+        if _monitor is None:
+            _monitor = HealthMonitor.for_brain(brain or BitcoinBrain()).start()
+        return _monitor
+
+
+def set_health_monitor(monitor):
+    """Replace the process-wide monitor (tests, custom intervals); stops the previous one"""
+    global _monitor
+    with _monitor_lock:
+        if _monitor is not None and _monitor is not monitor:
+            _monitor.stop(timeout=0)
+        _monitor = monitor
@@ -0,0 +1,334 @@
+"""
+Resilient HTTP Client Layer
+One keep-alive connection pool for every session, per-host AIMD rate limits, Retry-After aware retries
+with jittered exponential backoff, circuit breakers that fail fast while a host is down, and per-call timing
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import numpy as np
+
+from rate_limit import AdaptiveTokenBucket
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+THROTTLE_STATUSES = {429, 503}   # The host is up but asking us to slow down
+
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_BASE_DELAY = 0.5
+DEFAULT_MAX_DELAY = 30.0         # Longest single wait inside a call; a longer Retry-After opens the circuit
+DEFAULT_FAILURE_THRESHOLD = 5    # Consecutive failures that open a host's circuit
+DEFAULT_RESET_TIMEOUT = 30.0     # Seconds an open circuit waits before letting one trial call through
+
+# Host -> (starting requests per second, ceiling the additive increase may reach)
+HOST_RATES = {
+    'api.coingecko.com': (0.5, 1.0),     # Public API allows roughly 30 calls a minute
+    'mempool.space': (8.0, 15.0),
+    'blockstream.info': (8.0, 15.0),
+}
+DEFAULT_RATE = (20.0, 50.0)
+
+DEFAULT_POOL_CONNECTIONS = 10    # Hosts whose connections are kept alive
+DEFAULT_POOL_MAXSIZE = 16        # Idle keep-alive connections per host (covers the worker thread counts)
+DEFAULT_HEADERS = {
+    'Accept': 'application/json',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+DEFAULT_TIMING_WINDOW = 200      # Recent calls per host kept for the latency stats
+
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of calling a host whose circuit is open"""
+
+
+def retry_after_seconds(value):
+    """Seconds to wait from a Retry-After header (delta seconds or HTTP date); None if absent or garbled"""
+    if value is None:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return max((moment - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class CircuitBreaker:
+    """Closed until failure_threshold failures in a row, then open (failing fast) for reset_timeout,
+    then half open: one trial call decides between closed and open again"""
+    
+    def __init__(self, failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT,
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_until = 0.0
+        self.opens = 0
+        self.rejected = 0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+    
+    def allow(self):
+        """Whether a call may go out now"""
+        with self._lock:
+            if self.state == 'closed':
+                return True
+            if self.state == 'open' and self.clock() >= self.opened_until:
+                self.state = 'half_open'
+                self._trial_in_flight = False
+            if self.state == 'half_open' and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            return False
+    
+    def record_success(self):
+        with self._lock:
+            self.state = 'closed'
+            self.failures = 0
+            self._trial_in_flight = False
+    
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == 'half_open' or self.failures >= self.failure_threshold:
+                self._open(self.reset_timeout)
+    
+    def record_throttle(self):
+        """A throttled trial call means the host is not ready yet; elsewhere throttling is the bucket's job"""
+        with self._lock:
+            if self.state == 'half_open':
+                self._open(self.reset_timeout)
+    
+    def trip(self, seconds):
+        """Open at once for at least seconds (the host told us when to come back)"""
+        with self._lock:
+            self._open(seconds)
+    
+    def _open(self, seconds):
+        if self.state != 'open':
+            self.opens += 1
+        self.state = 'open'
+        self.opened_until = max(self.opened_until, self.clock() + seconds)
+        self._trial_in_flight = False
+    
+    def retry_in(self):
+        with self._lock:
+            return max(self.opened_until - self.clock(), 0.0) if self.state == 'open' else 0.0
+
+
+class HostState:
+    """Rate limit, circuit breaker and counters of one host"""
+    
+    def __init__(self, name, rate, max_rate, failure_threshold, reset_timeout):
+        self.name = name
+        self.bucket = AdaptiveTokenBucket(rate, max_rate=max_rate)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.requests = 0
+        self.retries = 0
+        self.throttled = 0
+        self.failures = 0
+        self.latencies = deque(maxlen=DEFAULT_TIMING_WINDOW)   # Seconds until the response headers arrived
+        self._lock = threading.Lock()
+    
+    def count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+    
+    def record_latency(self, seconds):
+        with self._lock:
+            self.latencies.append(seconds)
+    
+    def summary(self):
+        with self._lock:
+            latencies = np.array(self.latencies)
+        return {
+            'rate': self.bucket.rate,
+            'circuit': self.breaker.state,
+            'retry_in': self.breaker.retry_in(),
+            'requests': self.requests,
+            'retries': self.retries,
+            'throttled': self.throttled,
+            'failures': self.failures,
+            'rejected': self.breaker.rejected,
+            'avg_latency_ms': float(latencies.mean() * 1000) if latencies.size else None,
+            'p95_latency_ms': float(np.percentile(latencies, 95) * 1000) if latencies.size else None
+        }
+
+
+class HostRegistry:
+    """Every host's state plus the retry policy, shared by all sessions of the process"""
+    
+    def __init__(self, rates=None, default_rate=DEFAULT_RATE, max_retries=DEFAULT_MAX_RETRIES,
+                 base_delay=DEFAULT_BASE_DELAY, max_delay=DEFAULT_MAX_DELAY,
+                 failure_threshold=DEFAULT_FAILURE_THRESHOLD, reset_timeout=DEFAULT_RESET_TIMEOUT, sleep=time.sleep):
+        self.rates = dict(HOST_RATES if rates is None else rates)
+        self.default_rate = default_rate
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.sleep = sleep
+        self._hosts = {}
+        self._lock = threading.Lock()
+    
+    def host(self, url):
+        name = urlsplit(url).netloc
+        with self._lock:
+            state = self._hosts.get(name)
+            if state is None:
+                rate, max_rate = self.rates.get(name.split(':')[0], self.default_rate)
+                state = self._hosts[name] = HostState(name, rate, max_rate, self.failure_threshold,
+                                                      self.reset_timeout)
+            return state
+    
+    def backoff(self, attempt):
+        """Full jitter: uniform over [0, base * 2^attempt], capped at max_delay"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+    
+    def stats(self):
+        with self._lock:
+            hosts = list(self._hosts.values())
+        return {state.name: state.summary() for state in hosts}
+    
+    def describe(self):
+        parts = []
+        for name, stats in self.stats().items():
+            circuit = stats['circuit'] if stats['circuit'] != 'open' else f"open {stats['retry_in']:.0f}s"
+            latency = f"{stats['avg_latency_ms']:.0f} ms avg" if stats['avg_latency_ms'] is not None else "no timing"
+            parts.append(f"{name} {stats['rate']:.1f}/s {circuit} ({stats['requests']} requests, {latency}, "
+                         f"{stats['retries']} retries, {stats['throttled']} throttled)")
+        return ', '.join(parts) or "no requests yet"
+
+
+class ResilientAdapter(HTTPAdapter):
+    """HTTPAdapter that waits for its host's token bucket, retries throttled and failed calls and
+    refuses to call hosts whose circuit is open"""
+    
+    def __init__(self, hosts=None, pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 **kwargs):
+        super().__init__(pool_connections=pool_connections, pool_maxsize=pool_maxsize, **kwargs)
+        self.hosts = hosts
+    
+    def send(self, request, **kwargs):
+        hosts = self.hosts or get_host_registry()
+        host = hosts.host(request.url)
+        attempt = 0
+        
+        while True:
+            if not host.breaker.allow():
+                raise CircuitOpenError(f"{host.name} is failing, circuit open for another "
+                                       f"{host.breaker.retry_in():.0f}s", request=request)
+            host.bucket.acquire()
+            host.count('requests')
+            
+            started = time.perf_counter()
+            try:
+                response = super().send(request, **kwargs)
+            except requests.RequestException:
+                host.count('failures')
+                host.breaker.record_failure()
+                if attempt >= hosts.max_retries:
+                    raise
+                delay = hosts.backoff(attempt)
+            else:
+                host.record_latency(time.perf_counter() - started)
+                if response.status_code not in RETRY_STATUSES:
+                    host.bucket.succeeded()
+                    host.breaker.record_success()
+                    return response
+                
+                retry_after = retry_after_seconds(response.headers.get('Retry-After'))
+                if response.status_code in THROTTLE_STATUSES:
+                    host.count('throttled')
+                    host.bucket.throttled(retry_after)
+                    host.breaker.record_throttle()
+                else:
+                    host.count('failures')
+                    host.breaker.record_failure()
+                
+                # Waiting minutes inside a call helps nobody: fail fast until the host is ready again
+                if retry_after is not None and retry_after > hosts.max_delay:
+                    host.breaker.trip(retry_after)
+                    return response
+                if attempt >= hosts.max_retries:
+                    if response.status_code in THROTTLE_STATUSES:
+                        host.breaker.record_failure()
+                    return response
+                
+                delay = max(retry_after or 0.0, hosts.backoff(attempt))
+                response.close()
+            
+            attempt += 1
+            host.count('retries')
+            hosts.sleep(delay)
+
+
+def mount_resilient(session, hosts=None):
+    """Route every http(s) request of a requests.Session through the shared keep-alive pool
+    (or a pool of its own when it brings its own host registry) and send the default headers"""
+    adapter = get_adapter() if hosts is None else ResilientAdapter(hosts)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update(DEFAULT_HEADERS)
+    return session
+
+
+def new_session(headers=None, cached=True):
+    """A cached, coalescing session on the shared pool; what every collector and engine talks through.
+    Pollers that revalidate on their own (ETag / If-Modified-Since) take cached=False"""
+    from response_cache import CachingSession    # response_cache mounts this module's adapter
+    
+    session = CachingSession() if cached else mount_resilient(requests.Session())
+    session.headers.update(headers or {})
+    return session
+
+
+_default_adapter = None
+_default_adapter_lock = threading.Lock()
+
+
+def get_adapter():
+    """The process-wide adapter: its pool keeps connections (and TLS sessions) alive across sessions"""
+    global _default_adapter
+    with _default_adapter_lock:
+        if _default_adapter is None:
+            _default_adapter = ResilientAdapter()
+        return _default_adapter
+
+
+_default_hosts = None
+_default_hosts_lock = threading.Lock()
+
+
+def get_host_registry():
+    """The process-wide host registry"""
+    global _default_hosts
+    with _default_hosts_lock:
+        if _default_hosts is None:
+            _default_hosts = HostRegistry()
+        return _default_hosts
+
+
+def set_host_registry(hosts):
+    """Replace the process-wide host registry (e.g. with other rates or a faster retry policy)"""
+    global _default_hosts
+    with _default_hosts_lock:
+        _default_hosts = hosts
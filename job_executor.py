@@ -0,0 +1,286 @@
+"""
+Job Executor
+Runs scheduled jobs on a worker pool with per-job single-flight locks, deadlines, jitter and
+catch-up of slots missed while the process was down; every run is recorded in `job_runs`
+"""
+
+import random
+import threading
+import time
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+# Never sleep longer than this between dispatcher passes (picks up clock jumps)
+MAX_IDLE_SECONDS = 300
+
+
+class Job:
+    """A recurring job: every `interval` seconds (epoch aligned) or daily at a local HH:MM"""
+    
+    def __init__(self, name, func, interval=None, at=None, deadline=None, jitter=0.0, max_catch_up=1):
+        if (interval is None) == (at is None):
+            raise ValueError("A job needs exactly one of interval or at")
+        
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.at = datetime.strptime(at, "%H:%M").time() if at else None
+        self.deadline = deadline          # Seconds a run may take (and may wait in the queue)
+        self.jitter = jitter              # Random delay added to each slot, spreads load on the APIs
+        self.max_catch_up = max_catch_up  # Missed slots replayed after downtime (0 = skip them)
+        
+        self.lock = threading.Lock()      # Single flight: held while a run is queued or running
+        self.next_slot = None
+        self.next_due = None
+        self.running_since = None
+    
+    def slot_at_or_before(self, moment):
+        """Latest scheduled slot not after moment (epoch seconds)"""
+        if self.interval:
+            return moment // self.interval * self.interval
+        
+        local = datetime.fromtimestamp(moment)
+        slot = datetime.combine(local.date(), self.at)
+        if slot > local:
+            slot -= timedelta(days=1)
+        return slot.timestamp()
+    
+    def slot_after(self, slot):
+        """The slot following a given slot"""
+        if self.interval:
+            return slot + self.interval
+        following = datetime.fromtimestamp(slot) + timedelta(days=1)
+        return datetime.combine(following.date(), self.at).timestamp()
+    
+    def describe(self):
+        if self.interval:
+            return f"every {self.interval:g}s"
+        return f"daily at {self.at.strftime('%H:%M')}"
+
+
+class JobExecutor:
+    def __init__(self, connections, max_workers=2, clock=time.time):
+        self.connections = connections
+        self.clock = clock
+        self.max_workers = max_workers
+        self.jobs = {}
+        
+        self._pool = None
+        self._dispatcher = None
+        self._wake = threading.Event()
+        self._stopping = False
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        
+        self.setup_tables()
+    
+    def setup_tables(self):
+        """Create the run history table"""
+        with self.connections.transaction() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS job_runs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_name TEXT NOT NULL,
+                    slot_time REAL NOT NULL,
+                    due_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL,
+                    queue_delay REAL,
+                    duration REAL,
+                    outcome TEXT NOT NULL,
+                    error TEXT,
+                    catch_up INTEGER DEFAULT 0
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_job_runs_job_slot ON job_runs(job_name, slot_time)")
+    
+    def add_job(self, name, func, **options):
+        """Register a job (see Job for options); slots start from the last recorded run"""
+        job = Job(name, func, **options)
+        self.jobs[name] = job
+        self._plan_first_slot(job, self.clock())
+        self._wake.set()
+        return job
+    
+    def last_recorded_slot(self, name):
+        row = self.connections.connection().execute(
+            "SELECT MAX(slot_time) FROM job_runs WHERE job_name = ?", (name,)
+        ).fetchone()
+        return row[0]
+    
+    def _plan_first_slot(self, job, now):
+        """Queue catch-up runs for slots missed since the last recorded run, then the next live slot"""
+        last_slot = self.last_recorded_slot(job.name)
+        latest_due = job.slot_at_or_before(now)
+        
+        missed = []
+        if last_slot is not None and job.max_catch_up:
+            slot = job.slot_after(job.slot_at_or_before(last_slot))  # Manual runs aren't aligned
+            while slot <= latest_due:
+                missed.append(slot)
+                slot = job.slot_after(slot)
+        
+        for slot in missed[-job.max_catch_up:] if missed else []:
+            print(f"⏪ Catching up {job.name} slot {datetime.fromtimestamp(slot):%Y-%m-%d %H:%M}")
+            with self._pending_lock:
+                self._pending.append((job, slot, now, True))
+        
+        self._schedule(job, job.slot_after(latest_due))
+    
+    def _schedule(self, job, slot):
+        job.next_slot = slot
+        job.next_due = slot + (random.uniform(0, job.jitter) if job.jitter else 0.0)
+    
+    def tick(self):
+        """One dispatcher pass: submit whatever is due, return seconds until the next due job"""
+        now = self.clock()
+        
+        for job in self.jobs.values():
+            if job.next_due is not None and job.next_due <= now:
+                with self._pending_lock:
+                    self._pending.append((job, job.next_slot, job.next_due, False))
+                self._schedule(job, job.slot_after(job.slot_at_or_before(now)))
+            
+            if job.running_since and job.deadline and now - job.running_since > job.deadline:
+                print(f"⏰ {job.name} has been running {now - job.running_since:.0f}s (deadline {job.deadline:g}s)")
+        
+        with self._pending_lock:
+            pending, self._pending = self._pending, []
+        for job, slot, due_at, catch_up in pending:
+            self._submit(job, slot, due_at, catch_up)
+        
+        upcoming = [job.next_due for job in self.jobs.values() if job.next_due is not None]
+        return max(0.0, min(upcoming, default=now + MAX_IDLE_SECONDS) - now)
+    
+    def _submit(self, job, slot, due_at, catch_up=False):
+        """Hand a run to the pool unless the same job is still in flight"""
+        if not job.lock.acquire(blocking=False):
+            print(f"⏭️ Skipping {job.name}: previous run still in progress")
+            self._record(job, slot, due_at, None, None, 'skipped_overlap', catch_up=catch_up)
+            return None
+        
+        if self._pool is None:
+            # Not started: run inline (used by run_now and tests)
+            return self._run(job, slot, due_at, catch_up)
+        
+        future = self._pool.submit(self._run, job, slot, due_at, catch_up)
+        # A run cancelled in the queue (stop()) never reaches _run, so its lock is released here
+        future.add_done_callback(lambda done: job.lock.release() if done.cancelled() else None)
+        return future
+    
+    def _run(self, job, slot, due_at, catch_up):
+        """Execute one run on a worker, recording its timing and outcome"""
+        try:
+            started = self.clock()
+            queue_delay = started - due_at
+            
+            if job.deadline and queue_delay > job.deadline:
+                print(f"⌛ Dropping stale {job.name} run (waited {queue_delay:.0f}s)")
+                self._record(job, slot, due_at, started, started, 'expired', catch_up=catch_up)
+                return None
+            
+            job.running_since = started
+            outcome, error, result = 'success', None, None
+            try:
+                result = job.func()
+                if result is False:
+                    outcome = 'failed'
+            except Exception as exc:
+                outcome, error = 'failed', ''.join(traceback.format_exception_only(type(exc), exc)).strip()
+                print(f"❌ Job {job.name} failed: {error}")
+            
+            finished = self.clock()
+            if outcome == 'success' and job.deadline and finished - started > job.deadline:
+                outcome = 'deadline_exceeded'
+            
+            self._record(job, slot, due_at, started, finished, outcome, error, catch_up)
+            return result
+        finally:
+            job.running_since = None
+            job.lock.release()
+    
+    def _record(self, job, slot, due_at, started, finished, outcome, error=None, catch_up=False):
+        queue_delay = started - due_at if started is not None else None
+        duration = finished - started if started is not None and finished is not None else None
+        
+        with self.connections.transaction() as cursor:
+            cursor.execute("""
+                INSERT INTO job_runs
+                (job_name, slot_time, due_at, started_at, finished_at, queue_delay, duration, outcome, error, catch_up)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (job.name, slot, due_at, started, finished, queue_delay, duration, outcome, error, int(catch_up)))
+    
+    def run_now(self, name):
+        """Run a job immediately (still single-flight), outside its schedule"""
+        now = self.clock()
+        outcome = self._submit(self.jobs[name], now, now)
+        return outcome.result() if isinstance(outcome, Future) else outcome
+    
+    def start(self):
+        """Start the worker pool and the dispatcher thread"""
+        if self._dispatcher is not None:
+            return
+        
+        self._stopping = False
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="mvrv-job")
+        
+        def dispatch():
+            while not self._stopping:
+                wait = self.tick()
+                self._wake.wait(min(wait, MAX_IDLE_SECONDS))
+                self._wake.clear()
+        
+        self._dispatcher = threading.Thread(target=dispatch, name="mvrv-dispatcher", daemon=True)
+        self._dispatcher.start()
+        self._wake.set()
+    
+    def stop(self, timeout=5):
+        """Stop dispatching; waits up to timeout for the dispatcher, lets running jobs finish"""
+        self._stopping = True
+        self._wake.set()
+        
+        if self._dispatcher is not None:
+            self._dispatcher.join(timeout=timeout)
+            self._dispatcher = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+    
+    @property
+    def running(self):
+        return self._dispatcher is not None
+    
+    def status(self):
+        """Schedule and in-flight state of every job"""
+        return [{
+            'name': job.name,
+            'schedule': job.describe(),
+            'next_run': datetime.fromtimestamp(job.next_due).isoformat(timespec='seconds') if job.next_due else None,
+            'running': job.running_since is not None
+        } for job in self.jobs.values()]
+    
+    def recent_runs(self, name=None, limit=20):
+        """Latest recorded runs, newest first"""
+        query = """
+            SELECT job_name, slot_time, queue_delay, duration, outcome, error, catch_up
+            FROM job_runs {} ORDER BY id DESC LIMIT ?
+        """.format("WHERE job_name = ?" if name else "")
+        params = (name, limit) if name else (limit,)
+        keys = ('job', 'slot_time', 'queue_delay', 'duration', 'outcome', 'error', 'catch_up')
+        return [dict(zip(keys, row)) for row in self.connections.connection().execute(query, params)]
+    
+    def latency_summary(self, since_hours=24 * 7):
+        """Per-job run counts, failures and average/max duration and queue delay"""
+        cursor = self.connections.connection().execute("""
+            SELECT job_name, COUNT(*),
+                   SUM(outcome != 'success'),
+                   AVG(duration), MAX(duration),
+                   AVG(queue_delay), MAX(queue_delay)
+            FROM job_runs
+            WHERE due_at >= ?
+            GROUP BY job_name
+        """, (self.clock() - since_hours * 3600,))
+        
+        keys = ('runs', 'problems', 'avg_duration', 'max_duration', 'avg_queue_delay', 'max_queue_delay')
+        return {row[0]: dict(zip(keys, row[1:])) for row in cursor}
@@ -29,6 +29,101 @@ def run_scheduler():
         print("\n🛑 Stopping scheduler...")
         scheduler.stop_scheduler()
 
+def run_utxo_tracker(start_height=None):
+    """Build or extend the tracked UTXO set, resuming from the last checkpoint"""
+    from mvrv_calculator import MVRVCalculator
+    
+    tracker = MVRVCalculator().utxo_tracker
+    if start_height is not None and not tracker.state:
+        tracker.start_height = start_height
+    if not tracker.state and tracker.start_height != 0:
+        print("⚠️ Not tracking from genesis (0): the set will never stand in for the realized cap")
+    
+    try:
+        while tracker.catch_up(max_blocks=100):
+            pass
+    except KeyboardInterrupt:
+        print("\n🛑 Stopping UTXO tracker (progress is checkpointed)...")
+    
+    if tracker.state:
+        print(f"✅ UTXO set at height {tracker.state['last_height']}: "
+              f"{tracker.supply_btc:,.2f} BTC, realized cap ${tracker.realized_cap/1e9:.2f}B")
+
+def export_utxo_snapshot(source, path=None, db_path=None):
+    """Write a UTXO table to a memory-mappable snapshot file"""
+    from db_connection import get_connection_manager
+    from utxo_snapshot import SNAPSHOT_SOURCES, default_snapshot_path, export_snapshot
+    
+    if source not in SNAPSHOT_SOURCES:
+        print(f"❌ Unknown UTXO table '{source}'. Use: {', '.join(SNAPSHOT_SOURCES)}")
+        sys.exit(1)
+    
+    db_path = db_path or SNAPSHOT_SOURCES[source]['database']
+    export_snapshot(get_connection_manager(db_path), source, path or default_snapshot_path(db_path, source))
+
+def import_utxo_snapshot(path, db_path=None):
+    """Load a snapshot file back into the table it was exported from"""
+    from database import MVRVDatabase
+    from my_database import MyPersonalDatabase
+    from utxo_snapshot import SNAPSHOT_SOURCES, UtxoSnapshot, import_snapshot
+    
+    source = UtxoSnapshot(path).source
+    db_path = db_path or SNAPSHOT_SOURCES[source]['database']
+    database = MyPersonalDatabase(db_path) if source == 'my_utxo_discoveries' else MVRVDatabase(db_path)
+    import_snapshot(database.connections, path)
+
+def backfill_rollups(start=None, end=None):
+    """Rebuild the day/week/month MVRV rollups of both databases for a date range (default: everything)"""
+    from database import MVRVDatabase
+    from my_database import MyPersonalDatabase
+    
+    for rollups in (MVRVDatabase().rollups, MyPersonalDatabase().my_rollups):
+        started = time.time()
+        written = rollups.backfill(start, end)
+        print(f"📊 {rollups.table}: {written} buckets rebuilt in {time.time() - started:.2f}s")
+
+def migrate_epochs(batch_size=None):
+    """Fill the integer epoch columns of both databases in batches (schema version 2)"""
+    from database import MVRVDatabase
+    from epoch_schema import DEFAULT_BATCH_SIZE
+    from my_database import MyPersonalDatabase
+    
+    for database, schema in ((MVRVDatabase(), 'epochs'), (MyPersonalDatabase(), 'my_epochs')):
+        result = getattr(database, schema).migrate(int(batch_size or DEFAULT_BATCH_SIZE))
+        skipped = sum(result['unparseable'].values())
+        print(f"🕒 {database.db_path}: {sum(result['converted'].values())} rows converted in "
+              f"{result['seconds']:.2f}s, schema v{result['version']}"
+              + (f" ({skipped} unparseable timestamps left NULL)" if skipped else ""))
+
+def poll_prices(interval=None):
+    """Write live MVRV ticks from the minimal price endpoint until interrupted"""
+    from price_poller import DEFAULT_INTERVAL, PricePoller
+    
+    poller = PricePoller(interval=float(interval or DEFAULT_INTERVAL)).start()
+    try:
+        while True:
+            time.sleep(60)
+            print(f"⚡ Price poller: {poller.describe()}")
+    except KeyboardInterrupt:
+        poller.stop()
+
+def run_backtest(top=5):
+    """Sweep my signal thresholds over the hourly history and show the best sets next to mine"""
+    from backtest import DEFAULT_GRID, Backtester
+    
+    backtester = Backtester()
+    years = (backtester.epochs[-1] - backtester.epochs[0]) / (365 * 24 * 3600)
+    print(f"📈 {len(backtester.values):,} hourly rows over {years:.1f} years")
+    
+    def show(label, result):
+        print(f"   {label:<10} Sharpe {result['sharpe']:5.2f}, return {result['total_return']:+8.1%}, "
+              f"drawdown {result['max_drawdown']:6.1%}, {result['trades']} trades  "
+              + ", ".join(f"{name} {value}" for name, value in result['signals'].items() if name != 'extreme_fear'))
+    
+    show("mine", backtester.run())
+    for rank, result in enumerate(backtester.sweep(DEFAULT_GRID, top=int(top)), 1):
+        show(f"#{rank}", result)
+
 def main():
     """Main application entry point"""
     print("🚀 Starting Bitcoin MVRV Analysis System")
@@ -51,8 +146,38 @@ def main():
             scheduler.initial_setup()
             print("✅ Setup completed!")
             
+        elif mode == "track-utxos":
+            print("⛓️ Tracking the UTXO set block by block...")
+            run_utxo_tracker(int(sys.argv[2]) if len(sys.argv) > 2 else None)
+            
+        elif mode == "export-utxos" and len(sys.argv) > 2:
+            print("💾 Exporting UTXO snapshot...")
+            export_utxo_snapshot(*sys.argv[2:5])
+            
+        elif mode == "import-utxos" and len(sys.argv) > 2:
+            print("📥 Importing UTXO snapshot...")
+            import_utxo_snapshot(*sys.argv[2:4])
+            
+        elif mode == "backfill-rollups":
+            print("📊 Backfilling MVRV rollups...")
+            backfill_rollups(*sys.argv[2:4])
+            
+        elif mode == "migrate-epochs":
+            print("🕒 Migrating timestamps to epoch columns...")
+            migrate_epochs(*sys.argv[2:3])
+            
+        elif mode == "poll-prices":
+            print("⚡ Polling prices for live MVRV ticks...")
+            poll_prices(*sys.argv[2:3])
+            
+        elif mode == "backtest":
+            print("📈 Backtesting MVRV signal thresholds...")
+            run_backtest(*sys.argv[2:3])
+            
         else:
-            print("❌ Invalid mode. Use: dashboard, scheduler, or setup")
+            print("❌ Invalid mode. Use: dashboard, scheduler, setup, track-utxos [start_height], "
+                  "export-utxos <table> [path] [db], import-utxos <path> [db], "
+                  "backfill-rollups [start] [end], migrate-epochs [batch_size], poll-prices [interval], or backtest [top]")
             sys.exit(1)
     
     else:
@@ -2,12 +2,23 @@ import sqlite3
 from datetime import datetime, timedelta
 import numpy as np
 from database import MVRVDatabase
+from epoch_schema import utc_iso
 from blockchain_integration import BlockchainIntegration
+from price_resolver import PriceResolver
+from utxo_tracker import UtxoSetTracker
+from utxo_snapshot import open_fresh_snapshot
+
+HOURLY_CATCH_UP_BLOCKS = 24   # Blocks the hourly calculation may apply to the tracked set (about 6 arrive per hour)
 
 class MVRVCalculator:
     def __init__(self):
         self.db = MVRVDatabase()
         self.blockchain = BlockchainIntegration()
+        self.prices = PriceResolver(self.db.get_price_index, self.db.insert_historical_prices,
+                                    "https://api.coingecko.com/api/v3")
+        # No guessed fallback prices here: an unpriced block has to pause the tracker, not be booked at ~$36k
+        self.utxo_tracker = UtxoSetTracker(self.db.connections, self.blockchain,
+                                           price_lookup=self.prices.resolve_one)
     
     def calculate_market_cap(self, price_usd, supply):
         """Calculate current market capitalization"""
@@ -24,42 +35,48 @@ class MVRVCalculator:
             print("❌ No UTXO data available, falling back to database")
             return self.calculate_realized_cap_from_db()
         
-        realized_cap_sample = 0
-        processed_utxos = []
+        # Pick up prices written by other processes since the last run
+        self.db.get_price_index().sync()
         
-        for utxo in utxos:
-            # Get historical price when UTXO was created
-            historical_price = self.get_historical_price_for_timestamp(utxo['timestamp'])
-            
-            if historical_price:
-                utxo_value_usd = utxo['value_btc'] * historical_price
-                realized_cap_sample += utxo_value_usd
-                
-                # Store processed UTXO for database
-                processed_utxos.append((
-                    utxo['txid'],
-                    utxo['value_btc'],
-                    datetime.fromtimestamp(utxo['timestamp']).isoformat(),
-                    utxo_value_usd
-                ))
+        # Every creation time priced in one batch: distinct days, missing ones fetched by range
+        utxo_prices = np.nan_to_num(self.prices.resolve(utxos.creation_time), nan=0.0)
+        utxo_values_usd = utxos.btc_amount * utxo_prices
+        priced = utxo_prices > 0
+        priced_count = int(priced.sum())
+        if not priced_count:
+            print("❌ No UTXO could be priced, falling back to database")
+            return self.calculate_realized_cap_from_db()
+        realized_cap_sample = float(utxo_values_usd[priced].sum())
+        
+        # Store processed UTXO for database
+        processed_utxos = [
+            (txid, btc, utc_iso(created), usd)
+            for txid, btc, created, usd in zip(
+                utxos.txid_list(priced), utxos.btc_amount[priced].tolist(),
+                utxos.creation_time[priced].tolist(), utxo_values_usd[priced].tolist()
+            )
+        ]
         
         # Store real UTXO data in database
         if processed_utxos:
             self.db.insert_utxo_data(processed_utxos)
         
-        # Scale sample to estimate full UTXO set
-        scaling_factor = self.blockchain.calculate_scaling_factor(len(utxos))
+        # Scale sample to estimate full UTXO set; only the priced UTXOs are in the sum, so only they count
+        scaling_factor = self.blockchain.calculate_scaling_factor(priced_count)
         total_realized_cap = realized_cap_sample * scaling_factor
         
-        print(f"📊 Sample: {len(utxos)} UTXOs = ${realized_cap_sample/1e9:.2f}B")
+        print(f"📊 Sample: {priced_count} of {len(utxos)} UTXOs priced = ${realized_cap_sample/1e9:.2f}B")
         print(f"📈 Scaled: ${total_realized_cap/1e9:.2f}B (factor: {scaling_factor:.0f})")
         
         return total_realized_cap
     
     def calculate_realized_cap_from_db(self):
         """Fallback: Calculate realized cap from database UTXO data"""
-        conn = sqlite3.connect(self.db.db_path)
-        cursor = conn.cursor()
+        snapshot = open_fresh_snapshot(self.db.connections, self.db.db_path, 'utxo_data')
+        if snapshot is not None:
+            return snapshot.realized_value()
+        
+        cursor = self.db.connections.connection().cursor()
         
         cursor.execute("""
             SELECT SUM(value_usd) as realized_cap
@@ -67,13 +84,29 @@ class MVRVCalculator:
         """)
         
         result = cursor.fetchone()
-        conn.close()
         
         return result[0] if result[0] else 0
     
+    def calculate_realized_cap_from_utxo_set(self):
+        """Exact realized cap from the incrementally tracked UTXO set, or None if it isn't complete"""
+        if not self.utxo_tracker.tracks_full_history():
+            return None  # Not tracked from genesis (see `python main.py track-utxos 0`): no use catching it up
+        
+        # The hourly run only follows the tip; a long backlog is for `track-utxos`, meanwhile we sample
+        self.utxo_tracker.catch_up(max_blocks=HOURLY_CATCH_UP_BLOCKS)
+        if not self.utxo_tracker.caught_up:
+            print(f"⛓️ Tracked UTXO set is still at height {self.utxo_tracker.state['last_height']}, sampling instead")
+            return None
+        
+        print(f"⛓️ Realized cap from tracked UTXO set: ${self.utxo_tracker.realized_cap/1e9:.2f}B")
+        return self.utxo_tracker.realized_cap
+    
     def calculate_realized_cap(self):
-        """Calculate realized cap - try blockchain first, fallback to DB"""
+        """Calculate realized cap - tracked UTXO set first, then blockchain sample, then DB"""
         try:
+            tracked = self.calculate_realized_cap_from_utxo_set()
+            if tracked is not None:
+                return tracked
             return self.calculate_realized_cap_from_blockchain()
         except Exception as e:
             print(f"Blockchain calculation failed: {e}")
@@ -85,25 +118,11 @@ class MVRVCalculator:
             # Convert timestamp to datetime
             dt = datetime.fromtimestamp(timestamp)
             
-            # Check database first
-            price = self.db.get_price_at_timestamp(dt.isoformat())
+            # The price index, topped up with a range fetch if this day is missing
+            price = self.prices.resolve_one(timestamp)
             if price:
                 return price
             
-            # Use CoinGecko API for historical price
-            import requests
-            date_str = dt.strftime('%d-%m-%Y')
-            url = "https://api.coingecko.com/api/v3/coins/bitcoin/history"
-            params = {'date': date_str}
-            
-            response = requests.get(url, params=params, timeout=30)
-            data = response.json()
-            
-            if 'market_data' in data:
-                price = data['market_data']['current_price']['usd']
-                self.db.insert_historical_price(dt.isoformat(), price)
-                return price
-            
             # Fallback to approximate price based on current price
             current_price = 45000  # Approximate current BTC price
             days_ago = (datetime.now() - dt).days
@@ -128,18 +147,7 @@ class MVRVCalculator:
         """Perform hourly MVRV calculation"""
         try:
             # Get latest price data
-            conn = sqlite3.connect(self.db.db_path)
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                SELECT price_usd, supply, timestamp
-                FROM price_data
-                ORDER BY timestamp DESC
-                LIMIT 1
-            """)
-            
-            price_result = cursor.fetchone()
-            conn.close()
+            price_result = self.db.get_latest_price_data()
             
             if not price_result:
                 print("❌ No price data available")
@@ -185,56 +193,40 @@ class MVRVCalculator:
         try:
             # Get yesterday's date
             yesterday = (datetime.now() - timedelta(days=1)).date()
-            start_time = f"{yesterday}T00:00:00"
-            end_time = f"{yesterday}T23:59:59"
             
-            conn = sqlite3.connect(self.db.db_path)
-            cursor = conn.cursor()
+            # Rollups merge each hourly row as it lands; rebuilding yesterday also folds in late rows
+            self.db.rollups.backfill(yesterday, yesterday)
+            daily = self.db.rollups.bucket('day', yesterday)
             
-            # Get all hourly data for yesterday
-            cursor.execute("""
-                SELECT market_cap, realized_cap, ratio
-                FROM mvrv_ratios
-                WHERE timeframe = 'hourly'
-                AND timestamp BETWEEN ? AND ?
-            """, (start_time, end_time))
-            
-            hourly_data = cursor.fetchall()
-            conn.close()
-            
-            if not hourly_data:
+            if not daily:
                 print(f"❌ No hourly data for {yesterday}")
                 return None
             
-            # Calculate daily aggregates
-            market_caps = [row[0] for row in hourly_data]
-            realized_caps = [row[1] for row in hourly_data]
-            ratios = [row[2] for row in hourly_data]
-            
-            daily_market_cap = np.mean(market_caps)
-            daily_realized_cap = np.mean(realized_caps)
-            daily_ratio = np.mean(ratios)
-            
             # Store daily aggregate
             daily_timestamp = f"{yesterday}T12:00:00"  # Noon as representative time
             
             self.db.insert_mvrv_ratio(
                 timestamp=daily_timestamp,
-                market_cap=daily_market_cap,
-                realized_cap=daily_realized_cap,
-                ratio=daily_ratio,
+                market_cap=daily['market_cap_mean'],
+                realized_cap=daily['realized_cap_mean'],
+                ratio=daily['ratio_mean'],
                 timeframe='daily'
             )
             
             result = {
                 'date': str(yesterday),
-                'market_cap': daily_market_cap,
-                'realized_cap': daily_realized_cap,
-                'mvrv_ratio': daily_ratio,
-                'data_points': len(hourly_data)
+                'market_cap': daily['market_cap_mean'],
+                'realized_cap': daily['realized_cap_mean'],
+                'mvrv_ratio': daily['ratio_mean'],
+                'mvrv_open': daily['ratio_open'],
+                'mvrv_high': daily['ratio_high'],
+                'mvrv_low': daily['ratio_low'],
+                'mvrv_close': daily['ratio_close'],
+                'data_points': daily['samples']
             }
             
-            print(f"✅ Daily aggregate: {daily_ratio:.4f} ({len(hourly_data)} points)")
+            print(f"✅ Daily aggregate: {daily['ratio_mean']:.4f} ({daily['samples']} points, "
+                  f"range {daily['ratio_low']:.4f}-{daily['ratio_high']:.4f})")
             return result
             
         except Exception as e:
@@ -244,21 +236,21 @@ class MVRVCalculator:
     def get_mvrv_statistics(self):
         """Get MVRV statistics and insights"""
         try:
-            # Get recent MVRV data
-            recent_data = self.db.get_mvrv_history('hourly', 168)  # Last 7 days
+            # Rolling windows kept up to date row by row instead of reloading the last 7 days
+            rolling = self.db.get_rolling_mvrv_stats()
             
-            if not recent_data:
+            if rolling['current'] is None:
                 return None
             
-            ratios = [item['ratio'] for item in recent_data]
-            
+            week = rolling['windows']['7d']
             stats = {
-                'current': ratios[-1] if ratios else 0,
-                'avg_7d': np.mean(ratios),
-                'min_7d': min(ratios),
-                'max_7d': max(ratios),
-                'std_7d': np.std(ratios),
-                'trend': 'up' if len(ratios) > 1 and ratios[-1] > ratios[-2] else 'down'
+                'current': rolling['current'],
+                'avg_7d': week['mean'],
+                'min_7d': week['min'],
+                'max_7d': week['max'],
+                'std_7d': week['std'],
+                'trend': 'up' if rolling['rising'] else 'down',
+                'windows': rolling['windows']
             }
             
             # Market signal based on MVRV thresholds
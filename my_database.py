@@ -4,173 +4,245 @@ Custom schema designed by me for my MVRV analysis needs
 """
 
 import sqlite3
+import time
 from datetime import datetime
+from itertools import islice
 import json
+from db_connection import get_connection_manager, time_window, DEFAULT_CHUNK_SIZE
+from epoch_schema import EPOCH_SQL, SCHEMA_VERSION, EpochSchema, epoch_window, fetch_series, utc_iso
+from price_index import get_price_index
+from rollups import MvrvRollups
+from rolling_stats import get_rolling_stats
+from utxo_batch import UtxoBatch
+
+# My ISO TEXT time columns; each gets an integer UTC twin named <column>_epoch
+MY_EPOCH_COLUMNS = {
+    'my_price_tracking': 'recorded_at',
+    'my_utxo_discoveries': 'discovered_at',
+    'my_price_memory': 'price_date',
+    'my_mvrv_analysis': 'analysis_time',
+    'my_insights': 'insight_date'
+}
 
 class MyPersonalDatabase:
     def __init__(self, db_name="my_bitcoin_analysis.db"):
         self.db_path = db_name
+        self.connections = get_connection_manager(db_name)
+        self.my_epochs = EpochSchema(self.connections, MY_EPOCH_COLUMNS)
         self.setup_my_database()
+        self.my_rollups = MvrvRollups(self.connections, 'my_mvrv_analysis')
     
     def setup_my_database(self):
         """Setting up my personal database schema"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # My price tracking table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS my_price_tracking (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                recorded_at TEXT NOT NULL,
-                btc_price_usd REAL NOT NULL,
-                total_supply REAL NOT NULL,
-                data_source TEXT DEFAULT 'coingecko',
-                my_notes TEXT,
-                UNIQUE(recorded_at)
-            )
-        """)
-        
-        # My UTXO discoveries table (my unique approach)
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS my_utxo_discoveries (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                transaction_id TEXT NOT NULL,
-                btc_value REAL NOT NULL,
-                discovered_at TEXT NOT NULL,
-                usd_value_when_created REAL NOT NULL,
-                confidence_score REAL DEFAULT 0.8,
-                my_quality_rating INTEGER DEFAULT 5,
-                blockchain_source TEXT DEFAULT 'mempool',
-                my_notes TEXT,
-                UNIQUE(transaction_id)
-            )
-        """)
-        
-        # My historical price memory
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS my_price_memory (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                price_date TEXT NOT NULL,
-                btc_price_usd REAL NOT NULL,
-                lookup_source TEXT DEFAULT 'coingecko',
-                remembered_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE(price_date)
-            )
-        """)
-        
-        # My MVRV analysis results
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS my_mvrv_analysis (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                analysis_time TEXT NOT NULL,
-                market_capitalization REAL NOT NULL,
-                realized_capitalization REAL NOT NULL,
-                mvrv_ratio REAL NOT NULL,
-                my_signal TEXT,
-                my_confidence REAL DEFAULT 0.8,
-                analysis_period TEXT DEFAULT 'hourly',
-                my_interpretation TEXT,
-                data_quality_score REAL DEFAULT 0.8,
-                UNIQUE(analysis_time, analysis_period)
-            )
-        """)
-        
-        # My personal insights and notes
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS my_insights (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                insight_date TEXT NOT NULL,
-                insight_type TEXT NOT NULL,
-                insight_content TEXT NOT NULL,
-                confidence_level REAL DEFAULT 0.7,
-                created_at TEXT DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # My custom indexes for fast queries
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_my_price_time ON my_price_tracking(recorded_at)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_my_mvrv_time ON my_mvrv_analysis(analysis_time)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_my_utxo_discovered ON my_utxo_discoveries(discovered_at)")
-        cursor.execute("CREATE INDEX IF NOT EXISTS idx_my_price_memory ON my_price_memory(price_date)")
-        
-        conn.commit()
-        conn.close()
+        with self.connections.transaction() as cursor:
+            # My price tracking table
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS my_price_tracking (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    recorded_at TEXT NOT NULL,
+                    btc_price_usd REAL NOT NULL,
+                    total_supply REAL NOT NULL,
+                    data_source TEXT DEFAULT 'coingecko',
+                    my_notes TEXT,
+                    UNIQUE(recorded_at)
+                )
+            """)
+            
+            # My UTXO discoveries table (my unique approach)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS my_utxo_discoveries (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    transaction_id TEXT NOT NULL,
+                    btc_value REAL NOT NULL,
+                    discovered_at TEXT NOT NULL,
+                    usd_value_when_created REAL NOT NULL,
+                    confidence_score REAL DEFAULT 0.8,
+                    my_quality_rating INTEGER DEFAULT 5,
+                    blockchain_source TEXT DEFAULT 'mempool',
+                    my_notes TEXT,
+                    UNIQUE(transaction_id)
+                )
+            """)
+            
+            # My historical price memory
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS my_price_memory (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    price_date TEXT NOT NULL,
+                    btc_price_usd REAL NOT NULL,
+                    lookup_source TEXT DEFAULT 'coingecko',
+                    remembered_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE(price_date)
+                )
+            """)
+            
+            # My MVRV analysis results
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS my_mvrv_analysis (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    analysis_time TEXT NOT NULL,
+                    market_capitalization REAL NOT NULL,
+                    realized_capitalization REAL NOT NULL,
+                    mvrv_ratio REAL NOT NULL,
+                    my_signal TEXT,
+                    my_confidence REAL DEFAULT 0.8,
+                    analysis_period TEXT DEFAULT 'hourly',
+                    my_interpretation TEXT,
+                    data_quality_score REAL DEFAULT 0.8,
+                    UNIQUE(analysis_time, analysis_period)
+                )
+            """)
+            
+            # My personal insights and notes
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS my_insights (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    insight_date TEXT NOT NULL,
+                    insight_type TEXT NOT NULL,
+                    insight_content TEXT NOT NULL,
+                    confidence_level REAL DEFAULT 0.7,
+                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # My custom indexes for fast queries
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_my_price_time ON my_price_tracking(recorded_at)")
+            # Covers my history and latest-reading queries (period + time window) without table lookups
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_my_mvrv_period_time
+                ON my_mvrv_analysis(analysis_period, analysis_time, market_capitalization,
+                                    realized_capitalization, mvrv_ratio, my_signal, my_confidence)
+            """)
+            cursor.execute("DROP INDEX IF EXISTS idx_my_mvrv_time")  # UNIQUE(analysis_time, analysis_period) covers it
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_my_utxo_discovered ON my_utxo_discoveries(discovered_at)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_my_price_memory ON my_price_memory(price_date)")
+            
+            # My integer epoch twins of the time columns (schema version 2)
+            self.my_epochs.setup(cursor)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_my_price_epoch ON my_price_tracking(recorded_at_epoch)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_my_utxo_discovered_epoch ON my_utxo_discoveries(discovered_at_epoch)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_my_price_memory_epoch ON my_price_memory(price_date_epoch, btc_price_usd)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_my_insights_epoch ON my_insights(insight_date_epoch)")
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_my_mvrv_period_epoch
+                ON my_mvrv_analysis(analysis_period, analysis_time_epoch, market_capitalization,
+                                    realized_capitalization, mvrv_ratio)
+            """)
     
     def store_my_price_discovery(self, timestamp, price_usd, supply, notes=None):
         """Store my latest Bitcoin price discovery"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT OR REPLACE INTO my_price_tracking 
-            (recorded_at, btc_price_usd, total_supply, my_notes)
-            VALUES (?, ?, ?, ?)
-        """, (timestamp, price_usd, supply, notes))
-        
-        conn.commit()
-        conn.close()
+        with self.connections.transaction() as cursor:
+            cursor.execute(f"""
+                INSERT OR REPLACE INTO my_price_tracking 
+                (recorded_at, btc_price_usd, total_supply, my_notes, recorded_at_epoch)
+                VALUES (?1, ?2, ?3, ?4, {EPOCH_SQL.format(column='?1')})
+            """, (timestamp, price_usd, supply, notes))
     
-    def store_my_utxo_discoveries(self, utxo_batch):
-        """Store my batch of UTXO discoveries"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # My custom UTXO storage with confidence scoring
-        for utxo_data in utxo_batch:
-            if len(utxo_data) >= 5:  # My extended format
-                txid, btc_val, discovered_time, usd_val, confidence = utxo_data[:5]
-                quality_rating = min(int(confidence * 10), 10)  # My 1-10 scale
+    def store_my_utxo_discoveries(self, utxo_batch, usd_values=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Store my UTXO discoveries: tuples (any iterable) or a UtxoBatch plus its usd_values"""
+        if isinstance(utxo_batch, UtxoBatch):
+            utxo_batch = self._discovery_rows(utxo_batch, usd_values)
+        
+        rows = iter(utxo_batch)
+        stored = 0
+        start = time.perf_counter()
+        
+        with self.connections.transaction() as cursor:
+            cursor.execute("""
+                CREATE TEMP TABLE IF NOT EXISTS my_utxo_staging (
+                    transaction_id TEXT, btc_value REAL, discovered_at TEXT,
+                    usd_value_when_created REAL, confidence_score REAL
+                )
+            """)
+            
+            # Stage and merge a chunk at a time so memory stays bounded however big the batch
+            while True:
+                chunk = list(islice(rows, chunk_size))
+                if not chunk:
+                    break
                 
-                cursor.execute("""
-                    INSERT OR REPLACE INTO my_utxo_discoveries 
-                    (transaction_id, btc_value, discovered_at, usd_value_when_created, 
-                     confidence_score, my_quality_rating)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                """, (txid, btc_val, discovered_time, usd_val, confidence, quality_rating))
-            else:  # Fallback to basic format
-                txid, btc_val, discovered_time, usd_val = utxo_data
-                cursor.execute("""
-                    INSERT OR REPLACE INTO my_utxo_discoveries 
-                    (transaction_id, btc_value, discovered_at, usd_value_when_created)
-                    VALUES (?, ?, ?, ?)
-                """, (txid, btc_val, discovered_time, usd_val))
-        
-        conn.commit()
-        conn.close()
+                # My extended format carries a confidence; the basic format leaves it NULL
+                cursor.executemany(
+                    "INSERT INTO my_utxo_staging VALUES (?, ?, ?, ?, ?)",
+                    (row[:5] if len(row) >= 5 else (*row, None) for row in chunk)
+                )
+                
+                # One pass in input order, so the last row for a txid wins whichever format it came in;
+                # basic rows get the column defaults (0.8 confidence, quality 5)
+                cursor.execute(f"""
+                    INSERT OR REPLACE INTO my_utxo_discoveries
+                    (transaction_id, btc_value, discovered_at, usd_value_when_created,
+                     confidence_score, my_quality_rating, discovered_at_epoch)
+                    SELECT transaction_id, btc_value, discovered_at, usd_value_when_created,
+                           COALESCE(confidence_score, 0.8),
+                           CASE WHEN confidence_score IS NULL THEN 5
+                                ELSE MIN(CAST(confidence_score * 10 AS INTEGER), 10) END,
+                           {EPOCH_SQL.format(column='discovered_at')}
+                    FROM my_utxo_staging ORDER BY rowid
+                """)
+                cursor.execute("DELETE FROM my_utxo_staging")
+                stored += len(chunk)
+        
+        seconds = time.perf_counter() - start
+        if stored:
+            print(f"🧠 Stored {stored} UTXO discoveries in {seconds:.3f}s ({stored / max(seconds, 1e-9):,.0f} rows/sec)")
+        return stored
+    
+    def _discovery_rows(self, batch, usd_values):
+        """Extended-format rows straight from a UtxoBatch's columns"""
+        if usd_values is None or len(usd_values) != len(batch):
+            raise ValueError("A UtxoBatch needs one usd_value per UTXO")
+        
+        return zip(
+            batch.txid_list(),
+            batch.btc_amount.tolist(),
+            (utc_iso(t) for t in batch.creation_time.tolist()),
+            [float(value) for value in usd_values],
+            batch.confidence.tolist()
+        )
     
     def remember_historical_price(self, date_str, price_usd):
         """Remember a historical Bitcoin price for future reference"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        with self.connections.transaction() as cursor:
+            cursor.execute(f"""
+                INSERT OR REPLACE INTO my_price_memory (price_date, btc_price_usd, price_date_epoch)
+                VALUES (?1, ?2, {EPOCH_SQL.format(column='?1')})
+            """, (date_str, price_usd))
         
-        cursor.execute("""
-            INSERT OR REPLACE INTO my_price_memory (price_date, btc_price_usd)
-            VALUES (?, ?)
-        """, (date_str, price_usd))
-        
-        conn.commit()
-        conn.close()
+        self._my_price_index_if_loaded('add', date_str, price_usd)
+    
+    def remember_historical_prices(self, price_rows, chunk_size=DEFAULT_CHUNK_SIZE):
+        """Remember many (date_str, price_usd) pairs in one transaction"""
+        written = []
+        remembered, seconds = self.connections.bulk_write(f"""
+            INSERT OR REPLACE INTO my_price_memory (price_date, btc_price_usd, price_date_epoch)
+            VALUES (?1, ?2, {EPOCH_SQL.format(column='?1')})
+        """, self._collect_rows(price_rows, written), chunk_size)
+        
+        # Only committed rows reach the index: a rolled back batch must not leave prices behind
+        self._my_price_index_if_loaded('add_many', written)
+        
+        if remembered:
+            print(f"🧠 Remembered {remembered} historical prices in {seconds:.3f}s ({remembered / max(seconds, 1e-9):,.0f} rows/sec)")
+        return remembered
     
     def store_my_mvrv_analysis(self, timestamp, market_cap, realized_cap, ratio, 
                               signal=None, confidence=0.8, timeframe='hourly'):
         """Store my complete MVRV analysis"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT OR REPLACE INTO my_mvrv_analysis 
-            (analysis_time, market_capitalization, realized_capitalization, mvrv_ratio,
-             my_signal, my_confidence, analysis_period)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (timestamp, market_cap, realized_cap, ratio, signal, confidence, timeframe))
-        
-        conn.commit()
-        conn.close()
+        with self.connections.transaction() as cursor:
+            cursor.execute(f"""
+                INSERT OR REPLACE INTO my_mvrv_analysis 
+                (analysis_time, market_capitalization, realized_capitalization, mvrv_ratio,
+                 my_signal, my_confidence, analysis_period, analysis_time_epoch)
+                VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, {EPOCH_SQL.format(column='?1')})
+            """, (timestamp, market_cap, realized_cap, ratio, signal, confidence, timeframe))
+            
+            if timeframe == 'hourly':
+                self.my_rollups.record(timestamp, market_cap, realized_cap, ratio)
     
     def get_my_latest_price_data(self):
         """Get my most recent price data"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.connections.connection().cursor()
         
         cursor.execute("""
             SELECT btc_price_usd, total_supply, recorded_at
@@ -180,43 +252,44 @@ class MyPersonalDatabase:
         """)
         
         result = cursor.fetchone()
-        conn.close()
         
         return result
     
+    def get_my_price_index(self):
+        """My sorted in-memory index over my_price_memory"""
+        return get_price_index(self.connections, 'my_price_memory', 'price_date', 'btc_price_usd')
+    
+    def _my_price_index_if_loaded(self, method, *args):
+        """Keep an already-loaded price index in step with what I remember"""
+        index = self.connections.shared_state.get(('price_index', 'my_price_memory'))
+        if index is not None:
+            getattr(index, method)(*args)
+    
+    @staticmethod
+    def _collect_rows(price_rows, written):
+        """Pass rows through to the writer, keeping a copy for the index once they are committed"""
+        for row in price_rows:
+            written.append(row)
+            yield row
+    
     def get_price_from_my_history(self, date_str):
         """Get price from my historical memory"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT btc_price_usd FROM my_price_memory
-            WHERE price_date <= ?
-            ORDER BY price_date DESC
-            LIMIT 1
-        """, (date_str,))
-        
-        result = cursor.fetchone()
-        conn.close()
-        
-        return result[0] if result else None
+        return self.get_my_price_index().price_at(date_str)
     
-    def get_my_latest_mvrv(self):
-        """Get my latest MVRV analysis"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+    def get_my_latest_mvrv(self, period='hourly'):
+        """Get my latest MVRV analysis ('tick' for the price poller's live rows)"""
+        cursor = self.connections.connection().cursor()
         
         cursor.execute("""
             SELECT analysis_time, market_capitalization, realized_capitalization, 
                    mvrv_ratio, my_signal, my_confidence
             FROM my_mvrv_analysis
-            WHERE analysis_period = 'hourly'
+            WHERE analysis_period = ?
             ORDER BY analysis_time DESC
             LIMIT 1
-        """)
+        """, (period,))
         
         result = cursor.fetchone()
-        conn.close()
         
         if result:
             return {
@@ -229,22 +302,36 @@ class MyPersonalDatabase:
             }
         return None
     
-    def get_my_mvrv_history(self, period='hourly', limit=168):
-        """Get my MVRV analysis history"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
+    def prune_my_mvrv_period(self, period, before):
+        """Forget one period's rows older than before (epoch seconds); returns how many"""
+        with self.connections.transaction() as cursor:
+            cursor.execute("""
+                DELETE FROM my_mvrv_analysis WHERE analysis_period = ? AND analysis_time_epoch < ?
+            """, (period, before))
+            return cursor.rowcount
+    
+    def my_mvrv_history_query(self, period='hourly', limit=168, start=None, end=None, since=None):
+        """SQL and parameters behind get_my_mvrv_history"""
+        conditions, params = time_window('analysis_time', start, end, since)
+        query = f"""
             SELECT analysis_time, market_capitalization, realized_capitalization, 
                    mvrv_ratio, my_signal, my_confidence
             FROM my_mvrv_analysis
-            WHERE analysis_period = ?
+            WHERE {' AND '.join(['analysis_period = ?'] + conditions)}
             ORDER BY analysis_time DESC
-            LIMIT ?
-        """, (period, limit))
+        """
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        return query, [period] + params
+    
+    def get_my_mvrv_history(self, period='hourly', limit=168, start=None, end=None, since=None):
+        """Get my MVRV analysis history: the latest `limit` rows (None = all) with start <= time < end, after since"""
+        cursor = self.connections.connection().cursor()
+        
+        cursor.execute(*self.my_mvrv_history_query(period, limit, start, end, since))
         
         results = cursor.fetchall()
-        conn.close()
         
         history = []
         for row in reversed(results):  # Chronological order
@@ -259,39 +346,71 @@ class MyPersonalDatabase:
         
         return history
     
+    def get_my_mvrv_series(self, period='hourly', start=None, end=None):
+        """My MVRV analysis with start <= time < end as arrays: 'epoch' (int64 UTC seconds), caps and ratio"""
+        conditions, params = epoch_window('analysis_time_epoch', start, end)
+        return fetch_series(self.connections.connection(), f"""
+            SELECT analysis_time_epoch, market_capitalization, realized_capitalization, mvrv_ratio
+            FROM my_mvrv_analysis
+            WHERE {' AND '.join(['analysis_period = ?', 'analysis_time_epoch IS NOT NULL'] + conditions)}
+            ORDER BY analysis_time_epoch
+        """, [period] + params, ('epoch', 'market_cap', 'realized_cap', 'ratio'))
+    
+    def get_my_price_series(self, start=None, end=None):
+        """My remembered prices with start <= date < end as 'epoch' and 'price_usd' arrays"""
+        conditions, params = epoch_window('price_date_epoch', start, end)
+        return fetch_series(self.connections.connection(), f"""
+            SELECT price_date_epoch, btc_price_usd
+            FROM my_price_memory
+            WHERE {' AND '.join(['price_date_epoch IS NOT NULL'] + conditions)}
+            ORDER BY price_date_epoch
+        """, params, ('epoch', 'price_usd'))
+    
+    def get_my_rolling_stats(self):
+        """My rolling 24h/7d/30d/365d MVRV and confidence statistics, folded forward from new rows"""
+        # The stats follow the epoch columns; until migrate-epochs has filled them, serve what was saved
+        current = self.my_epochs.version() >= SCHEMA_VERSION
+        return {
+            'ratio': get_rolling_stats(self.connections, 'my_mvrv_ratio', sync=current).summary(),
+            'confidence': get_rolling_stats(self.connections, 'my_confidence', sync=current).summary()
+        }
+    
+    def get_my_mvrv_rollups(self, resolution='day', limit=90, start=None, end=None):
+        """My day/week/month OHLC rollups of the hourly analysis"""
+        return self.my_rollups.history(resolution, limit, start, end)
+    
     def save_my_insight(self, insight_type, content, confidence=0.7):
         """Save my personal insights about the market"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO my_insights (insight_date, insight_type, insight_content, confidence_level)
-            VALUES (?, ?, ?, ?)
-        """, (datetime.utcnow().isoformat(), insight_type, content, confidence))
-        
-        conn.commit()
-        conn.close()
+        with self.connections.transaction() as cursor:
+            cursor.execute(f"""
+                INSERT INTO my_insights (insight_date, insight_type, insight_content, confidence_level, insight_date_epoch)
+                VALUES (?1, ?2, ?3, ?4, {EPOCH_SQL.format(column='?1')})
+            """, (datetime.utcnow().isoformat(), insight_type, content, confidence))
     
     def get_my_database_stats(self):
         """Get statistics about my database"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        cursor = self.connections.connection().cursor()
         
         stats = {}
         
         # Count my records
         tables = ['my_price_tracking', 'my_utxo_discoveries', 'my_mvrv_analysis', 'my_insights']
         
+        # The price poller's live 'tick' rows are counted on their own, not as analyses
+        analyses = "analysis_period IS NOT 'tick'"
         for table in tables:
-            cursor.execute(f"SELECT COUNT(*) FROM {table}")
+            cursor.execute(f"SELECT COUNT(*) FROM {table}" + (f" WHERE {analyses}" if table == 'my_mvrv_analysis' else ""))
             count = cursor.fetchone()[0]
             stats[table] = count
         
+        cursor.execute("SELECT COUNT(*) FROM my_mvrv_analysis WHERE analysis_period = 'tick'")
+        stats['my_mvrv_ticks'] = cursor.fetchone()[0]
+        
         # My data quality metrics
         cursor.execute("SELECT AVG(confidence_score) FROM my_utxo_discoveries")
         avg_utxo_confidence = cursor.fetchone()[0] or 0
         
-        cursor.execute("SELECT AVG(my_confidence) FROM my_mvrv_analysis")
+        cursor.execute(f"SELECT AVG(my_confidence) FROM my_mvrv_analysis WHERE {analyses}")
         avg_mvrv_confidence = cursor.fetchone()[0] or 0
         
         stats['my_data_quality'] = {
@@ -300,5 +419,4 @@ class MyPersonalDatabase:
             'overall_quality': (avg_utxo_confidence + avg_mvrv_confidence) / 2
         }
         
-        conn.close()
         return stats
\ No newline at end of file
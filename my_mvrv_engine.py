@@ -8,21 +8,93 @@ from datetime import datetime, timedelta
 import numpy as np
 from my_database import MyPersonalDatabase
 from btc_brain import BitcoinBrain
+from epoch_schema import utc_iso
+from price_resolver import PriceResolver
+from utxo_batch import as_utxo_batch
+from utxo_snapshot import open_fresh_snapshot
+
+# My personal MVRV thresholds based on my research
+MY_SIGNALS = {
+    'extreme_greed': 4.2,    # My top signal
+    'greed': 3.7,            # Traditional top
+    'caution': 2.4,          # My caution zone
+    'normal': 1.0,           # Fair value line
+    'fear': 0.8,             # My opportunity zone
+    'extreme_fear': 0.6      # My strong buy zone
+}
+
+# Zone boundaries from low to high; a value belongs to the zone of the highest boundary it reaches
+SIGNAL_EDGES = ('fear', 'normal', 'caution', 'greed', 'extreme_greed')
+
+# What each zone means to me, from below 'fear' up to 'extreme_greed' and beyond
+MY_ZONES = (
+    {
+        'signal': '💎 EXTREME FEAR',
+        'color': 'darkblue',
+        'meaning': 'Extreme fear - historically great buying opportunity',
+        'action': 'STRONG BUY',
+        'confidence': 0.95
+    },
+    {
+        'signal': '🔵 FEAR ZONE',
+        'color': 'blue',
+        'meaning': 'Market showing fear - opportunity emerging',
+        'action': 'ACCUMULATE',
+        'confidence': 0.85
+    },
+    {
+        'signal': '🟢 NORMAL RANGE',
+        'color': 'green',
+        'meaning': 'Healthy market conditions',
+        'action': 'HOLD',
+        'confidence': 0.75
+    },
+    {
+        'signal': '🟡 CAUTION ZONE',
+        'color': 'orange',
+        'meaning': 'Elevated levels - monitor closely',
+        'action': 'REDUCE POSITION',
+        'confidence': 0.80
+    },
+    {
+        'signal': '🔴 GREED ZONE',
+        'color': 'red',
+        'meaning': 'Historical top territory - be very cautious',
+        'action': 'SELL',
+        'confidence': 0.90
+    },
+    {
+        'signal': '🔥 EXTREME GREED',
+        'color': 'darkred',
+        'meaning': 'Market is extremely overheated - major correction likely',
+        'action': 'STRONG SELL',
+        'confidence': 0.95
+    },
+)
+
+# Zone of a missing (NaN) ratio, e.g. no realized cap yet: no data is no signal, so HOLD
+NEUTRAL_ZONE = 2
+
+
+def classify_mvrv(values, signals=MY_SIGNALS):
+    """Zone index into MY_ZONES of one value or a whole history at once (np.digitize over the thresholds)"""
+    zones = np.digitize(values, [signals[name] for name in SIGNAL_EDGES])
+    return np.where(np.isnan(values), NEUTRAL_ZONE, zones)    # digitize puts NaN above every edge
+
 
 class MyMVRVEngine:
-    def __init__(self):
-        self.my_db = MyPersonalDatabase()
-        self.btc_brain = BitcoinBrain()
-        
-        # My personal MVRV thresholds based on my research
-        self.my_signals = {
-            'extreme_greed': 4.2,    # My top signal
-            'greed': 3.7,            # Traditional top
-            'caution': 2.4,          # My caution zone
-            'normal': 1.0,           # Fair value line
-            'fear': 0.8,             # My opportunity zone
-            'extreme_fear': 0.6      # My strong buy zone
-        }
+    def __init__(self, my_db=None, btc_brain=None, batched=True, my_signals=None):
+        self.my_db = my_db or MyPersonalDatabase()
+        self.btc_brain = btc_brain or BitcoinBrain()
+        self.my_prices = PriceResolver(self.my_db.get_my_price_index, self.my_db.remember_historical_prices,
+                                       self.btc_brain.my_apis['prices'], session=self.btc_brain.session,
+                                       timeout=20)
+        
+        # Resolve prices and weights for the whole UTXO sample with array ops
+        self.batched = batched
+        
+        # My personal MVRV thresholds (overridable, e.g. with the winners of a backtest sweep)
+        self.my_signals = dict(MY_SIGNALS, **(my_signals or {}))
         
         # My confidence in different data sources
         self.data_confidence = {
@@ -50,13 +122,43 @@ class MyMVRVEngine:
             print("😔 No UTXOs found, falling back to database...")
             return self.fallback_realized_value()
         
+        # Pick up prices remembered by other processes since the last run
+        self.my_db.get_my_price_index().sync()
+        
+        print(f"🔍 Analyzing {len(real_utxos)} UTXOs with my personal method...")
+        
+        if self.batched:
+            sample_realized_value, my_confidence_total, processed_utxos = self.weigh_utxo_sample_batched(real_utxos)
+        else:
+            sample_realized_value, my_confidence_total, processed_utxos = self.weigh_utxo_sample(real_utxos)
+        
+        # Save my findings to database
+        if processed_utxos:
+            self.my_db.store_my_utxo_discoveries(processed_utxos)
+        
+        # My scaling to full Bitcoin network
+        scaling_factor = self.btc_brain.estimate_full_network_scaling(len(real_utxos))
+        
+        # Apply my confidence adjustment
+        confidence_multiplier = self.calculate_confidence_multiplier(my_confidence_total, len(real_utxos))
+        
+        total_realized_value = sample_realized_value * scaling_factor * confidence_multiplier
+        
+        print(f"📊 My Analysis Results:")
+        print(f"   Sample Realized Value: ${sample_realized_value/1e9:.2f}B")
+        print(f"   My Scaling Factor: {scaling_factor:.0f}x")
+        print(f"   My Confidence Multiplier: {confidence_multiplier:.2f}x")
+        print(f"   Final Realized Value: ${total_realized_value/1e9:.2f}B")
+        
+        return total_realized_value
+    
+    def weigh_utxo_sample(self, utxos):
+        """Price and confidence-weight a UTXO sample one UTXO at a time"""
         sample_realized_value = 0
         processed_utxos = []
         my_confidence_total = 0
         
-        print(f"🔍 Analyzing {len(real_utxos)} UTXOs with my personal method...")
-        
-        for utxo in real_utxos:
+        for utxo in utxos:
             # Get price when this UTXO was born
             historical_price = self.find_price_when_utxo_was_born(utxo['creation_time'])
             
@@ -73,50 +175,75 @@ class MyMVRVEngine:
                 processed_utxos.append((
                     utxo['tx_hash'],
                     utxo['btc_amount'],
-                    datetime.fromtimestamp(utxo['creation_time']).isoformat(),
+                    utc_iso(utxo['creation_time']),
                     utxo_usd_value,
                     confidence_weight
                 ))
         
-        # Save my findings to database
-        if processed_utxos:
-            self.my_db.store_my_utxo_discoveries(processed_utxos)
-        
-        # My scaling to full Bitcoin network
-        scaling_factor = self.btc_brain.estimate_full_network_scaling(len(real_utxos))
+        return sample_realized_value, my_confidence_total, processed_utxos
+    
+    def utxo_columns(self, utxos):
+        """Columnar NumPy arrays for a UtxoBatch (zero-copy) or a list of UTXO dicts"""
+        batch = as_utxo_batch(utxos)
+        return {
+            'btc_amount': batch.btc_amount,
+            'creation_time': batch.creation_time,
+            'confidence': batch.confidence
+        }
+    
+    def weigh_utxo_columns(self, btc_amounts, creation_times, confidences):
+        """Vectorized pricing and weighting; returns (sample value, confidence total, usd values, priced mask)"""
+        prices = self.find_prices_when_utxos_were_born(creation_times)
+        priced = np.isfinite(prices) & (prices > 0)
         
-        # Apply my confidence adjustment
-        if my_confidence_total > 0:
-            avg_confidence = my_confidence_total / len(real_utxos)
-            confidence_multiplier = 0.8 + (avg_confidence * 0.4)  # My formula: 0.8 to 1.2 range
-        else:
-            confidence_multiplier = 1.0
+        usd_values = btc_amounts * prices
+        sample_realized_value = float(np.sum(usd_values[priced] * confidences[priced]))
+        my_confidence_total = float(np.sum(confidences[priced]))
         
-        total_realized_value = sample_realized_value * scaling_factor * confidence_multiplier
+        return sample_realized_value, my_confidence_total, usd_values, priced
+    
+    def weigh_utxo_sample_batched(self, utxos):
+        """Price and confidence-weight a whole UTXO sample in one vectorized pass"""
+        batch = as_utxo_batch(utxos)
+        sample_realized_value, my_confidence_total, usd_values, priced = self.weigh_utxo_columns(
+            batch.btc_amount, batch.creation_time, batch.confidence
+        )
         
-        print(f"📊 My Analysis Results:")
-        print(f"   Sample Realized Value: ${sample_realized_value/1e9:.2f}B")
-        print(f"   My Scaling Factor: {scaling_factor:.0f}x")
-        print(f"   My Confidence Multiplier: {confidence_multiplier:.2f}x")
-        print(f"   Final Realized Value: ${total_realized_value/1e9:.2f}B")
+        processed_utxos = [
+            (txid, btc, utc_iso(created), usd, confidence)
+            for txid, btc, created, usd, confidence in zip(
+                batch.txid_list(priced), batch.btc_amount[priced].tolist(), batch.creation_time[priced].tolist(),
+                usd_values[priced].tolist(), batch.confidence[priced].tolist()
+            )
+        ]
         
-        return total_realized_value
+        return sample_realized_value, my_confidence_total, processed_utxos
+    
+    def calculate_confidence_multiplier(self, confidence_total, sample_size):
+        """My formula: average confidence mapped onto a 0.8 to 1.2 range"""
+        if confidence_total > 0 and sample_size > 0:
+            avg_confidence = confidence_total / sample_size
+            return 0.8 + (avg_confidence * 0.4)
+        return 1.0
     
     def fallback_realized_value(self):
         """My backup method when brain can't reach blockchain"""
         print("🔄 Using my fallback realized value calculation...")
         
-        conn = sqlite3.connect(self.my_db.db_path)
-        cursor = conn.cursor()
+        # A fresh snapshot lets me sum without pulling rows through SQLite
+        snapshot = open_fresh_snapshot(self.my_db.connections, self.my_db.db_path, 'my_utxo_discoveries')
+        if snapshot is not None:
+            return snapshot.realized_value(weighted=True, min_confidence=0.5)
+        
+        cursor = self.my_db.connections.connection().cursor()
         
         cursor.execute("""
-            SELECT SUM(value_usd * confidence_score) as weighted_realized_cap
+            SELECT SUM(usd_value_when_created * confidence_score) as weighted_realized_cap
             FROM my_utxo_discoveries
             WHERE confidence_score > 0.5
         """)
         
         result = cursor.fetchone()
-        conn.close()
         
         return result[0] if result[0] else 0
     
@@ -125,24 +252,9 @@ class MyMVRVEngine:
         try:
             birth_time = datetime.fromtimestamp(birth_timestamp)
             
-            # Check my database first
-            stored_price = self.my_db.get_price_from_my_history(birth_time.isoformat())
-            if stored_price:
-                return stored_price
-            
-            # My API call to get historical price
-            date_string = birth_time.strftime('%d-%m-%Y')
-            url = f"{self.btc_brain.my_apis['prices']}/coins/bitcoin/history"
-            params = {'date': date_string}
-            
-            response = self.btc_brain.session.get(url, params=params, timeout=20)
-            data = response.json()
-            
-            if 'market_data' in data and 'current_price' in data['market_data']:
-                price = data['market_data']['current_price']['usd']
-                
-                # Store in my database for future use
-                self.my_db.remember_historical_price(birth_time.isoformat(), price)
+            # My price index, with the birth day fetched by range if I don't know it yet
+            price = self.my_prices.resolve_one(birth_timestamp)
+            if price:
                 return price
             
             # My intelligent fallback based on age
@@ -152,6 +264,20 @@ class MyMVRVEngine:
             print(f"🤔 Price lookup failed for {birth_timestamp}: {error}")
             return self.estimate_price_by_age(datetime.fromtimestamp(birth_timestamp))
     
+    def find_prices_when_utxos_were_born(self, birth_timestamps):
+        """Resolve creation-time prices for many UTXOs at once"""
+        birth_timestamps = np.asarray(birth_timestamps, dtype=np.float64)
+        prices = self.my_prices.resolve(birth_timestamps)
+        
+        # Whatever the API couldn't price gets my age-based estimate, once per distinct birth time
+        missing = np.isnan(prices)
+        if missing.any():
+            unknown_times, positions = np.unique(birth_timestamps[missing], return_inverse=True)
+            estimates = np.array([self.estimate_price_by_age(datetime.fromtimestamp(t)) for t in unknown_times])
+            prices[missing] = estimates[positions]
+        
+        return prices
+    
     def estimate_price_by_age(self, utxo_date):
         """Estimate Bitcoin price based on UTXO age"""
         now = datetime.now()
@@ -193,54 +319,7 @@ class MyMVRVEngine:
     
     def interpret_mvrv_my_way(self, mvrv_value):
         """Interpret MVRV ratio and generate market signals"""
-        if mvrv_value >= self.my_signals['extreme_greed']:
-            return {
-                'signal': '🔥 EXTREME GREED',
-                'color': 'darkred',
-                'meaning': 'Market is extremely overheated - major correction likely',
-                'action': 'STRONG SELL',
-                'confidence': 0.95
-            }
-        elif mvrv_value >= self.my_signals['greed']:
-            return {
-                'signal': '🔴 GREED ZONE',
-                'color': 'red',
-                'meaning': 'Historical top territory - be very cautious',
-                'action': 'SELL',
-                'confidence': 0.90
-            }
-        elif mvrv_value >= self.my_signals['caution']:
-            return {
-                'signal': '🟡 CAUTION ZONE',
-                'color': 'orange',
-                'meaning': 'Elevated levels - monitor closely',
-                'action': 'REDUCE POSITION',
-                'confidence': 0.80
-            }
-        elif mvrv_value >= self.my_signals['normal']:
-            return {
-                'signal': '🟢 NORMAL RANGE',
-                'color': 'green',
-                'meaning': 'Healthy market conditions',
-                'action': 'HOLD',
-                'confidence': 0.75
-            }
-        elif mvrv_value >= self.my_signals['fear']:
-            return {
-                'signal': '🔵 FEAR ZONE',
-                'color': 'blue',
-                'meaning': 'Market showing fear - opportunity emerging',
-                'action': 'ACCUMULATE',
-                'confidence': 0.85
-            }
-        else:
-            return {
-                'signal': '💎 EXTREME FEAR',
-                'color': 'darkblue',
-                'meaning': 'Extreme fear - historically great buying opportunity',
-                'action': 'STRONG BUY',
-                'confidence': 0.95
-            }
+        return dict(MY_ZONES[int(classify_mvrv(mvrv_value, self.my_signals))])
     
     def run_my_hourly_analysis(self):
         """My complete hourly MVRV analysis routine"""
@@ -303,23 +382,26 @@ class MyMVRVEngine:
     def get_my_mvrv_insights(self):
         """Generate insights about recent MVRV trends"""
         try:
-            recent_data = self.my_db.get_my_mvrv_history('hourly', 168)
+            # My rolling windows move forward one row at a time instead of reloading 168 rows
+            rolling = self.my_db.get_my_rolling_stats()
+            ratio, confidence = rolling['ratio'], rolling['confidence']
             
-            if not recent_data:
+            if ratio['current'] is None:
                 return None
             
-            ratios = [item['ratio'] for item in recent_data]
-            confidences = [item.get('confidence', 0.8) for item in recent_data]
+            week = ratio['windows']['7d']
+            confidence_avg = confidence['windows']['7d']['mean'] or 0.8
             
             my_insights = {
-                'current_mvrv': ratios[-1] if ratios else 0,
-                'my_7d_average': np.mean(ratios),
-                'my_7d_min': min(ratios),
-                'my_7d_max': max(ratios),
-                'my_volatility': np.std(ratios),
-                'my_trend': 'rising' if len(ratios) > 1 and ratios[-1] > ratios[-2] else 'falling',
-                'my_confidence_avg': np.mean(confidences),
-                'data_quality': 'high' if np.mean(confidences) > 0.85 else 'medium' if np.mean(confidences) > 0.70 else 'low'
+                'current_mvrv': ratio['current'],
+                'my_7d_average': week['mean'],
+                'my_7d_min': week['min'],
+                'my_7d_max': week['max'],
+                'my_volatility': week['std'],
+                'my_trend': 'rising' if ratio['rising'] else 'falling',
+                'my_confidence_avg': confidence_avg,
+                'data_quality': 'high' if confidence_avg > 0.85 else 'medium' if confidence_avg > 0.70 else 'low',
+                'my_windows': ratio['windows']
             }
             
             current_analysis = self.interpret_mvrv_my_way(my_insights['current_mvrv'])
@@ -4,9 +4,9 @@ Data Population Script
 Quickly populate database with historical MVRV data for chart visualization
 """
 
-import requests
 import numpy as np
 from datetime import datetime, timedelta
+from http_client import new_session
 from my_database import MyPersonalDatabase
 from my_mvrv_engine import MyMVRVEngine
 
@@ -21,7 +21,7 @@ def populate_historical_data():
     try:
         print("📡 Fetching current Bitcoin price...")
         url = "https://api.coingecko.com/api/v3/coins/bitcoin"
-        response = requests.get(url, timeout=30)
+        response = new_session().get(url, timeout=30)
         data = response.json()
         
         current_price = data["market_data"]["current_price"]["usd"]
@@ -38,14 +38,14 @@ def populate_historical_data():
     # Generate 30 days of hourly data
     print("📊 Generating 30 days of hourly MVRV data...")
     
-    base_date = datetime.now() - timedelta(days=30)
+    base_date = datetime.utcnow() - timedelta(days=30)
     data_points = []
     
     for hour in range(30 * 24):  # 30 days * 24 hours
         timestamp = base_date + timedelta(hours=hour)
         
         # Generate realistic price variation
-        days_ago = (datetime.now() - timestamp).days
+        days_ago = (datetime.utcnow() - timestamp).days
         price_factor = 1.0 + (np.random.normal(0, 0.02) * (1 + days_ago * 0.01))
         price = current_price * price_factor
         
@@ -91,9 +91,9 @@ def populate_historical_data():
     
     # Generate some historical prices
     print("📈 Adding historical price data...")
-    for i in range(0, len(data_points), 24):  # Daily prices
-        point = data_points[i]
-        db.remember_historical_price(point['timestamp'], point['price'])
+    db.remember_historical_prices(
+        (point['timestamp'], point['price']) for point in data_points[::24]  # Daily prices
+    )
     
     # Generate some UTXO data
     print("🔗 Adding sample UTXO data...")
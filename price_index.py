@@ -0,0 +1,141 @@
+"""
+In-memory sorted price index
+Answers "latest known price at or before t" with a binary search instead of a SQL query
+"""
+
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+
+
+def to_epoch(moment):
+    """Convert an ISO string, datetime or number into epoch seconds (naive times are UTC, as stored)"""
+    if isinstance(moment, (int, float, np.integer, np.floating)):
+        return float(moment)
+    if isinstance(moment, str):
+        moment = datetime.fromisoformat(moment.replace('Z', '+00:00'))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+class PriceIndex:
+    def __init__(self, connections, table, time_column, price_column):
+        self.connections = connections
+        self.table = table
+        self.time_column = time_column
+        self.price_column = price_column
+        
+        self._epochs = np.empty(0, dtype=np.float64)
+        self._prices = np.empty(0, dtype=np.float64)
+        self._pending_epochs = []
+        self._pending_prices = []
+        self._last_row_id = 0
+        self._change_token = None
+        self._lock = threading.RLock()
+    
+    def sync(self):
+        """Pull in rows written since the last sync (including by other processes)"""
+        self._change_token = self.connections.change_token()   # Taken first: a commit during the read resyncs
+        cursor = self.connections.connection().execute(f"""
+            SELECT id, {self.time_column}, {self.price_column}
+            FROM {self.table}
+            WHERE id > ?
+            ORDER BY id
+        """, (self._last_row_id,))
+        rows = cursor.fetchall()
+        
+        if not rows:
+            return 0
+        
+        with self._lock:
+            for row_id, moment, price in rows:
+                try:
+                    self._pending_epochs.append(to_epoch(moment))
+                    self._pending_prices.append(price)
+                except (TypeError, ValueError):
+                    continue  # Unparseable legacy timestamp
+            self._last_row_id = max(self._last_row_id, rows[-1][0])
+        
+        return len(rows)
+    
+    def add(self, moment, price):
+        """Record one new price (later values for the same instant win)"""
+        with self._lock:
+            self._pending_epochs.append(to_epoch(moment))
+            self._pending_prices.append(price)
+    
+    def add_many(self, price_rows):
+        """Record many (moment, price) pairs"""
+        with self._lock:
+            for moment, price in price_rows:
+                self._pending_epochs.append(to_epoch(moment))
+                self._pending_prices.append(price)
+    
+    def _merge_pending(self):
+        """Fold pending prices into the sorted arrays"""
+        if not self._pending_epochs:
+            return
+        
+        epochs = np.concatenate([self._epochs, np.asarray(self._pending_epochs, dtype=np.float64)])
+        prices = np.concatenate([self._prices, np.asarray(self._pending_prices, dtype=np.float64)])
+        self._pending_epochs = []
+        self._pending_prices = []
+        
+        order = np.argsort(epochs, kind='stable')
+        epochs = epochs[order]
+        prices = prices[order]
+        
+        # Keep the most recently written price for duplicate instants
+        keep = np.append(epochs[1:] != epochs[:-1], True)
+        self._epochs = epochs[keep]
+        self._prices = prices[keep]
+    
+    def refresh(self):
+        """sync() only if anything committed to the file since the last one (one PRAGMA otherwise)"""
+        if self.connections.change_token() != self._change_token:
+            return self.sync()
+        return 0
+    
+    def arrays(self):
+        """Sorted (epochs, prices) arrays backing the index, refreshed with other processes' writes"""
+        self.refresh()
+        with self._lock:
+            self._merge_pending()
+            return self._epochs, self._prices
+    
+    def prices_at(self, moments):
+        """Vectorized lookup; NaN where no price at or before the moment is known"""
+        epochs, prices = self.arrays()
+        moments = np.asarray(moments, dtype=np.float64)
+        
+        positions = np.searchsorted(epochs, moments, side='right') - 1
+        found = positions >= 0
+        
+        result = np.full(moments.shape, np.nan)
+        result[found] = prices[positions[found]]
+        return result
+    
+    def price_at(self, moment):
+        """Latest known price at or before a moment, or None"""
+        epochs, prices = self.arrays()
+        position = np.searchsorted(epochs, to_epoch(moment), side='right') - 1
+        
+        return float(prices[position]) if position >= 0 else None
+    
+    def __len__(self):
+        return len(self.arrays()[0])
+
+
+def get_price_index(connections, table, time_column, price_column):
+    """Get the loaded index shared by every client of this database file"""
+    key = ('price_index', table)
+    
+    with connections.shared_lock:
+        index = connections.shared_state.get(key)
+        if index is None:
+            index = PriceIndex(connections, table, time_column, price_column)
+            index.sync()
+            connections.shared_state[key] = index
+        return index
@@ -0,0 +1,171 @@
+"""
+Conditional Price Poller
+Polls CoinGecko's minimal /simple/price endpoint on its own short cadence, revalidating with
+ETag / If-Modified-Since, and turns every new price plus the latest hourly realized cap into a 'tick' MVRV row
+"""
+
+import threading
+import time
+
+from epoch_schema import utc_iso
+from http_client import new_session
+
+TICK_PERIOD = 'tick'             # analysis_period of the live rows in my_mvrv_analysis
+DEFAULT_INTERVAL = 20            # Seconds between polls; CoinGecko refreshes simple prices about once a minute
+DEFAULT_RETENTION = 2 * 24 * 3600   # Ticks older than this are pruned; the hourly rows keep the history
+DEFAULT_TIMEOUT = 10
+
+
+class PricePoller:
+    """Near-real-time MVRV ticks from a tiny price document instead of the full /coins/bitcoin one"""
+    
+    def __init__(self, engine=None, interval=DEFAULT_INTERVAL, retention=DEFAULT_RETENTION, session=None,
+                 timeout=DEFAULT_TIMEOUT):
+        if engine is None:
+            from my_mvrv_engine import MyMVRVEngine
+            engine = MyMVRVEngine()
+        
+        self.engine = engine
+        self.my_db = engine.my_db
+        self.url = f"{engine.btc_brain.my_apis['prices'].rstrip('/')}/simple/price"
+        self.interval = interval
+        self.retention = retention
+        self.timeout = timeout
+        
+        # Uncached on purpose: the response cache would hide new prices for its TTL; we revalidate instead
+        self.session = session or new_session(dict(engine.btc_brain.session.headers), cached=False)
+        self.etag = None
+        self.last_modified = None
+        self.last_updated_at = None
+        
+        self.polls = 0
+        self.not_modified = 0
+        self.unchanged = 0
+        self.ticks = 0
+        self.errors = 0
+        self.bytes_received = 0
+        self.last_tick = None
+        
+        self._stop = threading.Event()
+        self._thread = None
+    
+    def poll_price(self):
+        """The latest price quote, or None when it has not moved since the last poll"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        
+        self.polls += 1
+        response = self.session.get(self.url, params={
+            'ids': 'bitcoin',
+            'vs_currencies': 'usd',
+            'include_market_cap': 'true',
+            'include_last_updated_at': 'true'
+        }, headers=headers, timeout=self.timeout)
+        self.bytes_received += len(response.content)
+        
+        if response.status_code == 304:
+            self.not_modified += 1
+            return None
+        response.raise_for_status()
+        
+        self.etag = response.headers.get('ETag', self.etag)
+        self.last_modified = response.headers.get('Last-Modified', self.last_modified)
+        
+        quote = response.json()['bitcoin']
+        updated_at = int(quote.get('last_updated_at') or time.time())
+        if updated_at == self.last_updated_at:
+            self.unchanged += 1
+            return None
+        
+        self.last_updated_at = updated_at
+        return {'price_usd': quote['usd'], 'market_cap': quote.get('usd_market_cap'), 'updated_at': updated_at}
+    
+    def tick(self):
+        """Poll once and store a tick row if the price moved; returns the tick or None"""
+        try:
+            quote = self.poll_price()
+        except Exception as e:
+            self.errors += 1
+            print(f"⚡ Price poll failed: {e}")
+            return None
+        if quote is None:
+            return None
+        
+        # The realized cap only moves with the hourly UTXO analysis; reuse its latest value
+        hourly = self.my_db.get_my_latest_mvrv()
+        if not hourly or not hourly['realized_cap']:
+            print("⚡ No hourly analysis yet, nothing to tick against")
+            return None
+        
+        market_cap = quote['market_cap']
+        if not market_cap:
+            latest_price = self.my_db.get_my_latest_price_data()
+            if not latest_price:
+                return None
+            market_cap = quote['price_usd'] * latest_price[1]
+        
+        ratio = market_cap / hourly['realized_cap']
+        interpretation = self.engine.interpret_mvrv_my_way(ratio)
+        timestamp = utc_iso(quote['updated_at'])
+        
+        self.my_db.store_my_mvrv_analysis(timestamp=timestamp, market_cap=market_cap,
+                                          realized_cap=hourly['realized_cap'], ratio=ratio,
+                                          signal=interpretation['signal'],
+                                          confidence=interpretation['confidence'], timeframe=TICK_PERIOD)
+        self.my_db.prune_my_mvrv_period(TICK_PERIOD, quote['updated_at'] - self.retention)
+        
+        self.ticks += 1
+        self.last_tick = {
+            'timestamp': timestamp,
+            'price_usd': quote['price_usd'],
+            'market_cap': market_cap,
+            'realized_cap': hourly['realized_cap'],
+            'mvrv_ratio': ratio,
+            'my_signal': interpretation['signal']
+        }
+        return self.last_tick
+    
+    def start(self):
+        """Tick in a background thread every interval seconds, independent of the hourly job"""
+        if self._thread is not None:
+            return self
+        
+        self._stop.clear()
+        
+        def loop():
+            while not self._stop.is_set():
+                self.tick()
+                self._stop.wait(self.interval)
+        
+        self._thread = threading.Thread(target=loop, name="price-poller", daemon=True)
+        self._thread.start()
+        return self
+    
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.timeout if timeout is None else timeout)
+            self._thread = None
+    
+    @property
+    def running(self):
+        return self._thread is not None
+    
+    def stats(self):
+        return {
+            'polls': self.polls,
+            'ticks': self.ticks,
+            'not_modified': self.not_modified,
+            'unchanged': self.unchanged,
+            'errors': self.errors,
+            'avg_bytes': self.bytes_received / self.polls if self.polls else 0.0,
+            'last_tick': self.last_tick
+        }
+    
+    def describe(self):
+        stats = self.stats()
+        return (f"{stats['polls']} polls, {stats['ticks']} ticks, {stats['not_modified']} not modified, "
+                f"{stats['unchanged']} unchanged, {stats['avg_bytes']:.0f} bytes/poll")
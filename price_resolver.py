@@ -0,0 +1,94 @@
+"""
+Batched Historical Price Resolver
+Prices a whole batch of timestamps at once: deduped to UTC days, days already in the local price
+index are answered from memory, and the rest are fetched with as few CoinGecko
+/market_chart/range calls as possible instead of one /history call per lookup
+"""
+
+import numpy as np
+
+from epoch_schema import utc_iso
+from http_client import new_session
+from price_index import to_epoch
+
+DAY = 86400
+DEFAULT_MAX_SPAN_DAYS = 365      # Widest range per call (CoinGecko serves daily points past 90 days)
+DEFAULT_TIMEOUT = 30
+
+
+def plan_ranges(days, max_span_days=DEFAULT_MAX_SPAN_DAYS):
+    """Fewest [start, end) day ranges of at most max_span_days covering every day start in days"""
+    ranges = []
+    for day in np.unique(np.asarray(days, dtype=np.int64)).tolist():
+        if ranges and day < ranges[-1][0] + max_span_days * DAY:
+            ranges[-1][1] = day + DAY
+        else:
+            ranges.append([day, day + DAY])
+    return [tuple(span) for span in ranges]
+
+
+class PriceResolver:
+    """timestamps -> USD prices over a PriceIndex, filling its gaps from CoinGecko in bulk"""
+    
+    def __init__(self, price_index, remember, base_url, session=None, max_span_days=DEFAULT_MAX_SPAN_DAYS,
+                 timeout=DEFAULT_TIMEOUT):
+        self.price_index = price_index          # Callable returning the (shared) PriceIndex
+        self.remember = remember                # Bulk writer of (iso timestamp, price) rows; feeds the index
+        self.base_url = base_url.rstrip('/')
+        self.session = session or new_session()
+        self.max_span_days = max_span_days
+        self.timeout = timeout
+        
+        self.range_calls = 0
+        self.last_batch = None
+    
+    def covered_days(self, days):
+        """Which UTC day starts already have at least one price in the index"""
+        epochs, _ = self.price_index().arrays()
+        positions = np.searchsorted(epochs, days, side='left')
+        inside = positions < len(epochs)
+        covered = np.zeros(len(days), dtype=bool)
+        covered[inside] = epochs[positions[inside]] < days[inside] + DAY
+        return covered
+    
+    def resolve(self, timestamps):
+        """Price (latest known at or before each moment) for every timestamp; NaN where none is available"""
+        epochs = np.array([to_epoch(moment) for moment in timestamps], dtype=np.float64) \
+            if not isinstance(timestamps, np.ndarray) else timestamps.astype(np.float64)
+        
+        days = np.unique((epochs // DAY).astype(np.int64) * DAY)
+        missing = days[~self.covered_days(days)]
+        ranges = plan_ranges(missing, self.max_span_days)
+        
+        fetched = sum(self.fetch_range(start, end) for start, end in ranges)
+        self.last_batch = {
+            'timestamps': len(epochs),
+            'days': len(days),
+            'missing_days': len(missing),
+            'range_calls': len(ranges),
+            'prices_fetched': fetched
+        }
+        return self.price_index().prices_at(epochs)
+    
+    def resolve_one(self, timestamp):
+        price = self.resolve(np.array([to_epoch(timestamp)]))[0]
+        return None if np.isnan(price) else float(price)
+    
+    def fetch_range(self, start, end):
+        """Fetch and remember every price point in [start, end) epoch seconds; returns how many"""
+        self.range_calls += 1
+        try:
+            response = self.session.get(f"{self.base_url}/coins/bitcoin/market_chart/range", params={
+                'vs_currency': 'usd',
+                'from': int(start),
+                'to': int(end)
+            }, timeout=self.timeout)
+            points = response.json().get('prices', []) if response.status_code == 200 else []
+        except Exception as e:
+            print(f"Error fetching price range: {e}")
+            return 0
+        
+        # Stored the way the index reads them back (naive UTC ISO, like the other price writers)
+        rows = [(utc_iso(ms / 1000), price)
+                for ms, price in points if start * 1000 <= ms < end * 1000]
+        return self.remember(rows) if rows else 0
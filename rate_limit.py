@@ -0,0 +1,76 @@
+"""
+Rate limiting helpers
+Token buckets shared by the blocking and asyncio HTTP clients
+"""
+
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)                  # Tokens added per second
+        self.capacity = float(capacity or max(rate, 1))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def _reserve(self, tokens=1):
+        """Take tokens now if available, otherwise return how long to wait"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+    
+    def acquire(self, tokens=1):
+        """Block the calling thread until tokens are available"""
+        while True:
+            wait = self._reserve(tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+    
+    async def acquire_async(self, tokens=1):
+        """Wait without blocking the event loop until tokens are available"""
+        while True:
+            wait = self._reserve(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+
+class AdaptiveTokenBucket(TokenBucket):
+    """AIMD token bucket: the rate creeps up while a host keeps answering and is cut when it pushes back"""
+    
+    def __init__(self, rate, max_rate=None, min_rate=None, increase=None, decrease=0.5, capacity=None):
+        super().__init__(rate, capacity)
+        self.max_rate = float(max_rate or rate)
+        self.min_rate = float(min_rate or rate / 16)
+        self.increase = float(increase or self.max_rate / 100)   # Added per successful request
+        self.decrease = decrease                                 # Multiplier per throttled request
+        self._blocked_until = 0.0
+    
+    def _reserve(self, tokens=1):
+        with self._lock:
+            blocked = self._blocked_until - time.monotonic()
+        return blocked if blocked > 0 else super()._reserve(tokens)
+    
+    def succeeded(self):
+        with self._lock:
+            self.rate = min(self.max_rate, self.rate + self.increase)
+    
+    def throttled(self, retry_after=None):
+        """Cut the rate, drop the saved burst and hold everyone back for retry_after seconds"""
+        with self._lock:
+            now = time.monotonic()
+            self.rate = max(self.min_rate, self.rate * self.decrease)
+            self._tokens = 0.0
+            self._updated = now
+            if retry_after:
+                self._blocked_until = max(self._blocked_until, now + retry_after)
@@ -0,0 +1,269 @@
+"""
+Persistent HTTP Response Cache
+Content-addressed SQLite cache for API responses: immutable chain data never expires,
+mutable endpoints get short TTLs, and the whole store is kept under a size budget (LRU)
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlencode
+
+import requests
+
+from db_connection import get_connection_manager
+from http_client import mount_resilient
+from single_flight import get_single_flight
+
+IMMUTABLE = None  # TTL marker: never expires
+
+# (path pattern, TTL seconds) - first match wins, unmatched URLs are not cached
+DEFAULT_POLICIES = [
+    (r'/tx/[0-9a-f]{64}$', IMMUTABLE),
+    (r'/block/[0-9a-f]{64}/txs(/\d+)?$', IMMUTABLE),
+    (r'/block/[0-9a-f]{64}$', IMMUTABLE),
+    (r'/coins/bitcoin/history$', IMMUTABLE),
+    (r'/blocks/tip/height$', 30),
+    (r'/blocks$', 60),
+    (r'/coins/bitcoin$', 60),
+    (r'/simple/price$', 30),
+    (r'/coins/bitcoin/market_chart/range$', 3600),
+]
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+DEFAULT_ACCESS_FLUSH = 256   # Hits whose access times are written back in one batch
+
+
+def cache_key(url, params=None):
+    """Stable key for a URL and its query parameters"""
+    canonical = url
+    if params:
+        canonical += '?' + urlencode(sorted(params.items()))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, db_path="http_cache.db", max_bytes=DEFAULT_MAX_BYTES, policies=None, clock=time.time,
+                 access_flush=DEFAULT_ACCESS_FLUSH):
+        self.db_path = db_path
+        self.max_bytes = max_bytes
+        self.access_flush = access_flush
+        self.policies = [(re.compile(pattern), ttl) for pattern, ttl in (policies or DEFAULT_POLICIES)]
+        self.clock = clock
+        self.connections = get_connection_manager(db_path)
+        
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._accessed = {}     # cache_key -> last hit time not yet written back
+        self._lock = threading.Lock()
+        
+        self.setup_cache()
+        self._total_bytes = self.connections.connection().execute(
+            "SELECT COALESCE(SUM(size), 0) FROM http_responses"
+        ).fetchone()[0]
+    
+    def setup_cache(self):
+        """Create the cache table"""
+        with self.connections.transaction() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS http_responses (
+                    cache_key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    status INTEGER NOT NULL,
+                    body BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    stored_at REAL NOT NULL,
+                    expires_at REAL,
+                    last_access REAL NOT NULL
+                )
+            """)
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_http_last_access ON http_responses(last_access)")
+    
+    def ttl_for(self, url, params=None):
+        """(cacheable, ttl) for a URL; ttl None means immutable"""
+        path = url.split('?')[0]
+        for pattern, ttl in self.policies:
+            if pattern.search(path):
+                # A daily history price for today can still move
+                if ttl is IMMUTABLE and path.endswith('/coins/bitcoin/history'):
+                    today = datetime.utcnow().strftime('%d-%m-%Y')
+                    if (params or {}).get('date') == today:
+                        return True, 3600
+                return True, ttl
+        return False, None
+    
+    def is_cacheable_payload(self, url, body):
+        """Unconfirmed transactions are not immutable yet"""
+        if re.search(r'/tx/[0-9a-f]{64}$', url.split('?')[0]):
+            try:
+                return json.loads(body).get('status', {}).get('confirmed', False)
+            except (ValueError, AttributeError):
+                return False
+        return True
+    
+    def lookup(self, url, params=None):
+        """Cached (status, body) or None"""
+        cacheable, _ = self.ttl_for(url, params)
+        if not cacheable:
+            return None
+        
+        key = cache_key(url, params)
+        now = self.clock()
+        row = self.connections.connection().execute(
+            "SELECT status, body, expires_at FROM http_responses WHERE cache_key = ?", (key,)
+        ).fetchone()
+        
+        if row is None or (row[2] is not None and row[2] <= now):
+            with self._lock:
+                self.misses += 1
+            return None
+        
+        # Hits stay read-only: access times are kept in memory and written back in batches
+        with self._lock:
+            self.hits += 1
+            self._accessed[key] = now
+            flush = len(self._accessed) >= self.access_flush
+        if flush:
+            with self.connections.transaction() as cursor:
+                self._write_access_times(cursor)
+        return row[0], row[1]
+    
+    def _write_access_times(self, cursor):
+        """Write the pending access times back inside the caller's transaction"""
+        with self._lock:
+            accessed, self._accessed = self._accessed, {}
+        cursor.executemany("UPDATE http_responses SET last_access = MAX(last_access, ?) WHERE cache_key = ?",
+                           [(when, key) for key, when in accessed.items()])
+    
+    def store(self, url, params, status, body):
+        """Remember a successful response if its URL is cacheable"""
+        cacheable, ttl = self.ttl_for(url, params)
+        if not cacheable or status != 200 or not self.is_cacheable_payload(url, body):
+            return False
+        
+        key = cache_key(url, params)
+        now = self.clock()
+        expires_at = None if ttl is IMMUTABLE else now + ttl
+        
+        with self.connections.transaction() as cursor:
+            self._write_access_times(cursor)
+            previous = cursor.execute("SELECT size FROM http_responses WHERE cache_key = ?", (key,)).fetchone()
+            cursor.execute("""
+                INSERT OR REPLACE INTO http_responses
+                (cache_key, url, status, body, size, stored_at, expires_at, last_access)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (key, url, status, body, len(body), now, expires_at, now))
+        
+        with self._lock:
+            self.stores += 1
+            self._total_bytes += len(body) - (previous[0] if previous else 0)
+        
+        if self._total_bytes > self.max_bytes:
+            self.evict()
+        return True
+    
+    def evict(self, target_fraction=0.9):
+        """Drop least recently used entries until under target_fraction of the budget"""
+        target = self.max_bytes * target_fraction
+        
+        with self.connections.transaction() as cursor:
+            self._write_access_times(cursor)   # LRU order needs the recent hits
+            rows = cursor.execute("SELECT cache_key, size FROM http_responses ORDER BY last_access").fetchall()
+            victims = []
+            with self._lock:
+                for key, size in rows:
+                    if self._total_bytes <= target:
+                        break
+                    victims.append((key,))
+                    self._total_bytes -= size
+                self.evictions += len(victims)
+            cursor.executemany("DELETE FROM http_responses WHERE cache_key = ?", victims)
+        
+        return len(victims)
+    
+    def stats(self):
+        """Hit/miss counters and current size"""
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+            'stores': self.stores,
+            'evictions': self.evictions,
+            'size_bytes': self._total_bytes
+        }
+    
+    def describe(self):
+        stats = self.stats()
+        return (f"{stats['hits']} hits / {stats['misses']} misses ({stats['hit_rate']:.0%} hit rate), "
+                f"{stats['size_bytes'] / 1e6:.1f} MB stored, {stats['evictions']} evictions")
+
+
+def cached_response(url, status, body):
+    """Build a requests.Response from cached bytes"""
+    response = requests.Response()
+    response.status_code = status
+    response._content = body
+    response.url = url
+    response.encoding = 'utf-8'
+    response.headers['Content-Type'] = 'application/json'
+    response.from_cache = True
+    return response
+
+
+class CachingSession(requests.Session):
+    """requests.Session whose GETs are served from a ResponseCache when possible, and coalesced
+    with identical GETs already in flight (from any session in the process) when not; what does go
+    out is rate limited, retried and circuit broken per host (http_client)"""
+    
+    def __init__(self, cache=None, flights=None, hosts=None):
+        super().__init__()
+        self.cache = cache if cache is not None else get_response_cache()
+        self.flights = flights if flights is not None else get_single_flight()
+        mount_resilient(self, hosts)
+        self.on_network_request = None  # Optional hook run before each real request
+    
+    def get(self, url, params=None, **kwargs):
+        cached = self.cache.lookup(url, params)
+        if cached is not None:
+            return cached_response(url, *cached)
+        
+        # Each caller gets its own Response object around the shared, already-read body
+        shared = self.flights.do(cache_key(url, params), self._fetch, url, params, **kwargs)
+        response = requests.Response()
+        response.__dict__.update(shared.__dict__)
+        return response
+    
+    def _fetch(self, url, params, **kwargs):
+        if self.on_network_request:
+            self.on_network_request(url)
+        
+        response = super().get(url, params=params, **kwargs)
+        response.from_cache = False
+        self.cache.store(url, params, response.status_code, response.content)
+        return response
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """The process-wide response cache"""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache()
+        return _default_cache
+
+
+def set_response_cache(cache):
+    """Replace the process-wide response cache (e.g. to point it at another file)"""
+    global _default_cache
+    with _default_cache_lock:
+        _default_cache = cache
@@ -0,0 +1,265 @@
+"""
+Rolling MVRV Statistics
+Mean/std (Welford), min/max (monotonic deques) and trend over several time windows at once,
+updated in O(1) per new row and persisted row by row so a restart resumes instead of replaying history
+"""
+
+import json
+import threading
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+WINDOWS = {                      # Window name -> span in seconds, anchored at the newest sample
+    '24h': 24 * 3600,
+    '7d': 7 * 24 * 3600,
+    '30d': 30 * 24 * 3600,
+    '365d': 365 * 24 * 3600,
+}
+
+# Stream name -> (table, epoch column, value column, row filter); hourly rows only, like the history APIs
+STREAMS = {
+    'mvrv_ratio': ('mvrv_ratios', 'timestamp_epoch', 'ratio', "timeframe = 'hourly'"),
+    'my_mvrv_ratio': ('my_mvrv_analysis', 'analysis_time_epoch', 'mvrv_ratio', "analysis_period = 'hourly'"),
+    'my_confidence': ('my_mvrv_analysis', 'analysis_time_epoch', 'my_confidence', "analysis_period = 'hourly'"),
+}
+
+
+class RollingWindow:
+    """Running statistics of the samples within `span` seconds of the newest one"""
+    
+    def __init__(self, span):
+        self.span = span
+        self.samples = deque()       # (epoch, value), oldest first
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0                # Sum of squared deviations from the mean (Welford)
+        self._highs = deque()        # Decreasing values: the front is the window maximum
+        self._lows = deque()         # Increasing values: the front is the window minimum
+        self._removed = 0
+    
+    def add(self, epoch, value):
+        self.samples.append((epoch, value))
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        
+        while self._highs and self._highs[-1][1] <= value:
+            self._highs.pop()
+        self._highs.append((epoch, value))
+        while self._lows and self._lows[-1][1] >= value:
+            self._lows.pop()
+        self._lows.append((epoch, value))
+        
+        self._evict(epoch - self.span)
+    
+    def _evict(self, cutoff):
+        while self.samples and self.samples[0][0] <= cutoff:
+            _, value = self.samples.popleft()
+            self.count -= 1
+            if self.count:
+                delta = value - self.mean
+                self.mean -= delta / self.count
+                self.m2 = max(self.m2 - delta * (value - self.mean), 0.0)
+            else:
+                self.mean = self.m2 = 0.0
+            self._removed += 1
+        
+        while self._highs and self._highs[0][0] <= cutoff:
+            self._highs.popleft()
+        while self._lows and self._lows[0][0] <= cutoff:
+            self._lows.popleft()
+        
+        # Removals accumulate rounding error; re-deriving once per window turnover keeps it amortized O(1)
+        if self._removed > max(len(self.samples), 1024):
+            self._recompute()
+    
+    def _recompute(self):
+        values = np.fromiter((value for _, value in self.samples), dtype=np.float64, count=len(self.samples))
+        self.count = len(values)
+        self.mean = float(values.mean()) if self.count else 0.0
+        self.m2 = float(((values - self.mean) ** 2).sum()) if self.count else 0.0
+        self._removed = 0
+    
+    def restore(self, samples, count, mean, m2):
+        """Load saved aggregates and samples; only the min/max deques are re-derived"""
+        self.samples = deque(samples)
+        self.count, self.mean, self.m2 = count, mean, m2
+        self._highs.clear()
+        self._lows.clear()
+        for epoch, value in self.samples:
+            while self._highs and self._highs[-1][1] <= value:
+                self._highs.pop()
+            self._highs.append((epoch, value))
+            while self._lows and self._lows[-1][1] >= value:
+                self._lows.pop()
+            self._lows.append((epoch, value))
+    
+    def summary(self):
+        if not self.count:
+            return {'count': 0, 'mean': None, 'min': None, 'max': None, 'std': None}
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'min': self._lows[0][1],
+            'max': self._highs[0][1],
+            'std': (self.m2 / self.count) ** 0.5     # Population std, like np.std
+        }
+
+
+class RollingStats:
+    """Every window of one stream, synced from its table and saved in rolling_stats_state/_samples"""
+    
+    def __init__(self, connections, stream, windows=None):
+        if stream not in STREAMS:
+            raise ValueError(f"Unknown rolling stats stream '{stream}', use one of {', '.join(STREAMS)}")
+        
+        self.connections = connections
+        self.stream = stream
+        self.table, self.epoch_column, self.value_column, self.row_filter = STREAMS[stream]
+        self.spans = dict(windows or WINDOWS)
+        self.windows = {name: RollingWindow(span) for name, span in self.spans.items()}
+        self.last_epoch = None
+        self.previous = None
+        self.current = None
+        self._unsaved = []           # Samples added since the last save
+        self._lock = threading.RLock()
+        
+        self.setup_tables()
+        self.load()
+    
+    def setup_tables(self):
+        with self.connections.transaction() as cursor:
+            # The state used to carry every sample as one blob; it is only a cache, so start over from the table
+            if 'vals' in {row[1] for row in cursor.execute("PRAGMA table_info(rolling_stats_state)")}:
+                cursor.execute("DROP TABLE rolling_stats_state")
+            
+            # Welford scalars and trend per stream; the samples live in their own rows
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS rolling_stats_state (
+                    stream TEXT PRIMARY KEY,
+                    last_epoch INTEGER NOT NULL,
+                    windows TEXT NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+            
+            # Samples of the longest window, appended on save and pruned as they fall out of it
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS rolling_stats_samples (
+                    stream TEXT NOT NULL,
+                    epoch INTEGER NOT NULL,
+                    value REAL NOT NULL,
+                    PRIMARY KEY (stream, epoch)
+                ) WITHOUT ROWID
+            """)
+    
+    def add(self, epoch, value):
+        """Fold in one sample newer than everything seen so far; older ones are ignored"""
+        with self._lock:
+            if self.last_epoch is not None and epoch <= self.last_epoch:
+                return False
+            for window in self.windows.values():
+                window.add(epoch, value)
+            self.last_epoch = epoch
+            self.previous, self.current = self.current, value
+            self._unsaved.append((self.stream, epoch, value))
+            return True
+    
+    def sync(self):
+        """Fold in rows written since the last sync (by any process); saves the state if anything changed"""
+        with self._lock:
+            rows = self.connections.connection().execute(f"""
+                SELECT {self.epoch_column}, {self.value_column} FROM {self.table}
+                WHERE {self.row_filter} AND {self.epoch_column} > ? AND {self.value_column} IS NOT NULL
+                ORDER BY {self.epoch_column}
+            """, (self.last_epoch if self.last_epoch is not None else -1,)).fetchall()
+            
+            added = sum(self.add(epoch, value) for epoch, value in rows)
+            if added:
+                self.save()
+            return added
+    
+    def rebuild(self):
+        """Start over from the table (after backfills or rewrites of past rows)"""
+        with self._lock:
+            self.windows = {name: RollingWindow(span) for name, span in self.spans.items()}
+            self.last_epoch = self.previous = self.current = None
+            self._unsaved = []
+            with self.connections.transaction() as cursor:
+                cursor.execute("DELETE FROM rolling_stats_state WHERE stream = ?", (self.stream,))
+                cursor.execute("DELETE FROM rolling_stats_samples WHERE stream = ?", (self.stream,))
+            return self.sync()
+    
+    def save(self):
+        """Append the new samples, prune the expired ones and update the scalars: O(rows added), not O(window)"""
+        windows = {name: {'span': window.span, 'count': window.count, 'mean': window.mean, 'm2': window.m2}
+                   for name, window in self.windows.items()}
+        windows['_trend'] = {'previous': self.previous, 'current': self.current}
+        
+        with self.connections.transaction() as cursor:
+            cursor.executemany("""
+                INSERT OR REPLACE INTO rolling_stats_samples (stream, epoch, value) VALUES (?, ?, ?)
+            """, self._unsaved)
+            # The longest window holds every sample any window needs
+            cursor.execute("DELETE FROM rolling_stats_samples WHERE stream = ? AND epoch <= ?",
+                           (self.stream, self.last_epoch - max(self.spans.values())))
+            cursor.execute("""
+                INSERT OR REPLACE INTO rolling_stats_state (stream, last_epoch, windows, updated_at)
+                VALUES (?, ?, ?, ?)
+            """, (self.stream, self.last_epoch, json.dumps(windows), datetime.utcnow().isoformat()))
+        self._unsaved = []
+    
+    def load(self):
+        """Resume from the saved state; False if there is none (or it was saved for other windows)"""
+        conn = self.connections.connection()
+        row = conn.execute("""
+            SELECT last_epoch, windows FROM rolling_stats_state WHERE stream = ?
+        """, (self.stream,)).fetchone()
+        if row is None:
+            return False
+        
+        last_epoch, windows = row
+        windows = json.loads(windows)
+        trend = windows.pop('_trend')
+        if {name: saved['span'] for name, saved in windows.items()} != self.spans:
+            return False
+        
+        samples = conn.execute("""
+            SELECT epoch, value FROM rolling_stats_samples WHERE stream = ? AND epoch > ? ORDER BY epoch
+        """, (self.stream, last_epoch - max(self.spans.values()))).fetchall()
+        with self._lock:
+            for name, window in self.windows.items():
+                saved = windows[name]
+                window.restore([sample for sample in samples if sample[0] > last_epoch - window.span],
+                               saved['count'], saved['mean'], saved['m2'])
+            self.last_epoch = last_epoch
+            self.previous, self.current = trend['previous'], trend['current']
+        return True
+    
+    def summary(self):
+        """Latest value, trend and every window's count/mean/min/max/std"""
+        with self._lock:
+            return {
+                'current': self.current,
+                'previous': self.previous,
+                'rising': self.previous is not None and self.current > self.previous,
+                'last_epoch': self.last_epoch,
+                'windows': {name: window.summary() for name, window in self.windows.items()}
+            }
+
+
+def get_rolling_stats(connections, stream, sync=True):
+    """The statistics of a stream, shared by every client of this database file (synced unless told not to)"""
+    key = ('rolling_stats', stream)
+    
+    with connections.shared_lock:
+        stats = connections.shared_state.get(key)
+        if stats is None:
+            stats = RollingStats(connections, stream)
+            connections.shared_state[key] = stats
+    if sync:
+        stats.sync()
+    return stats
@@ -0,0 +1,245 @@
+"""
+MVRV Rollups
+Open/high/low/close/mean MVRV, market cap and realized cap per day, week and month, kept in a
+materialized table beside the hourly rows: merged as each hourly row lands, backfilled set-based
+"""
+
+from datetime import date, datetime, timedelta
+
+from db_connection import time_window
+
+RESOLUTIONS = ('day', 'week', 'month')
+
+# First day of the bucket holding {t}; weeks start on Monday
+BUCKET_SQL = {
+    'day': "date({t})",
+    'week': "date({t}, 'weekday 0', '-6 days')",
+    'month': "date({t}, 'start of month')",
+}
+
+METRICS = ('ratio', 'market_cap', 'realized_cap')
+STATS = ('open', 'high', 'low', 'close', 'mean')
+
+# Where each schema keeps its hourly rows, and the table its rollups live in
+ROLLUP_SOURCES = {
+    'mvrv_ratios': {
+        'table': 'mvrv_rollups',
+        'time': 'timestamp',
+        'period': 'timeframe',
+        'columns': {'ratio': 'ratio', 'market_cap': 'market_cap', 'realized_cap': 'realized_cap'},
+    },
+    'my_mvrv_analysis': {
+        'table': 'my_mvrv_rollups',
+        'time': 'analysis_time',
+        'period': 'analysis_period',
+        'columns': {'ratio': 'mvrv_ratio', 'market_cap': 'market_capitalization',
+                    'realized_cap': 'realized_capitalization'},
+    },
+}
+
+STAT_COLUMNS = [f"{metric}_{stat}" for metric in METRICS for stat in STATS]
+ROW_COLUMNS = ['resolution', 'bucket_start', *STAT_COLUMNS, 'samples', 'first_time', 'last_time']
+
+
+def _day(moment):
+    if isinstance(moment, datetime):
+        return moment.date()
+    if isinstance(moment, date):
+        return moment
+    return date.fromisoformat(str(moment)[:10])
+
+
+def bucket_start(resolution, moment):
+    """First day of the bucket holding moment (ISO string, date or datetime)"""
+    day = _day(moment)
+    if resolution == 'week':
+        return day - timedelta(days=day.weekday())
+    if resolution == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def bucket_end(resolution, moment):
+    """First day after the bucket holding moment"""
+    start = bucket_start(resolution, moment)
+    if resolution == 'week':
+        return start + timedelta(days=7)
+    if resolution == 'month':
+        return (start + timedelta(days=32)).replace(day=1)
+    return start + timedelta(days=1)
+
+
+class MvrvRollups:
+    """Day/week/month OHLC rollups of one schema's hourly MVRV rows"""
+    
+    def __init__(self, connections, source):
+        self.connections = connections
+        self.source = source
+        self.spec = ROLLUP_SOURCES[source]
+        self.table = self.spec['table']
+        
+        self.setup_tables()
+        if not self.has_rollups():
+            self.backfill()  # Databases from before rollups existed
+    
+    def setup_tables(self):
+        """Create the rollup table"""
+        stat_columns = ",\n".join(f"{column} REAL NOT NULL" for column in STAT_COLUMNS)
+        with self.connections.transaction() as cursor:
+            cursor.execute(f"""
+                CREATE TABLE IF NOT EXISTS {self.table} (
+                    resolution TEXT NOT NULL,
+                    bucket_start TEXT NOT NULL,
+                    {stat_columns},
+                    samples INTEGER NOT NULL,
+                    first_time TEXT NOT NULL,
+                    last_time TEXT NOT NULL,
+                    PRIMARY KEY (resolution, bucket_start)
+                ) WITHOUT ROWID
+            """)
+    
+    def has_rollups(self):
+        return self.connections.connection().execute(f"SELECT 1 FROM {self.table} LIMIT 1").fetchone() is not None
+    
+    def _merge_sql(self):
+        """Upsert one hourly row into a bucket; a no-op unless it is newer than the bucket's last row"""
+        updates = []
+        for metric in METRICS:
+            updates += [
+                f"{metric}_high = MAX({metric}_high, excluded.{metric}_high)",
+                f"{metric}_low = MIN({metric}_low, excluded.{metric}_low)",
+                f"{metric}_close = excluded.{metric}_close",
+                f"{metric}_mean = ({metric}_mean * samples + excluded.{metric}_mean) / (samples + 1)",
+            ]
+        
+        return f"""
+            INSERT INTO {self.table} ({', '.join(ROW_COLUMNS)})
+            VALUES ({', '.join('?' * len(ROW_COLUMNS))})
+            ON CONFLICT (resolution, bucket_start) DO UPDATE SET
+                {', '.join(updates)},
+                samples = samples + 1,
+                last_time = excluded.last_time
+            WHERE excluded.last_time > {self.table}.last_time
+        """
+    
+    def record(self, timestamp, market_cap, realized_cap, ratio):
+        """Merge a just-stored hourly row into its day, week and month buckets"""
+        values = {'ratio': ratio, 'market_cap': market_cap, 'realized_cap': realized_cap}
+        stats = [values[metric] for metric in METRICS for _ in STATS]
+        merge_sql = self._merge_sql()
+        
+        with self.connections.transaction() as cursor:
+            stale = []
+            for resolution in RESOLUTIONS:
+                cursor.execute(merge_sql, (resolution, bucket_start(resolution, timestamp).isoformat(),
+                                           *stats, 1, timestamp, timestamp))
+                if cursor.rowcount == 0:
+                    stale.append(resolution)
+            
+            # Late or replaced rows can't be merged in running order, so those buckets are rebuilt
+            if stale:
+                self.backfill(timestamp, timestamp, stale)
+    
+    def _backfill_sql(self, resolutions):
+        spec = self.spec
+        columns = spec['columns']
+        
+        bucketed = "\n                UNION ALL\n".join(
+            f"SELECT '{resolution}' AS resolution, {BUCKET_SQL[resolution].format(t='t')} AS bucket, * FROM hourly "
+            f"WHERE {BUCKET_SQL[resolution].format(t='t')} BETWEEN :{resolution}_from AND :{resolution}_to"
+            for resolution in resolutions
+        )
+        edges = ",\n".join(
+            f"FIRST_VALUE({metric}) OVER bucket_rows AS {metric}_first, LAST_VALUE({metric}) OVER bucket_rows AS {metric}_last"
+            for metric in METRICS
+        )
+        aggregates = ",\n".join(
+            f"MIN({metric}_first), MAX({metric}), MIN({metric}), MIN({metric}_last), AVG({metric})"
+            for metric in METRICS
+        )
+        
+        return f"""
+            INSERT INTO {self.table} ({', '.join(ROW_COLUMNS)})
+            WITH hourly AS (
+                SELECT {spec['time']} AS t, {columns['ratio']} AS ratio,
+                       {columns['market_cap']} AS market_cap, {columns['realized_cap']} AS realized_cap
+                FROM {self.source}
+                WHERE {spec['period']} = 'hourly' AND {spec['time']} >= :lo AND {spec['time']} < :hi
+            ),
+            bucketed AS (
+                {bucketed}
+            ),
+            framed AS (
+                SELECT *, {edges}
+                FROM bucketed
+                WINDOW bucket_rows AS (PARTITION BY resolution, bucket ORDER BY t
+                                       ROWS BETWEEN UNBOUNDED PRECEDING AND UNBOUNDED FOLLOWING)
+            )
+            SELECT resolution, bucket, {aggregates}, COUNT(*), MIN(t), MAX(t)
+            FROM framed
+            GROUP BY resolution, bucket
+        """
+    
+    def hourly_span(self):
+        """(first, last) hourly timestamp in the source table"""
+        spec = self.spec
+        return self.connections.connection().execute(f"""
+            SELECT MIN({spec['time']}), MAX({spec['time']}) FROM {self.source} WHERE {spec['period']} = 'hourly'
+        """).fetchone()
+    
+    def backfill(self, start=None, end=None, resolutions=RESOLUTIONS):
+        """Rebuild every bucket touching [start, end] (default: all hourly rows) in one pass; returns buckets written"""
+        if start is None or end is None:
+            first, last = self.hourly_span()
+            if first is None:
+                return 0
+            start, end = start or first, end or last
+        
+        # Read whole buckets at both edges, so every rebuilt bucket sees all of its rows
+        params = {
+            'lo': min(bucket_start(resolution, start) for resolution in resolutions).isoformat(),
+            'hi': max(bucket_end(resolution, end) for resolution in resolutions).isoformat(),
+        }
+        for resolution in resolutions:
+            params[f'{resolution}_from'] = bucket_start(resolution, start).isoformat()
+            params[f'{resolution}_to'] = bucket_start(resolution, end).isoformat()
+        
+        with self.connections.transaction() as cursor:
+            for resolution in resolutions:
+                cursor.execute(f"DELETE FROM {self.table} WHERE resolution = ? AND bucket_start BETWEEN ? AND ?",
+                               (resolution, params[f'{resolution}_from'], params[f'{resolution}_to']))
+            cursor.execute(self._backfill_sql(resolutions), params)
+            return cursor.rowcount
+    
+    def _row_dict(self, row):
+        """A rollup row, with the mean values also under the keys hourly history rows use"""
+        bucket = dict(zip(ROW_COLUMNS, row))
+        bucket.update(timestamp=bucket['bucket_start'], ratio=bucket['ratio_mean'],
+                      market_cap=bucket['market_cap_mean'], realized_cap=bucket['realized_cap_mean'])
+        return bucket
+    
+    def history(self, resolution='day', limit=90, start=None, end=None):
+        """Latest `limit` buckets (None = all) of one resolution starting in [start, end), oldest first"""
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unknown rollup resolution '{resolution}', use one of {', '.join(RESOLUTIONS)}")
+        
+        conditions, params = time_window('bucket_start', start, end)
+        query = f"""
+            SELECT {', '.join(ROW_COLUMNS)} FROM {self.table}
+            WHERE {' AND '.join(['resolution = ?'] + conditions)}
+            ORDER BY bucket_start DESC
+        """
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        
+        rows = self.connections.connection().execute(query, [resolution] + params).fetchall()
+        return [self._row_dict(row) for row in reversed(rows)]
+    
+    def bucket(self, resolution, moment):
+        """The rollup holding moment, or None if it has no hourly rows"""
+        row = self.connections.connection().execute(f"""
+            SELECT {', '.join(ROW_COLUMNS)} FROM {self.table}
+            WHERE resolution = ? AND bucket_start = ?
+        """, (resolution, bucket_start(resolution, moment).isoformat())).fetchone()
+        return self._row_dict(row) if row else None
@@ -1,23 +1,42 @@
-import schedule
 import time
 import threading
 from datetime import datetime
 from data_collector import DataCollector
+from health_monitor import get_health_monitor
+from http_client import get_host_registry
+from job_executor import JobExecutor
 from mvrv_calculator import MVRVCalculator
+from response_cache import get_response_cache
+from single_flight import get_single_flight
 
 class MVRVScheduler:
     def __init__(self):
         self.collector = DataCollector()
         self.calculator = MVRVCalculator()
-        self.running = False
-        self.thread = None
+        
+        # Jobs run on a worker pool; overlaps are skipped and every run lands in job_runs
+        self.executor = JobExecutor(self.calculator.db.connections, max_workers=2)
+        # initial_setup refreshes everything on start, so only the daily job replays missed slots
+        self.executor.add_job('hourly', self.hourly_job, interval=3600, deadline=50 * 60, jitter=60, max_catch_up=0)
+        self.executor.add_job('daily', self.daily_job, at="00:30", deadline=60 * 60)
+    
+    @property
+    def running(self):
+        return self.executor.running
     
     def hourly_job(self):
         """Job to run every hour"""
         print(f"\n🕐 Hourly job started at {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
         
+        health = get_health_monitor()
+        print(f"📡 APIs: {health.describe()}")
+        if health.snapshot()['all_offline']:
+            print("📴 Every API is unreachable, skipping this hour's collection")
+            return False
+        
         # Collect fresh data
         success = self.collector.collect_all_data()
+        result = None
         
         if success:
             # Calculate MVRV
@@ -32,6 +51,14 @@ class MVRVScheduler:
         else:
             print("❌ Data collection failed")
         
+        print(f"🗃️ HTTP cache: {get_response_cache().describe()}")
+        print(f"🤝 Coalesced requests: {get_single_flight().describe()}")
+        print(f"🚦 API hosts: {get_host_registry().describe()}")
+        
+        # False marks the run failed in job_runs
+        if not result:
+            print("⚠️ Hourly job completed with errors\n")
+            return False
         print("✅ Hourly job completed\n")
     
     def daily_job(self):
@@ -45,6 +72,7 @@ class MVRVScheduler:
             print(f"📊 Data Points: {result['data_points']}")
         else:
             print("❌ Daily aggregation failed")
+            return False
         
         print("✅ Daily job completed\n")
     
@@ -68,25 +96,12 @@ class MVRVScheduler:
         
         print("🔄 Starting MVRV scheduler...")
         
-        # Run initial setup
+        # Start probing the APIs in the background, then run initial setup
+        get_health_monitor()
         self.initial_setup()
         
-        # Schedule jobs
-        schedule.every().hour.do(self.hourly_job)
-        schedule.every().day.at("00:30").do(self.daily_job)  # Run daily at 12:30 AM
-        
-        # For testing - run every 2 minutes instead of hourly
-        # schedule.every(2).minutes.do(self.hourly_job)
-        
-        self.running = True
-        
-        def run_scheduler():
-            while self.running:
-                schedule.run_pending()
-                time.sleep(60)  # Check every minute
-        
-        self.thread = threading.Thread(target=run_scheduler, daemon=True)
-        self.thread.start()
+        # Start dispatching (missed slots since the last run are caught up first)
+        self.executor.start()
         
         print("✅ Scheduler started successfully")
         print("📋 Schedule:")
@@ -100,25 +115,25 @@ class MVRVScheduler:
             return
         
         print("🛑 Stopping scheduler...")
-        self.running = False
-        
-        if self.thread:
-            self.thread.join(timeout=5)
-        
-        schedule.clear()
+        self.executor.stop(timeout=5)
         print("✅ Scheduler stopped")
     
     def run_manual_update(self):
         """Manually trigger data update and calculation"""
         print("🔄 Manual update triggered...")
-        self.hourly_job()
+        self.executor.run_now('hourly')
     
     def get_scheduler_status(self):
         """Get current scheduler status"""
+        jobs = self.executor.status()
         return {
             'running': self.running,
-            'next_jobs': [str(job) for job in schedule.jobs],
-            'job_count': len(schedule.jobs)
+            'next_jobs': [f"{job['name']} ({job['schedule']}) next at {job['next_run']}" for job in jobs],
+            'job_count': len(jobs),
+            'latency': self.executor.latency_summary(),
+            'api_health': get_health_monitor().snapshot(),
+            'http_coalescing': get_single_flight().stats(),
+            'http_hosts': get_host_registry().stats()
         }
 
 # Standalone execution
@@ -0,0 +1,81 @@
+"""
+Single-Flight Request Coalescing
+Concurrent callers asking for the same key wait on one in-flight call and share its outcome,
+so the dashboard, scheduler and backfills never fetch the same resource twice at once
+"""
+
+import threading
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """One call per key at a time; followers get the leader's result (or exception)"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.calls = 0          # Calls actually made
+        self.coalesced = 0      # Callers served by someone else's call
+    
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.calls += 1
+            else:
+                flight.waiters += 1
+                self.coalesced += 1
+        
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        
+        try:
+            flight.result = fn(*args, **kwargs)
+            return flight.result
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            # Later callers start a fresh call; this one's waiters are released with its outcome
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+    
+    def stats(self):
+        with self._lock:
+            requested = self.calls + self.coalesced
+            return {
+                'calls': self.calls,
+                'coalesced': self.coalesced,
+                'coalesced_rate': self.coalesced / requested if requested else 0.0,
+                'in_flight': len(self._flights)
+            }
+    
+    def describe(self):
+        stats = self.stats()
+        return f"{stats['calls']} calls, {stats['coalesced']} coalesced ({stats['coalesced_rate']:.0%})"
+
+
+_default_flights = None
+_default_flights_lock = threading.Lock()
+
+
+def get_single_flight():
+    """The process-wide group, shared by every CachingSession"""
+    global _default_flights
+    with _default_flights_lock:
+        if _default_flights is None:
+            _default_flights = SingleFlight()
+        return _default_flights
@@ -0,0 +1,110 @@
+"""
+Tests for the MVRV signal backtests and threshold sweeps
+"""
+
+import numpy as np
+import pytest
+
+import backtest
+from backtest import Backtester, RunTable, hold_forward, simulate, threshold_grid
+from my_database import MyPersonalDatabase
+from my_mvrv_engine import MY_SIGNALS, MY_ZONES, NEUTRAL_ZONE, MyMVRVEngine, classify_mvrv
+
+
+def synthetic_history(hours=5000, seed=11):
+    rng = np.random.default_rng(seed)
+    ratios = np.clip(1.6 + np.cumsum(rng.normal(0, 0.03, hours)), 0.5, 5.0)
+    prices = 20_000 * np.exp(np.cumsum(rng.normal(0, 0.006, hours)))
+    return ratios, prices
+
+
+SMALL_GRID = {'normal': [0.9, 1.0, 1.1], 'caution': [1.8, 2.4], 'greed': [3.0, 3.7]}
+
+
+def test_classification_matches_the_engine(tmp_path):
+    engine = MyMVRVEngine(my_db=MyPersonalDatabase(str(tmp_path / "my.db")))
+    values = np.array([0.5, 0.8, 0.99, 1.0, 2.39, 2.4, 3.7, 4.19, 4.2, 9.0])
+    
+    assert classify_mvrv(values).tolist() == [0, 1, 1, 2, 2, 3, 4, 4, 5, 5]
+    assert [engine.interpret_mvrv_my_way(v)['action'] for v in values] == \
+        [MY_ZONES[zone]['action'] for zone in classify_mvrv(values)]
+    assert engine.interpret_mvrv_my_way(4.5)['signal'] == '🔥 EXTREME GREED'
+    
+    tuned = MyMVRVEngine(my_db=engine.my_db, my_signals={'caution': 2.0})
+    assert tuned.interpret_mvrv_my_way(2.2)['action'] == 'REDUCE POSITION'
+    assert engine.interpret_mvrv_my_way(2.2)['action'] == 'HOLD'
+
+
+def test_missing_ratios_are_no_signal(tmp_path):
+    engine = MyMVRVEngine(my_db=MyPersonalDatabase(str(tmp_path / "my.db")))
+    
+    assert classify_mvrv(np.array([0.5, np.nan, 9.0])).tolist() == [0, NEUTRAL_ZONE, 5]
+    assert engine.interpret_mvrv_my_way(float('nan'))['action'] == 'HOLD'
+    
+    # Gaps in the history keep the position instead of selling everything
+    ratios, prices = synthetic_history(2000)
+    ratios[300:400] = np.nan
+    ratios[1500:1510] = np.nan
+    table = RunTable(ratios, prices, [MY_SIGNALS[name] for name in backtest.SIGNAL_EDGES])
+    expected = simulate(ratios, prices)
+    for name, value in table.evaluate(MY_SIGNALS).items():
+        assert value == pytest.approx(expected[name], rel=1e-9, abs=1e-12), name
+    
+    gaps = np.where(np.isnan(ratios), np.inf, ratios)
+    assert simulate(gaps, prices) != expected    # As EXTREME GREED they would have been sold
+
+
+def test_hold_carries_the_last_position():
+    targets = np.array([np.nan, 1.0, np.nan, np.nan, 0.5, np.nan, 0.0])
+    assert hold_forward(targets).tolist() == [0.0, 1.0, 1.0, 1.0, 0.5, 0.5, 0.0]
+
+
+def test_run_table_matches_the_reference():
+    ratios, prices = synthetic_history()
+    combos = list(threshold_grid(SMALL_GRID))
+    levels = sorted({signals[name] for signals in combos for name in backtest.SIGNAL_EDGES})
+    table = RunTable(ratios, prices, levels)
+    
+    assert len(combos) == 12
+    assert table.runs < len(ratios) / 5
+    for signals in combos:
+        expected = simulate(ratios, prices, signals)
+        for name, value in table.evaluate(signals).items():
+            assert value == pytest.approx(expected[name], rel=1e-9, abs=1e-12), name
+    
+    # Always invested, never trading: buy and hold
+    hodl = simulate(ratios, prices, dict(MY_SIGNALS, fear=10.0, normal=11.0, caution=12.0, greed=13.0,
+                                         extreme_greed=14.0), fee=0.0)
+    assert hodl['total_return'] == pytest.approx(prices[-1] / prices[0] - 1)
+    assert hodl['trades'] == 1 and hodl['exposure'] == 1.0
+
+
+def test_sweeps_are_cached_and_pooled(tmp_path, monkeypatch):
+    ratios, prices = synthetic_history(2000)
+    my_db = MyPersonalDatabase(str(tmp_path / "my.db"))
+    start = 1_600_000_000
+    my_db.connections.bulk_write("""
+        INSERT INTO my_mvrv_analysis (analysis_time, market_capitalization, realized_capitalization, mvrv_ratio,
+                                      analysis_period, analysis_time_epoch)
+        VALUES (datetime(?1, 'unixepoch'), ?2, ?3, ?4, 'hourly', ?1)
+    """, ((start + 3600 * h, p * 19e6, p * 19e6 / r, r) for h, (r, p) in enumerate(zip(ratios, prices))))
+    
+    backtester = Backtester(my_db)
+    assert backtester.periods_per_year == 24 * 365
+    ranked = backtester.sweep(SMALL_GRID, processes=1)
+    assert len(ranked) == 12
+    assert ranked[0]['sharpe'] >= ranked[-1]['sharpe']
+    assert ranked[0]['sharpe'] == pytest.approx(
+        simulate(ratios, prices * 19e6, ranked[0]['signals'])['sharpe'])
+    
+    # A second sweep, or a run of one of its sets, never recomputes
+    monkeypatch.setattr(backtest, 'RunTable', None)
+    monkeypatch.setattr(backtest, 'simulate', None)
+    assert backtester.sweep(SMALL_GRID, top=3) == ranked[:3]
+    assert Backtester(my_db).run(ranked[0]['signals']) == ranked[0]
+    monkeypatch.undo()
+    
+    my_db.connections.connection().execute("DELETE FROM backtest_results")
+    pooled = backtester.sweep(SMALL_GRID, processes=2, chunk_size=5)
+    assert [result['signals'] for result in pooled] == [result['signals'] for result in ranked]
+    assert pooled[0]['total_return'] == pytest.approx(ranked[0]['total_return'])
@@ -55,9 +55,9 @@ def test_blockchain_connection():
             # Show sample UTXO
             sample_utxo = utxos[0]
             print(f"   📊 Sample UTXO:")
-            print(f"      - TXID: {sample_utxo['txid'][:16]}...")
-            print(f"      - Value: {sample_utxo['value_btc']:.8f} BTC")
-            print(f"      - Timestamp: {sample_utxo['timestamp']}")
+            print(f"      - TXID: {sample_utxo['tx_hash'][:16]}...")
+            print(f"      - Value: {sample_utxo['btc_amount']:.8f} BTC")
+            print(f"      - Timestamp: {sample_utxo['creation_time']}")
             
             # Calculate statistics
             stats = blockchain.get_utxo_statistics(utxos)
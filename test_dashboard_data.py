@@ -0,0 +1,67 @@
+"""
+Tests for the change-aware dashboard data layer
+"""
+
+import threading
+
+import pytest
+
+from dashboard_data import DashboardData
+from my_database import MyPersonalDatabase
+from my_mvrv_engine import MyMVRVEngine
+
+
+def make_data(tmp_path):
+    my_db = MyPersonalDatabase(str(tmp_path / "my.db"))
+    for hour in range(48):
+        my_db.store_my_mvrv_analysis(f"2024-03-0{1 + hour // 24}T{hour % 24:02d}:00:00",
+                                     2e12, 1e12, 2.0 + hour / 100)
+    return my_db, DashboardData(my_db, MyMVRVEngine(my_db=my_db))
+
+
+def test_unchanged_database_is_served_from_memory(tmp_path, monkeypatch):
+    my_db, data = make_data(tmp_path)
+    calls = []
+    original = my_db.get_my_mvrv_history
+    monkeypatch.setattr(my_db, 'get_my_mvrv_history', lambda *args: calls.append(args) or original(*args))
+    
+    first = data.mvrv_history('hourly', 24)
+    for _ in range(5):
+        assert data.mvrv_history('hourly', 24) is first
+    data.mvrv_history('hourly', 48)
+    
+    assert calls == [('hourly', 24, None, None, None), ('hourly', 48, None, None, None)]
+    assert data.stats()['hits'] == 5
+    assert data.stats()['misses'] == 2
+
+
+def test_commits_from_any_thread_invalidate(tmp_path):
+    my_db, data = make_data(tmp_path)
+    
+    assert data.latest_mvrv()['ratio'] == pytest.approx(2.47)
+    assert data.database_stats()['my_mvrv_analysis'] == 48
+    
+    # Written on this thread's pooled connection
+    my_db.store_my_mvrv_analysis("2024-03-03T00:00:00", 2e12, 1e12, 3.0)
+    assert data.latest_mvrv()['ratio'] == 3.0
+    
+    # And from another session's thread
+    worker = threading.Thread(target=my_db.store_my_mvrv_analysis,
+                              args=("2024-03-03T01:00:00", 2e12, 1e12, 3.5))
+    worker.start()
+    worker.join()
+    assert data.latest_mvrv()['ratio'] == 3.5
+    assert data.database_stats()['my_mvrv_analysis'] == 50
+    assert data.insights()['current_mvrv'] == 3.5
+
+
+def test_change_token_is_stable_without_writes(tmp_path):
+    my_db, data = make_data(tmp_path)
+    
+    token = my_db.connections.change_token()
+    data.mvrv_rollups('day', 7)
+    my_db.get_my_mvrv_history('hourly', 10)
+    
+    assert my_db.connections.change_token() == token
+    assert data.mvrv_rollups('day', 7)[-1]['samples'] == 24
+    assert data.stats()['hit_rate'] == 0.5
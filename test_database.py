@@ -0,0 +1,268 @@
+"""
+Tests for the pooled database layer
+"""
+
+import sqlite3
+import threading
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+
+from database import MVRVDatabase
+from db_connection import get_connection_manager
+from my_database import MyPersonalDatabase
+from price_index import to_epoch
+from utxo_batch import UtxoBatch
+
+
+def test_connection_is_reused_per_thread(tmp_path):
+    manager = get_connection_manager(str(tmp_path / "pool.db"))
+    
+    assert manager.connection() is manager.connection()
+    assert get_connection_manager(str(tmp_path / "pool.db")) is manager
+    
+    other = []
+    worker = threading.Thread(target=lambda: other.append(manager.connection()))
+    worker.start()
+    worker.join()
+    
+    assert other[0] is not manager.connection()
+
+
+def test_connection_pragmas_applied(tmp_path):
+    manager = get_connection_manager(str(tmp_path / "pragmas.db"))
+    conn = manager.connection()
+    
+    assert conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1  # NORMAL
+    assert conn.execute("PRAGMA cache_size").fetchone()[0] == -64000
+    
+    # The shared manager keeps its settings: matching pragmas are fine, different ones are refused
+    path = str(tmp_path / "pragmas.db")
+    assert get_connection_manager(path, {'synchronous': 'NORMAL'}) is manager
+    with pytest.raises(ValueError):
+        get_connection_manager(path, {'synchronous': 'FULL'})
+
+
+def test_transaction_rolls_back_on_error(tmp_path):
+    db = MVRVDatabase(str(tmp_path / "mvrv.db"))
+    
+    try:
+        with db.connections.transaction() as cursor:
+            cursor.execute("INSERT INTO price_data (timestamp, price_usd, supply) VALUES ('t1', 1, 1)")
+            with db.connections.transaction() as inner:
+                inner.execute("INSERT INTO price_data (timestamp, price_usd, supply) VALUES ('t2', 2, 2)")
+            raise RuntimeError("boom")
+    except RuntimeError:
+        pass
+    
+    count = db.connections.connection().execute("SELECT COUNT(*) FROM price_data").fetchone()[0]
+    assert count == 0
+
+
+def test_mvrv_database_round_trip(tmp_path):
+    db = MVRVDatabase(str(tmp_path / "mvrv.db"))
+    
+    db.insert_price_data("2024-01-01T00:00:00", 42000.0, 19_500_000)
+    db.insert_historical_price("2024-01-01T00:00:00", 42000.0)
+    db.insert_historical_price("2024-01-02T00:00:00", 43000.0)
+    db.insert_mvrv_ratio("2024-01-02T00:00:00", 8e11, 4e11, 2.0)
+    
+    assert db.get_latest_price_data() == (42000.0, 19_500_000, "2024-01-01T00:00:00")
+    assert db.get_price_at_timestamp("2024-01-01T12:00:00") == 42000.0
+    assert db.get_price_at_timestamp("2023-12-31T00:00:00") is None
+    assert db.get_latest_mvrv()['ratio'] == 2.0
+    assert len(db.get_mvrv_history()) == 1
+
+
+def test_my_database_round_trip(tmp_path):
+    db = MyPersonalDatabase(str(tmp_path / "mine.db"))
+    
+    db.store_my_price_discovery("2024-01-01T00:00:00", 42000.0, 19_500_000)
+    db.remember_historical_price("2024-01-01T00:00:00", 42000.0)
+    db.store_my_utxo_discoveries([
+        ("tx_a", 0.5, "2024-01-01T00:00:00", 21000.0, 0.9),
+        ("tx_b", 1.0, "2024-01-01T00:00:00", 42000.0),
+    ])
+    db.store_my_mvrv_analysis("2024-01-01T01:00:00", 8e11, 4e11, 2.0, signal="HOLD")
+    
+    assert db.get_my_latest_price_data()[0] == 42000.0
+    assert db.get_price_from_my_history("2024-01-05T00:00:00") == 42000.0
+    assert db.get_my_latest_mvrv()['signal'] == "HOLD"
+    
+    stats = db.get_my_database_stats()
+    assert stats['my_utxo_discoveries'] == 2
+    assert stats['my_mvrv_analysis'] == 1
+
+
+def test_bulk_historical_prices_single_transaction(tmp_path):
+    db = MVRVDatabase(str(tmp_path / "mvrv.db"))
+    rows = ((f"2024-01-01T{h:02d}:00:00", 40000.0 + h) for h in range(24))
+    
+    assert db.insert_historical_prices(rows, chunk_size=5) == 24
+    assert db.get_price_at_timestamp("2024-01-01T10:30:00") == 40010.0
+    assert db.insert_historical_prices([]) == 0
+
+
+def test_bulk_remember_historical_prices(tmp_path):
+    db = MyPersonalDatabase(str(tmp_path / "mine.db"))
+    rows = [(f"2024-01-{d:02d}T00:00:00", 40000.0 + d) for d in range(1, 11)]
+    
+    assert db.remember_historical_prices(iter(rows), chunk_size=3) == 10
+    assert db.get_price_from_my_history("2024-01-05T12:00:00") == 40005.0
+
+
+def test_price_index_matches_sql_lookup(tmp_path):
+    db = MVRVDatabase(str(tmp_path / "mvrv.db"))
+    db.insert_historical_prices([
+        ("2024-01-03T00:00:00", 103.0),
+        ("2024-01-01T00:00:00", 101.0),
+        ("2024-01-02T00:00:00", 102.0),
+    ])
+    index = db.get_price_index()
+    
+    assert len(index) == 3
+    assert index.price_at("2024-01-02T06:00:00") == 102.0
+    assert index.price_at(to_epoch("2024-01-03T00:00:00")) == 103.0
+    assert index.price_at("2023-12-31T23:59:59") is None
+    
+    prices = index.prices_at([to_epoch("2023-01-01T00:00:00"), to_epoch("2024-01-01T12:00:00")])
+    assert np.isnan(prices[0]) and prices[1] == 101.0
+
+
+def test_price_index_stays_in_sync(tmp_path):
+    path = str(tmp_path / "mine.db")
+    db = MyPersonalDatabase(path)
+    db.remember_historical_price("2024-01-01T00:00:00", 100.0)
+    index = db.get_my_price_index()
+    
+    # Writes through any client of the same file update the shared index
+    MyPersonalDatabase(path).remember_historical_price("2024-01-02T00:00:00", 200.0)
+    db.remember_historical_price("2024-01-01T00:00:00", 150.0)
+    assert index.price_at("2024-01-02T01:00:00") == 200.0
+    assert index.price_at("2024-01-01T01:00:00") == 150.0
+    
+    # Writes from outside the process are picked up by the next lookup
+    conn = sqlite3.connect(path)
+    conn.execute("INSERT INTO my_price_memory (price_date, btc_price_usd) VALUES ('2024-01-03T00:00:00', 300.0)")
+    conn.commit()
+    conn.close()
+    
+    assert db.get_price_from_my_history("2024-01-04T00:00:00") == 300.0
+    assert index.refresh() == 0   # Nothing new since
+
+
+def test_rolled_back_prices_stay_out_of_the_index(tmp_path):
+    db = MVRVDatabase(str(tmp_path / "mvrv.db"))
+    index = db.get_price_index()
+    
+    def rows():
+        yield from ((f"2024-01-01T{h:02d}:00:00", 40000.0 + h) for h in range(10))
+        raise RuntimeError("feed broke mid-batch")
+    
+    with pytest.raises(RuntimeError):
+        db.insert_historical_prices(rows(), chunk_size=3)
+    assert len(index) == 0
+    assert db.get_price_at_timestamp("2024-01-01T05:00:00") is None
+
+
+def test_bulk_utxo_discoveries_upsert(tmp_path):
+    db = MyPersonalDatabase(str(tmp_path / "mine.db"))
+    rows = [
+        ("aa", 1.0, "2024-01-01T00:00:00", 40000.0, 0.7),
+        ("bb", 2.0, "2024-01-01T01:00:00", 80000.0),            # Basic format keeps the defaults
+        ("cc", 3.0, "2024-01-01T02:00:00", 120000.0, 0.95),
+        ("aa", 1.5, "2024-01-01T03:00:00", 60000.0, 0.9),       # Later duplicate wins
+    ]
+    
+    assert db.store_my_utxo_discoveries(iter(rows), chunk_size=3) == 4
+    
+    stored = db.connections.connection().execute("""
+        SELECT transaction_id, btc_value, confidence_score, my_quality_rating
+        FROM my_utxo_discoveries ORDER BY transaction_id
+    """).fetchall()
+    assert stored == [("aa", 1.5, 0.9, 9), ("bb", 2.0, 0.8, 5), ("cc", 3.0, 0.95, 9)]
+    
+    # Duplicates in mixed formats within one chunk: input order decides, not the format
+    db.store_my_utxo_discoveries([
+        ("bb", 2.5, "2024-01-02T00:00:00", 90000.0, 0.6),
+        ("bb", 2.6, "2024-01-02T01:00:00", 91000.0),
+        ("cc", 3.5, "2024-01-02T02:00:00", 130000.0),
+        ("cc", 3.6, "2024-01-02T03:00:00", 131000.0, 0.65),
+    ])
+    stored = db.connections.connection().execute("""
+        SELECT transaction_id, btc_value, confidence_score, my_quality_rating
+        FROM my_utxo_discoveries WHERE transaction_id IN ('bb', 'cc') ORDER BY transaction_id
+    """).fetchall()
+    assert stored == [("bb", 2.6, 0.8, 5), ("cc", 3.6, 0.65, 6)]
+
+
+def test_bulk_utxo_discoveries_from_batch(tmp_path):
+    db = MyPersonalDatabase(str(tmp_path / "mine.db"))
+    batch = UtxoBatch()
+    for i in range(10):
+        batch.append(f"tx_{i}", 0, 0.1 * (i + 1), 1_700_000_000 + i * 600, confidence=0.6)
+    
+    assert db.store_my_utxo_discoveries(batch, usd_values=np.arange(10) * 1000.0) == 10
+    assert db.connections.connection().execute(
+        "SELECT SUM(usd_value_when_created), MIN(my_quality_rating) FROM my_utxo_discoveries"
+    ).fetchone() == (45000.0, 6)
+    
+    with pytest.raises(ValueError):
+        db.store_my_utxo_discoveries(batch)
+
+
+def query_plan(db, query, params=()):
+    rows = db.connections.connection().execute(f"EXPLAIN QUERY PLAN {query}", params).fetchall()
+    return " | ".join(row[3] for row in rows)
+
+
+def test_history_queries_stay_index_only(tmp_path):
+    db = MVRVDatabase(str(tmp_path / "mvrv.db"))
+    my_db = MyPersonalDatabase(str(tmp_path / "mine.db"))
+    
+    plans = [
+        query_plan(db, *db.mvrv_history_query('hourly', None, start="2024-01-01T00:00:00")),
+        query_plan(db, *db.mvrv_history_query('hourly', 168, "2024-01-01", "2024-02-01", "2024-01-15")),
+        query_plan(db, *db.mvrv_history_query('daily')),
+        query_plan(my_db, *my_db.my_mvrv_history_query('hourly', None, start="2024-01-01T00:00:00")),
+        query_plan(my_db, *my_db.my_mvrv_history_query('hourly', 10, since="2024-01-01T00:00:00")),
+    ]
+    for plan in plans[:3]:
+        assert "USING COVERING INDEX idx_mvrv_timeframe_time" in plan
+    for plan in plans[3:]:
+        assert "USING COVERING INDEX idx_my_mvrv_period_time" in plan
+    assert not any("TEMP B-TREE" in plan for plan in plans)
+    
+    # The latest-reading lookups ride the same indexes
+    assert "idx_mvrv_timeframe_time" in query_plan(
+        db, "SELECT timestamp, ratio FROM mvrv_ratios WHERE timeframe = 'hourly' ORDER BY timestamp DESC LIMIT 1")
+    assert "COVERING INDEX idx_my_mvrv_period_time" in query_plan(my_db, """
+        SELECT analysis_time, market_capitalization, realized_capitalization, mvrv_ratio, my_signal, my_confidence
+        FROM my_mvrv_analysis WHERE analysis_period = 'hourly' ORDER BY analysis_time DESC LIMIT 1
+    """)
+
+
+def test_history_time_ranges(tmp_path):
+    db = MVRVDatabase(str(tmp_path / "mvrv.db"))
+    my_db = MyPersonalDatabase(str(tmp_path / "mine.db"))
+    for hour in range(48):
+        moment = f"2024-03-0{1 + hour // 24}T{hour % 24:02d}:00:00"
+        db.insert_mvrv_ratio(moment, 2e12, 1e12, 2.0 + hour / 100)
+        my_db.store_my_mvrv_analysis(moment, 2e12, 1e12, 2.0 + hour / 100)
+    
+    for history in (db.get_mvrv_history, my_db.get_my_mvrv_history):
+        window = history('hourly', None, start="2024-03-01T12:00:00", end="2024-03-02T00:00:00")
+        assert [row['timestamp'][11:13] for row in window] == [f"{hour:02d}" for hour in range(12, 24)]
+        
+        latest = history('hourly', 3, start=datetime(2024, 3, 1))
+        assert [row['timestamp'] for row in latest] == [
+            "2024-03-02T21:00:00", "2024-03-02T22:00:00", "2024-03-02T23:00:00"]
+        
+        assert len(history('hourly', None, since="2024-03-02T20:00:00")) == 3
+        assert len(history('hourly', None)) == 48
+        assert history('hourly', None, start="2024-03-03") == []
+    
+    days = my_db.get_my_mvrv_rollups('day', None, start=date(2024, 3, 2))
+    assert [day['bucket_start'] for day in days] == ["2024-03-02"]
@@ -0,0 +1,100 @@
+"""
+Tests for chart downsampling
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from downsampling import downsample_frame, line_mode, lttb, min_max, payload_bytes, use_webgl
+
+
+def reference_lttb(x, y, threshold):
+    """Textbook LTTB (Steinarsson 2013), one point at a time"""
+    n = len(x)
+    every = (n - 2) / (threshold - 2)
+    picked, a = [0], 0
+    for i in range(threshold - 2):
+        start, end = int(i * every) + 1, int((i + 1) * every) + 1
+        next_start, next_end = end, min(int((i + 2) * every) + 1, n)
+        if i == threshold - 3:
+            next_start, next_end = n - 1, n
+        avg_x = sum(x[next_start:next_end]) / (next_end - next_start)
+        avg_y = sum(y[next_start:next_end]) / (next_end - next_start)
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+            if area > best_area:
+                best, best_area = j, area
+        picked.append(best)
+        a = best
+    return picked + [n - 1]
+
+
+def noisy_series(n=20_000, seed=3):
+    rng = np.random.default_rng(seed)
+    y = 1.5 + np.cumsum(rng.normal(0, 0.01, n))
+    y[n // 5] += 3.0      # A spike a downsampler must not lose
+    y[n * 3 // 4] -= 2.0
+    return np.arange(n, dtype=float) * 3600, y
+
+
+def test_lttb_matches_reference_and_keeps_spikes():
+    x, y = noisy_series(5000)
+    picked = lttb(x, y, 500)
+    
+    assert len(picked) == 500
+    assert picked.tolist() == reference_lttb(x.tolist(), y.tolist(), 500)
+    assert picked[0] == 0 and picked[-1] == len(x) - 1
+    assert len(x) // 5 in picked
+    assert np.all(np.diff(picked) > 0)
+
+
+def test_lttb_returns_everything_under_budget():
+    x, y = noisy_series(100)
+    assert lttb(x, y, 100).tolist() == list(range(100))
+    assert lttb(x, y, 2).tolist() == list(range(100))
+
+
+def test_min_max_keeps_every_bucket_extreme():
+    _, y = noisy_series()
+    picked = min_max(y, 250)
+    
+    assert len(picked) <= 2 * 250 + 2
+    assert {int(np.argmax(y)), int(np.argmin(y)), 0, len(y) - 1} <= set(picked.tolist())
+    for bucket in np.array_split(np.arange(len(y)), 250):
+        assert int(bucket[np.argmax(y[bucket])]) in picked
+
+
+def test_downsample_frame_budget_and_columns():
+    x, y = noisy_series()
+    frame = pd.DataFrame({
+        'timestamp': pd.to_datetime(x, unit='s'),
+        'ratio': y,
+        'market_cap': y * 4e11,
+        'realized_cap': np.linspace(3e11, 5e11, len(y))
+    })
+    
+    assert len(downsample_frame(frame.head(1000), 'ratio', 1500)) == 1000
+    assert len(downsample_frame(frame, 'ratio', None)) == len(frame)
+    
+    thinned = downsample_frame(frame, 'ratio', 1500)
+    assert len(thinned) == 1500
+    assert thinned['ratio'].max() == frame['ratio'].max()
+    assert thinned['timestamp'].is_monotonic_increasing
+    
+    caps = downsample_frame(frame, ['market_cap', 'realized_cap'], 1500, method='minmax')
+    assert len(caps) <= 1500
+    assert caps['market_cap'].min() == frame['market_cap'].min()
+    
+    with pytest.raises(ValueError):
+        downsample_frame(frame, 'ratio', 100, method='every_nth')
+
+
+def test_render_helpers_and_payload():
+    x, y = noisy_series()
+    frame = pd.DataFrame({'timestamp': pd.to_datetime(x, unit='s'), 'ratio': y})
+    
+    assert payload_bytes(downsample_frame(frame, 'ratio', 1500), ['ratio']) < payload_bytes(frame, ['ratio']) / 10
+    assert use_webgl(5000) and not use_webgl(500)
+    assert line_mode(100) == 'lines+markers' and line_mode(5000) == 'lines'
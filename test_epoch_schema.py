@@ -0,0 +1,135 @@
+"""
+Tests for the integer epoch columns and their migration
+"""
+
+import sqlite3
+import time
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+import pytest
+
+from database import MVRVDatabase
+from epoch_schema import SCHEMA_VERSION, utc_epoch, utc_iso
+from my_database import MyPersonalDatabase
+from price_index import to_epoch
+from price_resolver import DAY, PriceResolver
+
+NEW_YEAR = 1704067200  # 2024-01-01T00:00:00Z
+
+
+def legacy_database(path, timestamps):
+    """A version 1 database: ISO TEXT timestamps only"""
+    conn = sqlite3.connect(path)
+    conn.execute("""
+        CREATE TABLE historical_prices (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            price_usd REAL NOT NULL,
+            UNIQUE(timestamp)
+        )
+    """)
+    conn.executemany("INSERT INTO historical_prices (timestamp, price_usd) VALUES (?, ?)",
+                     [(moment, 40000.0 + i) for i, moment in enumerate(timestamps)])
+    conn.commit()
+    conn.close()
+
+
+@pytest.fixture
+def new_york(monkeypatch):
+    """Run on a host whose local time is not UTC"""
+    monkeypatch.setenv('TZ', 'America/New_York')
+    time.tzset()
+    yield
+    monkeypatch.undo()
+    time.tzset()
+
+
+def test_utc_epoch_accepts_every_form():
+    assert utc_epoch("2024-01-01T00:00:00") == NEW_YEAR
+    assert utc_epoch("2024-01-01T02:00:00+02:00") == NEW_YEAR
+    assert utc_epoch("2024-01-01T00:00:00Z") == NEW_YEAR
+    assert utc_epoch(datetime(2024, 1, 1)) == NEW_YEAR
+    assert utc_epoch(datetime(2024, 1, 1, tzinfo=timezone.utc)) == NEW_YEAR
+    assert utc_epoch(date(2024, 1, 1)) == NEW_YEAR
+    assert utc_epoch(np.int64(NEW_YEAR)) == NEW_YEAR
+
+
+def test_legacy_database_migrates_in_batches(tmp_path):
+    timestamps = [
+        "2024-01-01T00:00:00",
+        "2024-01-01 01:00:00",
+        "2024-01-01T02:00:00.123456",
+        "2024-01-01T05:00:00+02:00",
+        "2024-01-01T04:00:00Z",
+        "2024-01-02",
+        "not a time",
+    ]
+    legacy_database(str(tmp_path / "legacy.db"), timestamps)
+    db = MVRVDatabase(str(tmp_path / "legacy.db"))
+    
+    assert db.epochs.version() < SCHEMA_VERSION
+    assert db.epochs.pending()['historical_prices'] == 7
+    
+    result = db.epochs.migrate(batch_size=2)
+    
+    assert result['converted']['historical_prices'] == 6
+    assert result['unparseable'] == {'price_data': 0, 'utxo_data': 0, 'historical_prices': 1, 'mvrv_ratios': 0}
+    assert db.epochs.version() == SCHEMA_VERSION
+    
+    series = db.get_historical_price_series()
+    assert series['epoch'].dtype == np.int64
+    assert (series['epoch'] - NEW_YEAR).tolist() == [0, 3600, 7200, 10800, 14400, 86400]
+    assert series['price_usd'].tolist() == [40000.0, 40001.0, 40002.0, 40003.0, 40004.0, 40005.0]
+    
+    assert db.epochs.migrate()['converted']['historical_prices'] == 0
+
+
+def test_new_writes_fill_epochs(tmp_path):
+    db = MVRVDatabase(str(tmp_path / "mvrv.db"))
+    my_db = MyPersonalDatabase(str(tmp_path / "mine.db"))
+    assert db.epochs.version() == my_db.my_epochs.version() == SCHEMA_VERSION
+    
+    start = datetime(2024, 3, 1)
+    for hour in range(48):
+        moment = (start + timedelta(hours=hour)).isoformat()
+        db.insert_mvrv_ratio(moment, 2e12, 1e12, 2.0 + hour / 100)
+        my_db.store_my_mvrv_analysis(moment, 2e12, 1e12, 2.0 + hour / 100)
+    my_db.remember_historical_prices([("2024-03-01", 61000.0), ("2024-03-02", 62000.0)])
+    my_db.store_my_utxo_discoveries([("tx_a", 0.5, "2024-03-01T00:00:00", 30500.0, 0.9)])
+    
+    my_db.remember_historical_price("2024-03-03", 63000.0)
+    my_db.store_my_price_discovery("2024-03-03T00:00:00", 63000.0, 19_650_000)
+    my_db.save_my_insight('test', "Epochs everywhere")
+    db.insert_price_data("2024-03-03T00:00:00", 63000.0, 19_650_000)
+    db.insert_utxo_data([("tx_a", 0.5, "2024-03-01T00:00:00", 30500.0)])
+    db.insert_mvrv_ratio(start.isoformat(), 2e12, 1e12, 1.5)  # Replaced rows keep their epoch
+    
+    assert sum(db.epochs.pending().values()) == 0
+    assert sum(my_db.my_epochs.pending().values()) == 0
+    
+    for series in (db.get_mvrv_series('hourly', start="2024-03-02", end=datetime(2024, 3, 2, 12)),
+                   my_db.get_my_mvrv_series('hourly', "2024-03-02", datetime(2024, 3, 2, 12))):
+        assert len(series['epoch']) == 12
+        assert np.all(np.diff(series['epoch']) == 3600)
+        assert series['ratio'][0] == 2.24
+    
+    assert db.get_mvrv_series()['ratio'][0] == 1.5
+    assert my_db.get_my_price_series()['epoch'].tolist() == [utc_epoch(day) for day in ("2024-03-01", "2024-03-02", "2024-03-03")]
+    assert len(my_db.get_my_mvrv_series('daily')['epoch']) == 0
+
+
+def test_stored_times_are_utc_on_a_non_utc_host(new_york, tmp_path, stub_api):
+    assert time.timezone != 0
+    assert utc_iso(NEW_YEAR) == "2024-01-01T00:00:00"
+    assert to_epoch("2024-01-01T00:00:00") == utc_epoch("2024-01-01T00:00:00") == NEW_YEAR
+    
+    db = MVRVDatabase(str(tmp_path / "mvrv.db"))
+    resolver = PriceResolver(db.get_price_index, db.insert_historical_prices, f"{stub_api.base_url}/prices")
+    prices = resolver.resolve(np.array([NEW_YEAR + 3600, NEW_YEAR + DAY + 60], dtype=np.float64))
+    
+    # The fetched 00:00 UTC points keep their epochs through the text column, the SQL twin and the index
+    series = db.get_historical_price_series(start="2024-01-01", end="2024-01-03")
+    assert series['epoch'].tolist() == [NEW_YEAR, NEW_YEAR + DAY]
+    assert prices.tolist() == [stub_api.daily_price(NEW_YEAR), stub_api.daily_price(NEW_YEAR + DAY)]
+    assert db.get_price_at_timestamp("2024-01-01T23:59:59") == stub_api.daily_price(NEW_YEAR)
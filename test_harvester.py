@@ -0,0 +1,125 @@
+"""
+Tests for UTXO harvesting against a local stub of the blockchain APIs
+"""
+
+from async_harvester import AsyncUtxoHarvester
+from blockchain_integration import BlockchainIntegration
+from btc_brain import BitcoinBrain
+from conftest import StubApiServer
+
+
+def brain_for(stub):
+    """A BitcoinBrain whose endpoints point at the stub server"""
+    brain = BitcoinBrain()
+    brain.my_apis = {
+        'mempool': f"{stub.base_url}/mempool",
+        'explorer': f"{stub.base_url}/explorer",
+        'prices': f"{stub.base_url}/coingecko"
+    }
+    return brain
+
+
+def serial_hunt(brain, target_utxos, block_count=25, tx_per_block=12):
+    """The original one-request-at-a-time hunt, used as the reference output"""
+    collected = []
+    for block in brain.fetch_recent_bitcoin_blocks(block_count):
+        if len(collected) >= target_utxos:
+            break
+        for tx_id in brain.extract_transactions_from_block(block['id'], tx_per_block):
+            if len(collected) >= target_utxos:
+                break
+            tx_details = brain.analyze_transaction_deeply(tx_id)
+            if tx_details:
+                collected.extend(brain.discover_utxos_from_transaction(tx_details, block['timestamp']))
+    return collected
+
+
+def test_async_harvest_matches_serial_output(stub_api):
+    brain = brain_for(stub_api)
+    expected = serial_hunt(brain, 70)
+    
+    harvester = AsyncUtxoHarvester(brain, max_in_flight_per_host=4, requests_per_second=1000,
+                                   use_block_payloads=False)
+    harvested = harvester.run(70)
+    
+    assert list(harvested) == expected
+    assert set(harvested[0]) == {'tx_hash', 'output_position', 'btc_amount', 'creation_time',
+                                 'recipient_address', 'script_pattern', 'my_confidence'}
+
+
+def test_async_harvest_bounds_requests_in_flight():
+    with StubApiServer(blocks=3, txs_per_block=12, latency=0.02) as stub:
+        harvester = AsyncUtxoHarvester(brain_for(stub), max_in_flight_per_host=3, requests_per_second=1000,
+                                       use_block_payloads=False)
+        harvested = harvester.run(10_000)
+    
+    assert len(harvested) == 3 * 12 * 3
+    assert 1 < stub.max_in_flight <= 3
+
+
+def test_async_harvest_survives_missing_transactions(stub_api):
+    brain = brain_for(stub_api)
+    brain.my_apis['explorer'] = f"{stub_api.base_url}/nowhere"
+    
+    harvester = AsyncUtxoHarvester(brain, requests_per_second=1000, use_block_payloads=False)
+    
+    assert len(harvester.run(50)) == 0
+
+
+def block_payload_utxos(stub, brain, tx_per_block):
+    """Every UTXO of the first tx_per_block transactions of each block, newest block first"""
+    return [
+        utxo
+        for block in reversed(stub.blocks)
+        for tx in stub.block_txs[block['id']][:tx_per_block]
+        for utxo in brain.discover_utxos_from_transaction(tx, block['timestamp'])
+    ]
+
+
+def test_block_payload_harvest_pages_through_blocks(stub_api):
+    brain = brain_for(stub_api)
+    expected = block_payload_utxos(stub_api, brain, 30)
+    
+    harvester = AsyncUtxoHarvester(brain, requests_per_second=1000)
+    harvested = harvester.run(10_000, tx_per_block=30)
+    
+    assert list(harvested) == expected
+    assert stub_api.count(r'/txs/25$') == len(stub_api.blocks)
+    assert stub_api.count(r'/tx/') == 0
+    assert harvester.stats.utxos == len(expected)
+
+
+def test_block_payload_harvest_spreads_over_blocks(stub_api):
+    brain = brain_for(stub_api)
+    
+    harvested = AsyncUtxoHarvester(brain, requests_per_second=1000).run(108, tx_per_block=12)
+    
+    # 12 transactions of 3 outputs per block: the newest block alone would have filled the sample
+    assert list(harvested) == block_payload_utxos(stub_api, brain, 12)[:108]
+    assert len({utxo['creation_time'] for utxo in harvested}) == 3
+    assert stub_api.count(r'/txs/25$') == 0
+
+
+def test_block_payloads_cut_requests_per_utxo(stub_api):
+    brain = brain_for(stub_api)
+    
+    per_tx = AsyncUtxoHarvester(brain, requests_per_second=1000, use_block_payloads=False)
+    per_tx.run(300)
+    payloads = AsyncUtxoHarvester(brain, requests_per_second=1000)
+    payloads.run(300)
+    
+    assert payloads.stats.requests_per_utxo() * 10 <= per_tx.stats.requests_per_utxo()
+
+
+def test_blockchain_integration_block_payload_sample(stub_api):
+    blockchain = BlockchainIntegration()
+    blockchain.mempool_base = f"{stub_api.base_url}/mempool"
+    blockchain.blockstream_base = f"{stub_api.base_url}/explorer"
+    
+    utxos = blockchain.fetch_real_utxo_sample(120)
+    
+    assert len(utxos) == 120
+    assert utxos.txid(0) == stub_api.block_txs[stub_api.blocks[-1]['id']][0]['txid']
+    assert blockchain.harvest_stats.requests == 4  # /blocks and the first page of the newest three blocks
+    assert len(set(utxos.creation_time.tolist())) == 3
+    assert stub_api.count(r'/tx/') == 0
@@ -0,0 +1,78 @@
+"""
+Tests for the background API health monitor
+"""
+
+import time
+
+from btc_brain import BitcoinBrain
+from conftest import StubApiServer
+from health_monitor import HealthMonitor
+
+
+def stub_brain(stub):
+    brain = BitcoinBrain()
+    brain.my_apis = {
+        'mempool': f"{stub.base_url}/mempool",
+        'explorer': f"{stub.base_url}/explorer",
+        'prices': f"{stub.base_url}/prices"
+    }
+    return brain
+
+
+def test_probes_run_concurrently():
+    with StubApiServer(latency=0.3) as stub:
+        monitor = HealthMonitor.for_brain(stub_brain(stub))
+        
+        started = time.perf_counter()
+        results = monitor.check_now()
+        elapsed = time.perf_counter() - started
+    
+    assert results == {'mempool': True, 'explorer': True, 'prices': True}
+    assert stub.max_in_flight == 3
+    assert elapsed < 0.8  # Serial probes would need 0.9s
+    
+    snapshot = monitor.snapshot()
+    assert snapshot['checked'] and snapshot['brain_online'] and not snapshot['all_offline']
+    assert snapshot['endpoints']['prices']['latency_ms'] >= 300
+
+
+def test_rolling_availability_and_latency(stub_api):
+    monitor = HealthMonitor({
+        'mempool': f"{stub_api.base_url}/mempool/blocks/tip/height",
+        'broken': f"{stub_api.base_url}/nowhere"
+    }, window=4)
+    
+    for _ in range(6):
+        monitor.check_now()
+    stub_api.route = lambda path, query=None: (503, {'error': 'down'})
+    monitor.check_now()
+    
+    endpoints = monitor.snapshot()['endpoints']
+    assert endpoints['mempool']['probes'] == 4
+    assert endpoints['mempool']['availability'] == 0.75
+    assert endpoints['mempool']['online'] is False
+    assert endpoints['mempool']['error'] == "HTTP 503"
+    assert endpoints['mempool']['avg_latency_ms'] > 0
+    assert endpoints['broken']['availability'] == 0.0
+    assert endpoints['broken']['avg_latency_ms'] is None
+    assert monitor.snapshot()['all_offline']
+
+
+def test_snapshot_never_waits_for_the_network():
+    with StubApiServer(latency=1.0) as stub:
+        monitor = HealthMonitor.for_brain(stub_brain(stub), interval=60)
+        monitor.start()
+        try:
+            started = time.perf_counter()
+            snapshot = monitor.snapshot()
+            assert time.perf_counter() - started < 0.1
+            assert not snapshot['checked'] and not snapshot['brain_online'] and not snapshot['all_offline']
+            assert "mempool ?" in monitor.describe()
+            
+            deadline = time.time() + 10
+            while not monitor.snapshot()['checked'] and time.time() < deadline:
+                time.sleep(0.05)
+            assert monitor.snapshot()['brain_online']
+            assert "explorer up" in monitor.describe()
+        finally:
+            monitor.stop(timeout=0)
@@ -0,0 +1,347 @@
+"""
+Tests for the HTTP layer: response caching, request coalescing, rate limits, retries and circuit breakers
+"""
+
+import threading
+import time
+from email.utils import formatdate
+
+import pytest
+import requests
+
+from btc_brain import BitcoinBrain
+from conftest import StubApiServer
+from http_client import CircuitBreaker, CircuitOpenError, new_session, retry_after_seconds
+from response_cache import CachingSession, ResponseCache
+from single_flight import SingleFlight
+
+
+class FakeClock:
+    def __init__(self, now=1_700_000_000.0):
+        self.now = now
+    
+    def __call__(self):
+        return self.now
+
+
+def test_cache_policies(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"))
+    txid = "ab" * 32
+    
+    assert cache.ttl_for(f"https://blockstream.info/api/tx/{txid}") == (True, None)
+    assert cache.ttl_for(f"https://mempool.space/api/block/{txid}/txs/25") == (True, None)
+    assert cache.ttl_for("https://api.coingecko.com/api/v3/coins/bitcoin/history", {'date': '01-01-2020'}) == (True, None)
+    assert cache.ttl_for("https://mempool.space/api/blocks") == (True, 60)
+    assert cache.ttl_for("https://mempool.space/api/blocks/tip/height") == (True, 30)
+    assert cache.ttl_for("https://api.coingecko.com/api/v3/ping") == (False, None)
+
+
+def test_cache_hits_misses_and_ttl(tmp_path):
+    clock = FakeClock()
+    cache = ResponseCache(str(tmp_path / "cache.db"), clock=clock)
+    blocks_url = "https://mempool.space/api/blocks"
+    
+    assert cache.lookup(blocks_url) is None
+    assert cache.store(blocks_url, None, 200, b'[1, 2]')
+    assert cache.lookup(blocks_url) == (200, b'[1, 2]')
+    
+    clock.now += 61
+    assert cache.lookup(blocks_url) is None
+    assert cache.stats()['hits'] == 1 and cache.stats()['misses'] == 2
+    
+    # Errors and unconfirmed transactions are never stored
+    assert not cache.store(blocks_url, None, 500, b'oops')
+    assert not cache.store(f"https://blockstream.info/api/tx/{'cd' * 32}", None, 200, b'{"status": {"confirmed": false}}')
+
+
+def test_cache_lru_eviction(tmp_path):
+    clock = FakeClock()
+    cache = ResponseCache(str(tmp_path / "cache.db"), max_bytes=1000, clock=clock)
+    urls = [f"https://blockstream.info/api/tx/{i:064x}" for i in range(4)]
+    body = b'{"status": {"confirmed": true}, "pad": "' + b'x' * 260 + b'"}'
+    
+    for url in urls[:3]:
+        clock.now += 1
+        cache.store(url, None, 200, body)
+    clock.now += 1
+    cache.lookup(urls[0])  # Touch the oldest entry so it survives
+    
+    clock.now += 1
+    cache.store(urls[3], None, 200, body)
+    
+    assert cache.stats()['evictions'] >= 1
+    assert cache.stats()['size_bytes'] <= 1000
+    assert cache.lookup(urls[0]) is not None
+    assert cache.lookup(urls[1]) is None
+
+
+def test_cache_hits_batch_their_access_times(tmp_path):
+    clock = FakeClock()
+    cache = ResponseCache(str(tmp_path / "cache.db"), clock=clock, access_flush=3)
+    urls = [f"https://blockstream.info/api/tx/{i:064x}" for i in range(3)]
+    for url in urls:
+        cache.store(url, None, 200, b'{"status": {"confirmed": true}}')
+    conn = cache.connections.connection()
+    
+    def last_access():
+        return [row[0] for row in conn.execute("SELECT last_access FROM http_responses ORDER BY url")]
+    
+    writes = conn.total_changes
+    clock.now += 10
+    cache.lookup(urls[0])
+    cache.lookup(urls[1])
+    assert conn.total_changes == writes and last_access() == [clock.now - 10] * 3
+    
+    cache.lookup(urls[2])   # Third pending hit: one batched write
+    assert last_access() == [clock.now] * 3
+
+
+def test_cache_size_accounting_under_concurrent_stores(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.db"), max_bytes=4000)
+    body = b'{"status": {"confirmed": true}, "pad": "' + b'x' * 200 + b'"}'
+    
+    def store_many(worker):
+        for i in range(40):
+            cache.store(f"https://blockstream.info/api/tx/{worker:032x}{i:032x}", None, 200, body)
+    
+    workers = [threading.Thread(target=store_many, args=(w,)) for w in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    
+    stored = cache.connections.connection().execute("SELECT COALESCE(SUM(size), 0) FROM http_responses").fetchone()[0]
+    assert cache.stats()['evictions'] > 0
+    assert cache.stats()['size_bytes'] == stored <= 4000
+
+
+def test_cache_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    ResponseCache(path).store(f"https://blockstream.info/api/tx/{'ef' * 32}", None, 200, b'{"status": {"confirmed": true}}')
+    
+    assert ResponseCache(path).lookup(f"https://blockstream.info/api/tx/{'ef' * 32}") is not None
+
+
+def test_caching_session_skips_network_for_immutable_data(stub_api, isolated_response_cache):
+    session = CachingSession()
+    block = stub_api.blocks[0]
+    txid = stub_api.block_txs[block['id']][1]['txid']
+    url = f"{stub_api.base_url}/explorer/tx/{txid}"
+    
+    first = session.get(url, timeout=5)
+    second = session.get(url, timeout=5)
+    
+    assert first.json() == second.json()
+    assert second.from_cache and not first.from_cache
+    assert stub_api.count(r'/tx/') == 1
+    assert isolated_response_cache.stats()['hits'] == 1
+
+
+def test_brain_session_is_cached(stub_api):
+    brain = BitcoinBrain()
+    brain.my_apis['mempool'] = f"{stub_api.base_url}/mempool"
+    
+    brain.fetch_recent_bitcoin_blocks(3)
+    brain.fetch_recent_bitcoin_blocks(3)
+    
+    assert isinstance(brain.session, requests.Session)
+    assert stub_api.count(r'/blocks$') == 1
+
+
+def run_together(count, target):
+    """Start count threads at the same instant; collect what each returns (or raises)"""
+    barrier = threading.Barrier(count)
+    results = [None] * count
+    
+    def worker(i):
+        barrier.wait()
+        try:
+            results[i] = target()
+        except Exception as error:
+            results[i] = error
+    
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_single_flight_shares_one_call():
+    group = SingleFlight()
+    calls = []
+    
+    def slow_fetch():
+        calls.append(1)
+        time.sleep(0.2)
+        return {'price': 42000.0}
+    
+    results = run_together(8, lambda: group.do('btc', slow_fetch))
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+    assert group.stats() == {'calls': 1, 'coalesced': 7, 'coalesced_rate': 7 / 8, 'in_flight': 0}
+    
+    # Failures reach every waiter, and the next caller tries again
+    def failing_fetch():
+        time.sleep(0.2)
+        raise ValueError("rate limited")
+    
+    assert all(isinstance(result, ValueError) for result in run_together(4, lambda: group.do('btc', failing_fetch)))
+    assert group.do('btc', lambda: 'fresh') == 'fresh'
+    assert group.stats()['calls'] == 3
+
+
+def test_concurrent_sessions_coalesce_identical_gets(isolated_response_cache):
+    group = SingleFlight()
+    
+    with StubApiServer(latency=0.3) as stub:
+        url = f"{stub.base_url}/explorer/blocks"
+        sessions = [CachingSession(flights=group) for _ in range(6)]
+        responses = run_together(6, lambda: sessions.pop().get(url, timeout=5))
+        
+        assert stub.count(r'/blocks$') == 1
+        assert group.stats()['coalesced'] == 5
+        assert len({id(response) for response in responses}) == 6
+        assert all(response.json() == responses[0].json() and not response.from_cache for response in responses)
+        
+        # Other resources get their own single call
+        other = CachingSession(flights=group)
+        run_together(2, lambda: other.get(f"{stub.base_url}/explorer/blocks/tip/height", timeout=5))
+        run_together(2, lambda: other.get(f"{stub.base_url}/explorer/block-height/800001", timeout=5))
+    
+    assert stub.count(r'/blocks/tip/height') == 1
+    assert stub.count(r'/block-height/') == 1
+
+
+def test_brain_sessions_share_the_process_group():
+    assert BitcoinBrain().session.flights is BitcoinBrain().session.flights
+
+
+def throttle_first(stub, count, retry_after):
+    """Make the stub answer its first count requests with 429 and a Retry-After header"""
+    route, throttled = stub.route, []
+    
+    def limited(path, query=None):
+        if len(throttled) < count:
+            throttled.append(path)
+            return 429, {'error': 'rate limited'}, {'Retry-After': retry_after}
+        return route(path, query)
+    
+    stub.route = limited
+    return throttled
+
+
+def test_retry_after_is_honoured_and_rate_adapts(stub_api, isolated_http_hosts):
+    throttle_first(stub_api, 2, 0.2)
+    session = CachingSession()
+    url = f"{stub_api.base_url}/prices/ping"
+    
+    started = time.perf_counter()
+    response = session.get(url, timeout=5)
+    assert response.status_code == 200
+    assert time.perf_counter() - started >= 0.4
+    
+    host = isolated_http_hosts.host(url)
+    assert host.summary()['throttled'] == 2 and host.summary()['retries'] == 2
+    assert host.bucket.rate == 260.0      # Halved twice, then one additive step (1% of the ceiling)
+    
+    for _ in range(5):
+        session.get(url, timeout=5)
+    assert host.bucket.rate == 310.0
+    assert host.breaker.state == 'closed'
+    
+    assert retry_after_seconds('7') == 7.0
+    assert 55 < retry_after_seconds(formatdate(time.time() + 60, usegmt=True)) <= 60
+    assert retry_after_seconds('soon') is None
+
+
+def test_long_retry_after_fails_fast(stub_api, isolated_http_hosts):
+    throttle_first(stub_api, 100, 120)
+    session = CachingSession()
+    url = f"{stub_api.base_url}/prices/ping"
+    
+    started = time.perf_counter()
+    assert session.get(url, timeout=5).status_code == 429
+    with pytest.raises(CircuitOpenError):
+        session.get(url, timeout=5)
+    
+    assert time.perf_counter() - started < 1.0
+    assert len(stub_api.requests) == 1
+    assert isolated_http_hosts.host(url).summary()['retry_in'] > 100
+    assert "open" in isolated_http_hosts.describe()
+
+
+def test_circuit_opens_on_a_slow_host_and_recovers(isolated_http_hosts):
+    isolated_http_hosts.max_retries = 1
+    isolated_http_hosts.failure_threshold = 2
+    isolated_http_hosts.reset_timeout = 0.3
+    
+    with StubApiServer(latency=0.5) as stub:
+        session = CachingSession()
+        url = f"{stub.base_url}/prices/ping"
+        
+        with pytest.raises(requests.Timeout):
+            session.get(url, timeout=0.1)
+        started = time.perf_counter()
+        with pytest.raises(CircuitOpenError):
+            session.get(url, timeout=0.1)
+        assert time.perf_counter() - started < 0.05
+        
+        # After the cooldown one trial call goes through and closes the circuit
+        stub.latency = 0.0
+        time.sleep(0.35)
+        assert session.get(url, timeout=5).status_code == 200
+        assert isolated_http_hosts.host(url).breaker.state == 'closed'
+    
+    assert stub.count(r'/prices/ping') == 3
+
+
+def test_circuit_breaker_lets_one_trial_through():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=clock)
+    
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert breaker.state == 'open' and not breaker.allow()
+    
+    clock.now += 10
+    assert breaker.allow() and not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == 'open' and breaker.retry_in() == 10
+    
+    clock.now += 10
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.allow() and breaker.allow()
+    assert breaker.opens == 2 and breaker.rejected == 2
+
+
+def test_sessions_share_one_keep_alive_pool(stub_api, isolated_http_hosts):
+    sessions = [new_session(), new_session({'User-Agent': 'other'}), BitcoinBrain().session]
+    url = f"{stub_api.base_url}/prices/ping"
+    
+    for i in range(12):
+        assert sessions[i % 3].get(url, timeout=5).json()['gecko_says']
+    assert len(stub_api.connections) == 1
+    assert stub_api.gzipped == 12
+    assert sessions[0].get_adapter(url) is sessions[2].get_adapter(url)
+    
+    # A bare requests.get opens (and drops) a connection every time
+    for _ in range(3):
+        requests.get(url, timeout=5)
+    assert len(stub_api.connections) == 4
+
+
+def test_calls_are_timed_per_host(isolated_http_hosts):
+    with StubApiServer(latency=0.05) as stub:
+        session = new_session()
+        url = f"{stub.base_url}/prices/ping"
+        for _ in range(4):
+            session.get(url, timeout=5)
+    
+    stats = isolated_http_hosts.stats()[url.split('/')[2]]
+    assert stats['requests'] == 4
+    assert 50 <= stats['avg_latency_ms'] <= stats['p95_latency_ms'] < 1000
+    assert "ms avg" in isolated_http_hosts.describe()
@@ -0,0 +1,163 @@
+"""
+Tests for the scheduler's job executor
+"""
+
+import threading
+import time
+
+from db_connection import get_connection_manager
+from health_monitor import HealthMonitor, set_health_monitor
+from job_executor import JobExecutor
+from scheduler import MVRVScheduler
+
+
+class FakeClock:
+    def __init__(self, now):
+        self.now = now
+    
+    def __call__(self):
+        return self.now
+
+
+HOUR = 3600
+START = 1_700_000_000 // HOUR * HOUR + 10  # Just after an hour boundary
+
+
+def executor_for(tmp_path, clock):
+    return JobExecutor(get_connection_manager(str(tmp_path / "jobs.db")), clock=clock)
+
+
+def test_interval_job_runs_each_slot_and_records_metrics(tmp_path):
+    clock = FakeClock(START)
+    executor = executor_for(tmp_path, clock)
+    calls = []
+    executor.add_job('hourly', lambda: calls.append(clock()), interval=HOUR)
+    
+    assert executor.tick() == HOUR - 10
+    assert calls == []
+    
+    clock.now = START - 10 + HOUR + 25
+    executor.tick()
+    clock.now += HOUR
+    executor.tick()
+    
+    assert len(calls) == 2
+    runs = executor.recent_runs('hourly')
+    assert [run['outcome'] for run in runs] == ['success', 'success']
+    assert runs[0]['queue_delay'] == 25 and runs[0]['duration'] == 0
+    assert executor.latency_summary()['hourly']['runs'] == 2
+
+
+def test_overlapping_run_is_skipped(tmp_path):
+    clock = FakeClock(START)
+    executor = executor_for(tmp_path, clock)
+    job = executor.add_job('hourly', lambda: None, interval=HOUR)
+    
+    job.lock.acquire()  # A previous run is still going
+    clock.now += HOUR
+    executor.tick()
+    job.lock.release()
+    
+    assert executor.recent_runs('hourly')[0]['outcome'] == 'skipped_overlap'
+
+
+def test_deadlines_and_failures(tmp_path):
+    clock = FakeClock(START)
+    executor = executor_for(tmp_path, clock)
+    
+    def slow():
+        clock.now += 120
+    
+    def broken():
+        raise RuntimeError("API down")
+    
+    executor.add_job('slow', slow, interval=HOUR, deadline=60)
+    executor.add_job('broken', broken, interval=HOUR)
+    clock.now += HOUR
+    executor.tick()
+    
+    assert executor.recent_runs('slow')[0]['outcome'] == 'deadline_exceeded'
+    failure = executor.recent_runs('broken')[0]
+    assert failure['outcome'] == 'failed' and 'API down' in failure['error']
+    
+    # A run that waited past its deadline in the queue is dropped rather than started late
+    clock.now += 3 * HOUR
+    executor.tick()
+    assert executor.recent_runs('slow')[0]['outcome'] == 'expired'
+
+
+def test_missed_slots_are_caught_up_after_downtime(tmp_path):
+    clock = FakeClock(START)
+    calls = []
+    executor = executor_for(tmp_path, clock)
+    executor.add_job('hourly', lambda: calls.append(clock()), interval=HOUR, max_catch_up=2)
+    clock.now += HOUR
+    executor.tick()
+    
+    # Process is down for five hours, then restarts
+    clock.now += 5 * HOUR
+    restarted = executor_for(tmp_path, clock)
+    restarted.add_job('hourly', lambda: calls.append(clock()), interval=HOUR, max_catch_up=2)
+    restarted.tick()
+    
+    runs = restarted.recent_runs('hourly')
+    assert len(calls) == 3
+    assert [run['catch_up'] for run in runs] == [1, 1, 0]
+    assert runs[0]['slot_time'] - runs[1]['slot_time'] == HOUR
+    assert runs[0]['slot_time'] == restarted.jobs['hourly'].slot_at_or_before(clock())
+
+
+def test_slow_job_does_not_block_others(tmp_path):
+    executor = JobExecutor(get_connection_manager(str(tmp_path / "jobs.db")), max_workers=2)
+    fast_runs = []
+    release = threading.Event()
+    
+    executor.add_job('slow', release.wait, interval=0.2)
+    executor.add_job('fast', lambda: fast_runs.append(time.time()), interval=0.1)
+    executor.start()
+    try:
+        time.sleep(1.2)
+    finally:
+        release.set()
+        executor.stop()
+    
+    assert len(fast_runs) >= 4
+    outcomes = [run['outcome'] for run in executor.recent_runs('slow')]
+    assert 'skipped_overlap' in outcomes
+
+
+def test_cancelled_queued_runs_release_their_lock(tmp_path):
+    executor = JobExecutor(get_connection_manager(str(tmp_path / "jobs.db")), max_workers=1)
+    release = threading.Event()
+    slow = executor.add_job('slow', release.wait, interval=HOUR)
+    queued = executor.add_job('queued', lambda: None, interval=HOUR)
+    executor.start()
+    
+    now = time.time()
+    running = executor._submit(slow, now, now)
+    waiting = executor._submit(queued, now, now)
+    executor.stop()
+    release.set()
+    running.result(timeout=5)
+    
+    assert waiting.cancelled()
+    assert queued.lock.acquire(blocking=False)
+
+
+def test_failed_scheduler_runs_are_recorded_as_failed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    set_health_monitor(HealthMonitor({'prices': "http://127.0.0.1:9/ping"}))   # Never started: not offline
+    try:
+        scheduler = MVRVScheduler()
+        monkeypatch.setattr(scheduler.collector, 'collect_all_data', lambda: False)
+        scheduler.executor.run_now('hourly')
+        
+        monkeypatch.setattr(scheduler.collector, 'collect_all_data', lambda: True)
+        monkeypatch.setattr(scheduler.calculator, 'perform_hourly_calculation', lambda: None)
+        monkeypatch.setattr(scheduler.calculator, 'perform_daily_aggregation', lambda: None)
+        scheduler.executor.run_now('hourly')
+        scheduler.executor.run_now('daily')
+    finally:
+        set_health_monitor(None)
+    
+    assert [run['outcome'] for run in scheduler.executor.recent_runs()] == ['failed'] * 3
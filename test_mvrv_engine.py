@@ -0,0 +1,60 @@
+"""
+Tests for the MVRV engine calculations
+"""
+
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from my_database import MyPersonalDatabase
+from my_mvrv_engine import MyMVRVEngine
+
+
+def make_engine(tmp_path, days=60):
+    """Engine over a temporary database holding one price per day"""
+    my_db = MyPersonalDatabase(str(tmp_path / "engine.db"))
+    start = datetime(2024, 1, 1)
+    my_db.remember_historical_prices(
+        ((start + timedelta(days=d)).isoformat(), 40000.0 + 100 * d) for d in range(days)
+    )
+    return MyMVRVEngine(my_db=my_db), start
+
+
+def synthetic_utxos(start, count, days=60, seed=7):
+    rng = np.random.default_rng(seed)
+    times = start.replace(tzinfo=timezone.utc).timestamp() + rng.uniform(0, days * 86400, count)  # Stored as UTC
+    return [{
+        'tx_hash': f"tx_{i:06d}",
+        'output_position': 0,
+        'btc_amount': float(rng.uniform(0.0001, 5)),
+        'creation_time': float(times[i]),
+        'recipient_address': 'unknown',
+        'script_pattern': 'v0_p2wpkh',
+        'my_confidence': float(rng.choice([0.6, 0.7, 0.8, 0.9]))
+    } for i in range(count)]
+
+
+def test_batched_weighting_matches_loop(tmp_path):
+    engine, start = make_engine(tmp_path)
+    utxos = synthetic_utxos(start, 2000)
+    
+    loop_value, loop_confidence, loop_rows = engine.weigh_utxo_sample(utxos)
+    batch_value, batch_confidence, batch_rows = engine.weigh_utxo_sample_batched(utxos)
+    
+    assert np.isclose(batch_value, loop_value, rtol=1e-12)
+    assert np.isclose(batch_confidence, loop_confidence, rtol=1e-12)
+    assert len(batch_rows) == len(loop_rows)
+    assert batch_rows[0][0] == loop_rows[0][0] and np.isclose(batch_rows[0][3], loop_rows[0][3])
+    
+    assert np.isclose(
+        engine.calculate_confidence_multiplier(loop_confidence, len(utxos)),
+        engine.calculate_confidence_multiplier(batch_confidence, len(utxos))
+    )
+
+
+def test_confidence_multiplier_range(tmp_path):
+    engine, _ = make_engine(tmp_path, days=1)
+    
+    assert engine.calculate_confidence_multiplier(0, 10) == 1.0
+    assert np.isclose(engine.calculate_confidence_multiplier(10, 10), 1.2)
+    assert np.isclose(engine.calculate_confidence_multiplier(5, 10), 1.0)
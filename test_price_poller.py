@@ -0,0 +1,77 @@
+"""
+Tests for the conditional price poller and its live MVRV ticks
+"""
+
+import time
+
+import pytest
+
+from btc_brain import BitcoinBrain
+from my_database import MyPersonalDatabase
+from my_mvrv_engine import MyMVRVEngine
+from price_poller import TICK_PERIOD, PricePoller
+
+
+def poller_for(stub, db_path, hourly=True, **options):
+    my_db = MyPersonalDatabase(str(db_path))
+    if hourly:
+        my_db.store_my_mvrv_analysis("2023-11-14T21:00:00", 1.2e12, 6.5e11, 1.2e12 / 6.5e11)
+    brain = BitcoinBrain()
+    brain.my_apis['prices'] = f"{stub.base_url}/prices"
+    return PricePoller(MyMVRVEngine(my_db=my_db, btc_brain=brain), **options)
+
+
+def tick_count(poller):
+    return poller.my_db.connections.connection().execute(
+        "SELECT COUNT(*) FROM my_mvrv_analysis WHERE analysis_period = ?", (TICK_PERIOD,)).fetchone()[0]
+
+
+def test_ticks_revalidate_and_reuse_the_hourly_realized_cap(stub_api, tmp_path):
+    poller = poller_for(stub_api, tmp_path / "my.db")
+    
+    tick = poller.tick()
+    assert tick['mvrv_ratio'] == pytest.approx(65_000 * 19_700_000 / 6.5e11)
+    assert tick['realized_cap'] == 6.5e11
+    assert poller.my_db.get_my_latest_mvrv(TICK_PERIOD)['ratio'] == pytest.approx(tick['mvrv_ratio'])
+    
+    # Unchanged upstream: a bodiless 304, no new row
+    assert poller.tick() is None
+    assert poller.not_modified == 1 and tick_count(poller) == 1
+    
+    stub_api.spot_price, stub_api.spot_updated_at = 70_000.0, stub_api.spot_updated_at + 60
+    assert poller.tick()['mvrv_ratio'] > tick['mvrv_ratio']
+    assert tick_count(poller) == 2
+    assert stub_api.count(r'/simple/price') == 3
+    assert poller.stats()['avg_bytes'] < 200
+    
+    # Ticks stay out of the hourly views and the analysis stats
+    assert poller.my_db.get_my_latest_mvrv()['realized_cap'] == 6.5e11
+    assert poller.my_db.get_my_rolling_stats()['ratio']['windows']['7d']['count'] == 1
+    stats = poller.my_db.get_my_database_stats()
+    assert stats['my_mvrv_analysis'] == 1 and stats['my_mvrv_ticks'] == 2
+    assert stats['my_data_quality']['mvrv_confidence'] == 0.8
+
+
+def test_ticks_need_an_hourly_row_and_are_pruned(stub_api, tmp_path):
+    assert poller_for(stub_api, tmp_path / "empty.db", hourly=False).tick() is None
+    
+    poller = poller_for(stub_api, tmp_path / "my.db", retention=100)
+    poller.tick()
+    stub_api.spot_updated_at += 200
+    poller.tick()
+    assert tick_count(poller) == 1
+    assert poller.my_db.get_my_latest_mvrv(TICK_PERIOD)['timestamp'] == "2023-11-14T22:16:40"
+
+
+def test_polls_on_its_own_cadence(stub_api, tmp_path):
+    poller = poller_for(stub_api, tmp_path / "my.db", interval=0.05).start()
+    try:
+        deadline = time.time() + 5
+        while poller.polls < 3 and time.time() < deadline:
+            time.sleep(0.02)
+    finally:
+        poller.stop(timeout=1)
+    
+    assert not poller.running
+    assert poller.polls >= 3 and poller.ticks == 1
+    assert "1 ticks" in poller.describe()
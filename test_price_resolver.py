@@ -0,0 +1,102 @@
+"""
+Tests for the batched historical price resolver
+"""
+
+import numpy as np
+import pytest
+
+from btc_brain import BitcoinBrain
+from conftest import StubApiServer
+from utxo_batch import UtxoBatch
+from database import MVRVDatabase
+from my_database import MyPersonalDatabase
+from my_mvrv_engine import MyMVRVEngine
+from mvrv_calculator import MVRVCalculator
+from price_resolver import DAY, PriceResolver, plan_ranges
+
+JAN_2023 = 1672531200
+
+
+def stub_engine(tmp_path, stub):
+    brain = BitcoinBrain()
+    brain.my_apis = {'prices': f"{stub.base_url}/prices"}
+    return MyMVRVEngine(my_db=MyPersonalDatabase(str(tmp_path / "mine.db")), btc_brain=brain)
+
+
+def test_plan_ranges_uses_fewest_calls():
+    days = [JAN_2023 + d * DAY for d in (0, 3, 3, 9, 400, 401, 900)]
+    
+    assert plan_ranges(days, 365) == [(JAN_2023, JAN_2023 + 10 * DAY),
+                                      (JAN_2023 + 400 * DAY, JAN_2023 + 402 * DAY),
+                                      (JAN_2023 + 900 * DAY, JAN_2023 + 901 * DAY)]
+    assert len(plan_ranges(days, 5)) == 4
+    assert plan_ranges([], 365) == []
+
+
+def test_batch_dedupes_to_days_and_fetches_ranges(tmp_path, stub_api):
+    engine = stub_engine(tmp_path, stub_api)
+    rng = np.random.default_rng(5)
+    
+    # 5,000 UTXOs born on 40 distinct days, in two clusters more than a year apart
+    days = np.concatenate([JAN_2023 + rng.choice(30, 20, replace=False) * DAY,
+                           JAN_2023 + (500 + rng.choice(30, 20, replace=False)) * DAY])
+    births = rng.choice(days, 5000) + rng.uniform(0, DAY, 5000)
+    
+    prices = engine.find_prices_when_utxos_were_born(births)
+    
+    assert stub_api.count(r'/market_chart/range') == 2
+    assert stub_api.count(r'/history') == 0
+    assert engine.my_prices.last_batch == {'timestamps': 5000, 'days': 40, 'missing_days': 40,
+                                           'range_calls': 2, 'prices_fetched': 59}
+    expected = [StubApiServer.daily_price(int(t // DAY) * DAY) for t in births]
+    assert np.array_equal(prices, expected)
+    
+    # Everything is remembered now: more lookups never leave the process
+    engine.find_prices_when_utxos_were_born(births[::-1])
+    assert engine.find_price_when_utxo_was_born(float(births[0])) == expected[0]
+    assert stub_api.count(r'/market_chart/range') == 2
+
+
+def test_only_gaps_are_fetched(tmp_path, stub_api):
+    db = MVRVDatabase(str(tmp_path / "mvrv.db"))
+    resolver = PriceResolver(db.get_price_index, db.insert_historical_prices, f"{stub_api.base_url}/prices",
+                             max_span_days=10)
+    resolver.resolve([JAN_2023 + d * DAY for d in range(0, 10)])
+    assert stub_api.count(r'/market_chart/range') == 1
+    
+    # Days 0-9 are known; the 30 new days need three 10-day ranges
+    moments = [JAN_2023 + d * DAY + 3600 for d in range(0, 40)]
+    prices = resolver.resolve(moments)
+    
+    assert resolver.last_batch['missing_days'] == 30
+    assert stub_api.count(r'/market_chart/range') == 4
+    assert prices.tolist() == [StubApiServer.daily_price(JAN_2023 + d * DAY) for d in range(40)]
+    assert db.get_price_at_timestamp(JAN_2023 + 39 * DAY + 60) == StubApiServer.daily_price(JAN_2023 + 39 * DAY)
+
+
+def test_unpriceable_days_come_back_nan(tmp_path, stub_api):
+    db = MVRVDatabase(str(tmp_path / "mvrv.db"))
+    stub_api.route = lambda path, query=None: (429, {'error': 'slow down'})
+    resolver = PriceResolver(db.get_price_index, db.insert_historical_prices, f"{stub_api.base_url}/prices")
+    
+    assert np.isnan(resolver.resolve([JAN_2023])).all()
+    assert resolver.resolve_one(JAN_2023) is None
+
+
+def test_unpriced_utxos_leave_the_sample_unbiased(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calculator = MVRVCalculator()
+    
+    utxos = UtxoBatch()
+    for i in range(100):
+        utxos.append(f"{i:064x}", 0, 0.5, JAN_2023 + i * 3600)
+    monkeypatch.setattr(calculator.blockchain, 'fetch_real_utxo_sample', lambda target: utxos)
+    
+    monkeypatch.setattr(calculator.prices, 'resolve', lambda times: np.full(len(times), 20_000.0))
+    everything = calculator.calculate_realized_cap_from_blockchain()
+    assert everything == 100 * 0.5 * 20_000 * calculator.blockchain.calculate_scaling_factor(100)
+    
+    # Half the sample can't be priced (API down): the priced half still stands for the whole set
+    half = np.where(np.arange(100) % 2, np.nan, 20_000.0)
+    monkeypatch.setattr(calculator.prices, 'resolve', lambda times: half.copy())
+    assert calculator.calculate_realized_cap_from_blockchain() == pytest.approx(everything)
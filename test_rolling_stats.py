@@ -0,0 +1,131 @@
+"""
+Tests for the incremental rolling MVRV statistics
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from database import MVRVDatabase
+from epoch_schema import SCHEMA_VERSION
+from my_database import MyPersonalDatabase
+from my_mvrv_engine import MyMVRVEngine
+from rolling_stats import RollingStats, RollingWindow, get_rolling_stats
+
+
+def brute_force(epochs, values, span):
+    inside = epochs > epochs[-1] - span
+    window = values[inside]
+    return {'count': int(inside.sum()), 'mean': window.mean(), 'min': window.min(),
+            'max': window.max(), 'std': window.std()}
+
+
+def test_window_matches_numpy_through_gaps_and_evictions():
+    rng = np.random.default_rng(7)
+    epochs = np.cumsum(rng.integers(1, 7200, 20_000))       # Irregular, with gaps up to 2 hours
+    values = 2.0 + np.cumsum(rng.normal(0, 0.02, 20_000))
+    window = RollingWindow(24 * 3600)
+    
+    for i, (epoch, value) in enumerate(zip(epochs.tolist(), values.tolist())):
+        window.add(epoch, value)
+        if i % 997 == 0 or i == len(epochs) - 1:
+            expected = brute_force(epochs[:i + 1], values[:i + 1], 24 * 3600)
+            summary = window.summary()
+            assert summary['count'] == expected['count']
+            assert summary['min'] == expected['min'] and summary['max'] == expected['max']
+            assert summary['mean'] == pytest.approx(expected['mean'], rel=1e-12)
+            assert summary['std'] == pytest.approx(expected['std'], rel=1e-9)
+
+
+def fill_hours(db, hours, start=datetime(2024, 1, 1)):
+    ratios = 1.5 + np.cumsum(np.random.default_rng(hours).normal(0, 0.01, hours))
+    for hour, ratio in enumerate(ratios.tolist()):
+        db.insert_mvrv_ratio((start + timedelta(hours=hour)).isoformat(), ratio * 4e11, 4e11, ratio)
+    return ratios
+
+
+def test_state_survives_restart_without_replay(tmp_path):
+    db = MVRVDatabase(str(tmp_path / "mvrv.db"))
+    ratios = fill_hours(db, 24 * 40)
+    stats = get_rolling_stats(db.connections, 'mvrv_ratio')
+    before = stats.summary()
+    
+    assert before['windows']['7d']['count'] == 168
+    assert before['windows']['30d']['count'] == 720
+    assert before['windows']['365d']['count'] == len(ratios)
+    assert before['windows']['7d']['mean'] == pytest.approx(ratios[-168:].mean())
+    
+    # A new process: the saved state is loaded, nothing is read back from mvrv_ratios
+    restarted = RollingStats(db.connections, 'mvrv_ratio')
+    assert restarted.summary() == before
+    assert restarted.sync() == 0
+    
+    db.insert_mvrv_ratio(datetime(2024, 2, 10).isoformat(), 9e11, 4e11, 2.25)
+    assert restarted.sync() == 1
+    after = restarted.summary()
+    assert after['current'] == 2.25 and after['rising'] == (2.25 > ratios[-1])
+    assert after['windows']['24h']['max'] == 2.25
+    assert after['windows'] == RollingStats(db.connections, 'mvrv_ratio').summary()['windows']
+    
+    rebuilt = RollingStats(db.connections, 'mvrv_ratio')
+    rebuilt.rebuild()
+    for name, window in rebuilt.summary()['windows'].items():
+        assert window['count'] == after['windows'][name]['count']
+        assert window['std'] == pytest.approx(after['windows'][name]['std'])
+
+
+def test_samples_are_saved_row_by_row_and_pruned(tmp_path):
+    db = MVRVDatabase(str(tmp_path / "mvrv.db"))
+    ratios = fill_hours(db, 24 * 10)
+    windows = {'24h': 24 * 3600, '7d': 7 * 24 * 3600}
+    stats = RollingStats(db.connections, 'mvrv_ratio', windows)
+    stats.sync()
+    
+    def saved():
+        return db.connections.connection().execute(
+            "SELECT epoch, value FROM rolling_stats_samples WHERE stream = 'mvrv_ratio' ORDER BY epoch").fetchall()
+    
+    # Only the longest window is kept, and a sync only appends its new row and drops the expired one
+    assert [value for _, value in saved()] == ratios[-168:].tolist()
+    db.insert_mvrv_ratio(datetime(2024, 1, 11).isoformat(), 9e11, 4e11, 2.25)
+    assert stats.sync() == 1
+    assert [value for _, value in saved()] == ratios[-167:].tolist() + [2.25]
+    
+    restarted = RollingStats(db.connections, 'mvrv_ratio', windows)
+    assert restarted.summary() == stats.summary()
+
+
+def test_readers_do_not_migrate_a_legacy_database(tmp_path):
+    db = MVRVDatabase(str(tmp_path / "mvrv.db"))
+    fill_hours(db, 24 * 10)
+    conn = db.connections.connection()
+    conn.execute("UPDATE mvrv_ratios SET timestamp_epoch = NULL")
+    conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    
+    # Until migrate-epochs runs the stats stay empty instead of converting the table on a read
+    assert db.get_rolling_mvrv_stats()['current'] is None
+    assert db.epochs.pending()['mvrv_ratios'] == 240
+    
+    db.epochs.migrate()
+    assert db.epochs.version() == SCHEMA_VERSION
+    assert db.get_rolling_mvrv_stats()['windows']['7d']['count'] == 168
+
+
+def test_insights_and_statistics_read_rolling_windows(tmp_path):
+    my_db = MyPersonalDatabase(str(tmp_path / "mine.db"))
+    for hour in range(200):
+        my_db.store_my_mvrv_analysis((datetime(2024, 1, 1) + timedelta(hours=hour)).isoformat(),
+                                     2e12, 1e12, 2.0 + (hour % 24) / 100, confidence=0.9)
+    
+    insights = MyMVRVEngine(my_db=my_db).get_my_mvrv_insights()
+    recent = np.array([2.0 + (hour % 24) / 100 for hour in range(32, 200)])
+    
+    assert insights['current_mvrv'] == pytest.approx(recent[-1])
+    assert insights['my_7d_average'] == pytest.approx(recent.mean())
+    assert insights['my_7d_min'] == 2.0 and insights['my_7d_max'] == 2.23
+    assert insights['my_volatility'] == pytest.approx(recent.std())
+    assert insights['my_confidence_avg'] == pytest.approx(0.9)
+    assert insights['data_quality'] == 'high'
+    assert insights['my_windows']['24h']['count'] == 24
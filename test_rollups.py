@@ -0,0 +1,144 @@
+"""
+Tests for the day/week/month MVRV rollups
+"""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from database import MVRVDatabase
+from my_database import MyPersonalDatabase
+from rollups import RESOLUTIONS, bucket_start
+
+
+def hourly_points(hours=24 * 70, start=datetime(2024, 1, 20), seed=7):
+    rng = np.random.default_rng(seed)
+    ratios = 1.5 + np.cumsum(rng.normal(0, 0.01, hours))
+    return [{
+        'timestamp': (start + timedelta(hours=h)).isoformat(),
+        'market_cap': float(ratio * 4e11),
+        'realized_cap': 4e11 + h * 1e6,
+        'ratio': float(ratio)
+    } for h, ratio in enumerate(ratios)]
+
+
+def expected_rollups(points, resolution):
+    """Reference OHLC/mean buckets computed with pandas"""
+    frame = pd.DataFrame(points)
+    frame['bucket'] = [bucket_start(resolution, t).isoformat() for t in frame['timestamp']]
+    grouped = frame.sort_values('timestamp').groupby('bucket')
+    
+    expected = {}
+    for bucket, rows in grouped:
+        expected[bucket] = {'samples': len(rows)}
+        for metric in ('ratio', 'market_cap', 'realized_cap'):
+            values = rows[metric]
+            expected[bucket].update({
+                f'{metric}_open': values.iloc[0], f'{metric}_high': values.max(), f'{metric}_low': values.min(),
+                f'{metric}_close': values.iloc[-1], f'{metric}_mean': values.mean()
+            })
+    return expected
+
+
+def assert_matches(history, expected):
+    assert [row['bucket_start'] for row in history] == sorted(expected)
+    for row in history:
+        for key, value in expected[row['bucket_start']].items():
+            assert row[key] == pytest.approx(value, rel=1e-9), (row['bucket_start'], key)
+
+
+def store(db, points):
+    for point in points:
+        db.store_my_mvrv_analysis(point['timestamp'], point['market_cap'], point['realized_cap'], point['ratio'])
+
+
+def test_incremental_rollups_match_reference(tmp_path):
+    db = MyPersonalDatabase(str(tmp_path / "my.db"))
+    points = hourly_points()
+    store(db, points)
+    
+    for resolution in RESOLUTIONS:
+        assert_matches(db.get_my_mvrv_rollups(resolution, 1000), expected_rollups(points, resolution))
+    
+    weeks = db.get_my_mvrv_rollups('week', 1000)
+    assert all(datetime.fromisoformat(row['bucket_start']).weekday() == 0 for row in weeks)
+    assert [row['bucket_start'] for row in db.get_my_mvrv_rollups('month', 1000)] == [
+        '2024-01-01', '2024-02-01', '2024-03-01'
+    ]
+
+
+def test_backfill_matches_incremental(tmp_path):
+    db = MVRVDatabase(str(tmp_path / "mvrv.db"))
+    points = hourly_points(hours=24 * 40)
+    for point in points:
+        db.insert_mvrv_ratio(point['timestamp'], point['market_cap'], point['realized_cap'], point['ratio'])
+    incremental = {resolution: db.get_mvrv_rollups(resolution, 1000) for resolution in RESOLUTIONS}
+    
+    db.connections.connection().execute("DELETE FROM mvrv_rollups")
+    written = db.rollups.backfill()
+    
+    assert written == sum(len(rows) for rows in incremental.values())
+    for resolution in RESOLUTIONS:
+        rebuilt = db.get_mvrv_rollups(resolution, 1000)
+        assert [row['bucket_start'] for row in rebuilt] == [row['bucket_start'] for row in incremental[resolution]]
+        for before, after in zip(incremental[resolution], rebuilt):
+            assert after['ratio_mean'] == pytest.approx(before['ratio_mean'], rel=1e-9)
+            assert (after['ratio_open'], after['ratio_close'], after['samples']) == \
+                   (before['ratio_open'], before['ratio_close'], before['samples'])
+
+
+def test_range_backfill_rebuilds_whole_edge_buckets(tmp_path):
+    db = MyPersonalDatabase(str(tmp_path / "my.db"))
+    points = hourly_points()
+    store(db, points)
+    
+    db.connections.connection().execute("DELETE FROM my_mvrv_rollups")
+    db.my_rollups.backfill('2024-02-14T05:00:00', '2024-02-14T05:00:00')
+    
+    # Only the buckets holding that moment come back, each from all of its hourly rows
+    for resolution in RESOLUTIONS:
+        history = db.get_my_mvrv_rollups(resolution, 1000)
+        bucket = bucket_start(resolution, '2024-02-14').isoformat()
+        assert_matches(history, {bucket: expected_rollups(points, resolution)[bucket]})
+
+
+def test_late_and_replaced_rows_rebuild_their_buckets(tmp_path):
+    db = MyPersonalDatabase(str(tmp_path / "my.db"))
+    points = hourly_points(hours=24 * 10)
+    late = points.pop(30)
+    store(db, points)
+    
+    # Arrives after later hours were merged, then gets corrected in place
+    store(db, [late])
+    corrected = dict(points[-1], ratio=9.0, market_cap=9e12)
+    store(db, [corrected])
+    
+    final = points[:30] + [late] + points[30:-1] + [corrected]
+    for resolution in RESOLUTIONS:
+        assert_matches(db.get_my_mvrv_rollups(resolution, 1000), expected_rollups(final, resolution))
+    
+    assert db.my_rollups.bucket('day', corrected['timestamp'])['ratio_high'] == 9.0
+
+
+def test_existing_database_is_backfilled_on_open(tmp_path):
+    path = str(tmp_path / "my.db")
+    db = MyPersonalDatabase(path)
+    points = hourly_points(hours=24 * 3)
+    store(db, points)
+    db.connections.connection().execute("DROP TABLE my_mvrv_rollups")
+    
+    reopened = MyPersonalDatabase(path)
+    
+    assert_matches(reopened.get_my_mvrv_rollups('day', 10), expected_rollups(points, 'day'))
+    assert reopened.get_my_mvrv_rollups('day', 2)[-1]['timestamp'] == '2024-01-22'
+
+
+def test_daily_rows_are_not_rolled_up(tmp_path):
+    db = MVRVDatabase(str(tmp_path / "mvrv.db"))
+    db.insert_mvrv_ratio("2024-01-01T12:00:00", 1e12, 5e11, 2.0, timeframe='daily')
+    
+    assert db.get_mvrv_rollups('day') == []
+    with pytest.raises(ValueError):
+        db.get_mvrv_rollups('year')
@@ -0,0 +1,90 @@
+"""
+Tests for the columnar UTXO store
+"""
+
+import numpy as np
+import pytest
+
+from blockchain_integration import BlockchainIntegration
+from btc_brain import BitcoinBrain
+from utxo_batch import UtxoBatch
+
+
+def brain_dicts(brain, stub):
+    return [
+        utxo
+        for block in stub.blocks
+        for tx in stub.block_txs[block['id']]
+        for utxo in brain.discover_utxos_from_transaction(tx, block['timestamp'])
+    ]
+
+
+def brain_batch(brain, stub):
+    batch = UtxoBatch(capacity=8)
+    for block in stub.blocks:
+        for tx in stub.block_txs[block['id']]:
+            brain.discover_utxos_into(batch, tx, block['timestamp'])
+    return batch
+
+
+def test_batch_round_trips_brain_dicts(stub_api):
+    brain = BitcoinBrain()
+    expected = brain_dicts(brain, stub_api)
+    batch = brain_batch(brain, stub_api)
+    
+    assert batch.to_dicts() == expected
+    assert UtxoBatch.from_dicts(expected).to_dicts() == expected
+    assert len(batch.txids) == sum(len(txs) for txs in stub_api.block_txs.values())
+    assert batch.nbytes < 64 * len(batch) * 2  # Capacity doubling leaves at most half empty
+
+
+def test_insights_match_dict_path(stub_api):
+    brain = BitcoinBrain()
+    utxos = brain_dicts(brain, stub_api)
+    insights = brain.calculate_utxo_insights(brain_batch(brain, stub_api))
+    
+    btc_values = [utxo['btc_amount'] for utxo in utxos]
+    assert insights['total_utxos_found'] == len(utxos)
+    assert insights['total_btc_value'] == pytest.approx(sum(btc_values))
+    assert insights['largest_utxo'] == max(btc_values)
+    assert insights['oldest_utxo_time'] == min(utxo['creation_time'] for utxo in utxos)
+    assert insights['unique_addresses'] == len({utxo['recipient_address'] for utxo in utxos})
+    assert insights == brain.calculate_utxo_insights(utxos)
+
+
+def test_slices_are_zero_copy_views():
+    batch = UtxoBatch.from_dicts([
+        {'tx_hash': f"tx_{i // 2}", 'output_position': i % 2, 'btc_amount': float(i), 'creation_time': 1_700_000_000 + i,
+         'recipient_address': 'unknown' if i % 3 else f"bc1q{i}", 'script_pattern': 'p2pkh', 'my_confidence': 0.5}
+        for i in range(10)
+    ])
+    
+    view = batch[2:8]
+    assert len(view) == 6
+    assert np.shares_memory(view.btc_amount, batch.btc_amount)
+    assert view[0]['tx_hash'] == 'tx_1' and view.txid(-1) == 'tx_3'
+    assert view.stats()['total_btc'] == sum(range(2, 8))
+    assert view.stats()['unique_addresses'] == 2  # bc1q3, bc1q6
+    
+    with pytest.raises(ValueError):
+        view.append('tx_x', 0, 1.0, 0)
+    
+    merged = view.copy()
+    merged.extend(batch[8:])
+    assert merged.to_dicts() == batch.to_dicts()[2:]
+
+
+def test_get_utxo_statistics_accepts_batch(stub_api):
+    blockchain = BlockchainIntegration()
+    blockchain.mempool_base = f"{stub_api.base_url}/mempool"
+    
+    utxos = blockchain.fetch_real_utxo_sample(60)
+    stats = blockchain.get_utxo_statistics(utxos)
+    dict_stats = blockchain.get_utxo_statistics([
+        {'txid': utxo['tx_hash'], 'value_btc': utxo['btc_amount'], 'timestamp': utxo['creation_time'],
+         'address': utxo['recipient_address']}
+        for utxo in utxos
+    ])
+    
+    assert stats == dict_stats
+    assert stats['total_utxos'] == len(utxos)
@@ -0,0 +1,88 @@
+"""
+Tests for memory-mapped UTXO snapshots
+"""
+
+import struct
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from database import MVRVDatabase
+from my_database import MyPersonalDatabase
+from my_mvrv_engine import MyMVRVEngine
+from utxo_snapshot import (HEADER_FORMAT, UtxoSnapshot, default_snapshot_path, export_snapshot,
+                           import_snapshot, open_fresh_snapshot)
+
+
+def discoveries(count, seed=3):
+    rng = np.random.default_rng(seed)
+    start = datetime(2023, 1, 1)
+    return [(
+        f"{i:064x}",
+        float(rng.uniform(0.001, 3)),
+        (start + timedelta(hours=i)).isoformat(),
+        float(rng.uniform(10, 90_000)),
+        float(rng.choice([0.4, 0.6, 0.9]))
+    ) for i in range(count)]
+
+
+def test_snapshot_round_trip(tmp_path):
+    my_db = MyPersonalDatabase(str(tmp_path / "mine.db"))
+    rows = discoveries(12_345)
+    my_db.store_my_utxo_discoveries(rows)
+    path = default_snapshot_path(my_db.db_path, 'my_utxo_discoveries')
+    
+    assert export_snapshot(my_db.connections, 'my_utxo_discoveries', path, chunk_size=1000) == len(rows)
+    
+    snapshot = UtxoSnapshot(path)
+    assert len(snapshot) == len(rows) and snapshot.source == 'my_utxo_discoveries'
+    assert isinstance(snapshot['usd_value'], np.memmap)
+    assert snapshot['txid'][7].decode() == rows[7][0]
+    assert snapshot.realized_value() == pytest.approx(sum(row[3] for row in rows))
+    assert snapshot.realized_value(weighted=True, min_confidence=0.5) == pytest.approx(
+        sum(row[3] * row[4] for row in rows if row[4] > 0.5), rel=1e-6
+    )
+    
+    copy_db = MyPersonalDatabase(str(tmp_path / "copy.db"))
+    assert import_snapshot(copy_db.connections, path) == len(rows)
+    assert copy_db.connections.connection().execute(
+        "SELECT transaction_id, btc_value, discovered_at, usd_value_when_created FROM my_utxo_discoveries WHERE id = 8"
+    ).fetchone() == rows[7][:4]
+
+
+def test_fallbacks_use_fresh_snapshot_only(tmp_path):
+    my_db = MyPersonalDatabase(str(tmp_path / "mine.db"))
+    rows = discoveries(500)
+    my_db.store_my_utxo_discoveries(rows)
+    engine = MyMVRVEngine(my_db=my_db)
+    expected = sum(row[3] * row[4] for row in rows if row[4] > 0.5)
+    
+    assert engine.fallback_realized_value() == pytest.approx(expected)
+    
+    export_snapshot(my_db.connections, 'my_utxo_discoveries', default_snapshot_path(my_db.db_path, 'my_utxo_discoveries'))
+    assert open_fresh_snapshot(my_db.connections, my_db.db_path, 'my_utxo_discoveries') is not None
+    assert engine.fallback_realized_value() == pytest.approx(expected, rel=1e-6)
+    
+    my_db.store_my_utxo_discoveries(discoveries(1, seed=9))  # Replaces row 0, so the snapshot is stale
+    assert open_fresh_snapshot(my_db.connections, my_db.db_path, 'my_utxo_discoveries') is None
+
+
+def test_utxo_data_snapshot(tmp_path):
+    db = MVRVDatabase(str(tmp_path / "mvrv.db"))
+    db.insert_utxo_data([(txid, btc, created, usd) for txid, btc, created, usd, _ in discoveries(300)])
+    path = str(tmp_path / "utxo_data.utxosnap")
+    
+    export_snapshot(db.connections, 'utxo_data', path)
+    
+    total = db.connections.connection().execute("SELECT SUM(value_usd) FROM utxo_data").fetchone()[0]
+    assert UtxoSnapshot(path).realized_value() == pytest.approx(total)
+    assert UtxoSnapshot(path)['confidence'].min() == 1.0
+
+
+def test_snapshot_version_is_checked(tmp_path):
+    path = tmp_path / "future.utxosnap"
+    path.write_bytes(struct.pack(HEADER_FORMAT, b'UTXOSNAP', 99, 0, 0, 0, 0.0, b'utxo_data'))
+    
+    with pytest.raises(ValueError, match="version 99"):
+        UtxoSnapshot(str(path))
@@ -0,0 +1,135 @@
+"""
+Tests for the incremental UTXO set tracker
+"""
+
+import pytest
+
+from blockchain_integration import BlockchainIntegration
+from db_connection import get_connection_manager
+from mvrv_calculator import MVRVCalculator
+from conftest import StubApiServer
+from price_resolver import DAY
+from utxo_tracker import PRE_MARKET_PRICE, PRICED_FROM, BlockDelta, SATOSHIS_PER_BTC, UtxoSetTracker
+
+
+def price_at(timestamp):
+    """Deterministic price that rises $100 per block"""
+    return 30_000 + (timestamp - 1_700_000_000) / 600 * 100
+
+
+def blockchain_for(stub):
+    blockchain = BlockchainIntegration()
+    blockchain.mempool_base = f"{stub.base_url}/mempool"
+    return blockchain
+
+
+def tracker_for(stub, db_path, **options):
+    options.setdefault('start_height', stub.blocks[0]['height'])
+    options.setdefault('reorg_safety', 0)
+    return UtxoSetTracker(get_connection_manager(db_path), blockchain_for(stub), price_at, **options)
+
+
+def brute_force_realized_cap(stub, up_to_height=None, price=price_at):
+    """Replay the stub chain into a dict and price what's left"""
+    unspent = {}
+    for block in stub.blocks:
+        if up_to_height is not None and block['height'] > up_to_height:
+            break
+        for tx in stub.block_txs[block['id']]:
+            for position, output in enumerate(tx['vout']):
+                unspent[(tx['txid'], position)] = output['value'] * price(block['timestamp'])
+            for prevout in tx['vin']:
+                unspent.pop((prevout.get('txid'), prevout.get('vout')), None)
+    return sum(unspent.values()) / SATOSHIS_PER_BTC, len(unspent)
+
+
+def test_tracker_matches_full_replay(stub_api, tmp_path):
+    tracker = tracker_for(stub_api, str(tmp_path / "utxo.db"))
+    
+    assert tracker.catch_up() == len(stub_api.blocks)
+    
+    expected_cap, expected_count = brute_force_realized_cap(stub_api)
+    assert tracker.realized_cap == pytest.approx(expected_cap)
+    assert tracker.recompute_realized_cap() == pytest.approx(expected_cap)
+    assert tracker.state['utxo_count'] == expected_count
+    assert tracker.state['untracked_spends'] == 0
+
+
+def test_tracker_resumes_from_checkpoint(stub_api, tmp_path):
+    db_path = str(tmp_path / "utxo.db")
+    
+    assert tracker_for(stub_api, db_path).catch_up(max_blocks=2) == 2
+    
+    resumed = tracker_for(stub_api, db_path, start_height=0)
+    assert resumed.next_height() == stub_api.blocks[2]['height']
+    assert resumed.realized_cap == pytest.approx(brute_force_realized_cap(stub_api, stub_api.blocks[1]['height'])[0])
+    
+    assert resumed.catch_up() == len(stub_api.blocks) - 2
+    assert resumed.realized_cap == pytest.approx(brute_force_realized_cap(stub_api)[0])
+
+
+def test_tracker_waits_for_buried_blocks_and_prices(stub_api, tmp_path):
+    tracker = tracker_for(stub_api, str(tmp_path / "utxo.db"), reorg_safety=2)
+    assert tracker.catch_up() == len(stub_api.blocks) - 2
+    
+    unpriced = tracker_for(stub_api, str(tmp_path / "unpriced.db"))
+    unpriced.price_lookup = lambda timestamp: None
+    assert unpriced.catch_up() == 0
+    assert unpriced.state is None
+
+
+def test_calculator_tracker_pauses_on_unknown_prices(stub_api, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    calculator = MVRVCalculator()
+    calculator.blockchain.mempool_base = f"{stub_api.base_url}/mempool"
+    calculator.prices.base_url = f"{stub_api.base_url}/nowhere"   # Every price lookup misses
+    tracker = calculator.utxo_tracker
+    tracker.start_height, tracker.reorg_safety = stub_api.blocks[0]['height'], 0
+    
+    assert tracker.catch_up() == 0
+    assert tracker.state is None and tracker.load_checkpoint() is None
+    assert calculator.calculate_realized_cap_from_utxo_set() is None
+    
+    calculator.prices.base_url = f"{stub_api.base_url}/prices"
+    assert tracker.catch_up() == len(stub_api.blocks)
+    assert tracker.load_checkpoint()['last_height'] == stub_api.blocks[-1]['height']
+
+
+def test_tracking_from_genesis_books_pre_market_blocks(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    with StubApiServer(blocks=4, first_height=0, first_time=PRICED_FROM - 1200) as stub:
+        calculator = MVRVCalculator()
+        calculator.blockchain.mempool_base = f"{stub.base_url}/mempool"
+        calculator.prices.base_url = f"{stub.base_url}/nowhere"
+        tracker = calculator.utxo_tracker
+        tracker.reorg_safety = 0
+        
+        # Without a genesis checkpoint the hourly calculation doesn't touch the chain
+        assert calculator.calculate_realized_cap_from_utxo_set() is None
+        assert stub.count(r'/block') == 0
+        
+        # Blocks 0 and 1 predate market prices; block 2 has a price that can't be fetched yet
+        tracker.start_height = 0
+        assert tracker.catch_up() == 2
+        assert tracker.tracks_full_history() and not tracker.caught_up
+        assert calculator.calculate_realized_cap_from_utxo_set() is None
+        
+        calculator.prices.base_url = f"{stub.base_url}/prices"
+        realized_cap = calculator.calculate_realized_cap_from_utxo_set()
+        
+        def price(timestamp):
+            return PRE_MARKET_PRICE if timestamp < PRICED_FROM else stub.daily_price(timestamp // DAY * DAY)
+        assert tracker.caught_up and tracker.state['last_height'] == 3
+        assert realized_cap == pytest.approx(brute_force_realized_cap(stub, price=price)[0])
+        assert realized_cap > 0
+
+
+def test_spend_within_same_block():
+    delta = BlockDelta.from_transactions(0, 'ab' * 32, 1_700_000_000, [
+        {'txid': 'a' * 64, 'vin': [{'is_coinbase': True}], 'vout': [{'value': 50 * SATOSHIS_PER_BTC}]},
+        {'txid': 'b' * 64, 'vin': [{'txid': 'a' * 64, 'vout': 0}],
+         'vout': [{'value': 49 * SATOSHIS_PER_BTC}, {'value': 0, 'scriptpubkey_type': 'op_return'}]},
+    ])
+    
+    assert delta.created == [('a' * 64, 0, 50 * SATOSHIS_PER_BTC), ('b' * 64, 0, 49 * SATOSHIS_PER_BTC)]
+    assert delta.spent == [('a' * 64, 0)]
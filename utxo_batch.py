@@ -0,0 +1,274 @@
+"""
+Columnar UTXO Store
+Fixed-width NumPy columns with interned txids, script types and addresses, so millions of
+UTXOs cost tens of bytes each instead of a seven-key dict apiece
+"""
+
+import numpy as np
+
+SATOSHIS_PER_BTC = 100_000_000
+
+# Dust below this is skipped when collecting from transactions (1000 sats)
+DEFAULT_DUST_SATS = 1000
+
+UNKNOWN_ADDRESS = -1
+
+COLUMN_DTYPES = {
+    'txid_id': np.uint32,         # Index into txids (one entry per transaction, not per output)
+    'output_position': np.uint32,
+    'btc_amount': np.float64,
+    'creation_time': np.float64,
+    'confidence': np.float64,
+    'script_id': np.uint8,        # Index into script_types
+    'address_id': np.int32,       # Index into addresses, UNKNOWN_ADDRESS if missing
+}
+
+
+class StringTable:
+    """Append-only interning table shared by a batch and its views"""
+    
+    def __init__(self):
+        self.values = []
+        self.ids = {}
+    
+    def intern(self, value):
+        existing = self.ids.get(value)
+        if existing is None:
+            existing = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return existing
+    
+    def __len__(self):
+        return len(self.values)
+
+
+class UtxoBatch:
+    """Growable columnar UTXO container; slices are zero-copy read-only views"""
+    
+    def __init__(self, capacity=1024):
+        self._columns = {name: np.empty(capacity, dtype) for name, dtype in COLUMN_DTYPES.items()}
+        self._size = 0
+        self._view = False
+        
+        self.txids = []                   # Consecutive outputs of one transaction share an entry
+        self.script_types = StringTable()
+        self.addresses = StringTable()
+    
+    @classmethod
+    def from_dicts(cls, utxos):
+        """Build a batch from BitcoinBrain-style (or BlockchainIntegration-style) UTXO dicts"""
+        batch = cls(capacity=max(len(utxos), 1))
+        batch.extend(utxos)
+        return batch
+    
+    def __len__(self):
+        return self._size
+    
+    def column(self, name):
+        """Zero-copy view of one column"""
+        return self._columns[name][:self._size]
+    
+    @property
+    def btc_amount(self):
+        return self.column('btc_amount')
+    
+    @property
+    def creation_time(self):
+        return self.column('creation_time')
+    
+    @property
+    def confidence(self):
+        return self.column('confidence')
+    
+    @property
+    def nbytes(self):
+        """Bytes held by the column arrays"""
+        return sum(array.nbytes for array in self._columns.values())
+    
+    def _reserve(self, extra):
+        """Make room for extra rows, doubling capacity when full"""
+        if self._view:
+            raise ValueError("UtxoBatch views are read-only; copy() before appending")
+        
+        needed = self._size + extra
+        capacity = len(self._columns['btc_amount'])
+        if needed <= capacity:
+            return
+        
+        capacity = max(needed, capacity * 2)
+        for name, old in self._columns.items():
+            grown = np.empty(capacity, old.dtype)
+            grown[:self._size] = old[:self._size]
+            self._columns[name] = grown
+    
+    def _txid_id(self, txid):
+        """Outputs arrive grouped by transaction, so only the last txid needs checking"""
+        if not self.txids or self.txids[-1] != txid:
+            self.txids.append(txid)
+        return len(self.txids) - 1
+    
+    def _address_id(self, address):
+        if not address or address == 'unknown':
+            return UNKNOWN_ADDRESS
+        return self.addresses.intern(address)
+    
+    def append(self, txid, output_position, btc_amount, creation_time, address=None,
+               script_type='mystery', confidence=1.0):
+        """Add one UTXO"""
+        self._reserve(1)
+        row = self._size
+        
+        columns = self._columns
+        columns['txid_id'][row] = self._txid_id(txid)
+        columns['output_position'][row] = output_position
+        columns['btc_amount'][row] = btc_amount
+        columns['creation_time'][row] = creation_time
+        columns['confidence'][row] = confidence
+        columns['script_id'][row] = self.script_types.intern(script_type)
+        columns['address_id'][row] = self._address_id(address)
+        
+        self._size += 1
+    
+    def append_transaction(self, tx_info, block_time, min_sats=DEFAULT_DUST_SATS, confidence=None):
+        """Add a transaction's outputs straight from an API payload; returns how many were kept"""
+        if not tx_info:
+            return 0
+        
+        kept = 0
+        for position, output in enumerate(tx_info.get('vout', [])):
+            if output['value'] < min_sats:
+                continue
+            
+            btc_amount = output['value'] / SATOSHIS_PER_BTC
+            self.append(
+                tx_info['txid'], position, btc_amount, block_time,
+                address=output.get('scriptpubkey_address'),
+                script_type=output.get('scriptpubkey_type', 'mystery'),
+                confidence=confidence(btc_amount, output) if confidence else 1.0
+            )
+            kept += 1
+        return kept
+    
+    def extend(self, utxos):
+        """Add another batch (column copy) or an iterable of UTXO dicts"""
+        if isinstance(utxos, UtxoBatch):
+            self._extend_batch(utxos)
+            return
+        
+        for utxo in utxos:
+            self.append(
+                utxo.get('tx_hash', utxo.get('txid')),
+                utxo.get('output_position', utxo.get('vout', 0)),
+                utxo.get('btc_amount', utxo.get('value_btc')),
+                utxo.get('creation_time', utxo.get('timestamp')),
+                address=utxo.get('recipient_address', utxo.get('address')),
+                script_type=utxo.get('script_pattern', utxo.get('script_type', 'mystery')),
+                confidence=utxo.get('my_confidence', 1.0)
+            )
+    
+    def _extend_batch(self, other):
+        """Append another batch's rows, remapping its interned ids into ours"""
+        count = len(other)
+        if not count:
+            return
+        self._reserve(count)
+        
+        def remap(table, values):
+            return np.array([table.intern(value) for value in values], dtype=np.int64)
+        
+        txid_ids = other.column('txid_id')
+        first, last = int(txid_ids.min()), int(txid_ids.max())
+        txid_map = np.array([self._txid_id(txid) for txid in other.txids[first:last + 1]], dtype=np.int64)
+        script_map = remap(self.script_types, other.script_types.values)
+        address_map = np.append(remap(self.addresses, other.addresses.values), UNKNOWN_ADDRESS)
+        
+        rows = slice(self._size, self._size + count)
+        self._columns['txid_id'][rows] = txid_map[txid_ids - first]
+        self._columns['script_id'][rows] = script_map[other.column('script_id')]
+        self._columns['address_id'][rows] = address_map[other.column('address_id')]  # -1 hits the appended UNKNOWN
+        for name in ('output_position', 'btc_amount', 'creation_time', 'confidence'):
+            self._columns[name][rows] = other.column(name)
+        
+        self._size += count
+    
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self._slice(key)
+        
+        row = range(self._size)[key]
+        address_id = int(self._columns['address_id'][row])
+        return {
+            'tx_hash': self.txids[self._columns['txid_id'][row]],
+            'output_position': int(self._columns['output_position'][row]),
+            'btc_amount': float(self._columns['btc_amount'][row]),
+            'creation_time': self._columns['creation_time'][row].item(),
+            'recipient_address': self.addresses.values[address_id] if address_id != UNKNOWN_ADDRESS else 'unknown',
+            'script_pattern': self.script_types.values[self._columns['script_id'][row]],
+            'my_confidence': float(self._columns['confidence'][row])
+        }
+    
+    def __iter__(self):
+        for row in range(self._size):
+            yield self[row]
+    
+    def _slice(self, key):
+        """Read-only view sharing our column buffers and string tables"""
+        view = UtxoBatch.__new__(UtxoBatch)
+        view._columns = {name: self.column(name)[key] for name in self._columns}
+        view._size = len(view._columns['btc_amount'])
+        view._view = True
+        view.txids = self.txids
+        view.script_types = self.script_types
+        view.addresses = self.addresses
+        return view
+    
+    def copy(self):
+        """Independent, appendable copy"""
+        batch = UtxoBatch(capacity=max(self._size, 1))
+        batch.extend(self)
+        return batch
+    
+    def to_dicts(self):
+        return list(self)
+    
+    def txid(self, row):
+        return self.txids[self._columns['txid_id'][:self._size][row]]
+    
+    def txid_list(self, rows=None):
+        """Transaction ids for some (or all) rows"""
+        txid_ids = self.column('txid_id') if rows is None else self.column('txid_id')[rows]
+        return [self.txids[i] for i in txid_ids.tolist()]
+    
+    def script_pattern_counts(self):
+        """UTXO count per script type present in the batch"""
+        counts = np.bincount(self.column('script_id'), minlength=len(self.script_types))
+        return {self.script_types.values[i]: int(n) for i, n in enumerate(counts) if n}
+    
+    def stats(self):
+        """Vectorized summary of the batch"""
+        if not self._size:
+            return {}
+        
+        btc = self.btc_amount
+        times = self.creation_time
+        addresses = self.column('address_id')
+        
+        return {
+            'count': self._size,
+            'total_btc': float(btc.sum()),
+            'average_btc': float(btc.mean()),
+            'min_btc': float(btc.min()),
+            'max_btc': float(btc.max()),
+            'oldest_time': times.min().item(),
+            'newest_time': times.max().item(),
+            'average_confidence': float(self.confidence.mean()),
+            'unique_addresses': int(np.unique(addresses[addresses != UNKNOWN_ADDRESS]).size),
+            'script_patterns': self.script_pattern_counts()
+        }
+
+
+def as_utxo_batch(utxos):
+    """Accept either a UtxoBatch or a list of UTXO dicts"""
+    if isinstance(utxos, UtxoBatch):
+        return utxos
+    return UtxoBatch.from_dicts(utxos)
@@ -0,0 +1,235 @@
+"""
+UTXO Snapshot Files
+Versioned binary snapshots of a UTXO table (fixed header + fixed-width columns), opened with
+numpy.memmap so realized value sums run over tens of millions of rows without Python objects
+"""
+
+import os
+import struct
+import time
+
+import numpy as np
+
+from db_connection import DEFAULT_CHUNK_SIZE
+from epoch_schema import EPOCH_SQL, utc_iso
+from price_index import to_epoch
+
+SNAPSHOT_MAGIC = b'UTXOSNAP'
+SNAPSHOT_VERSION = 1
+
+# magic, version, column count, rows, source max(id), created at, source table
+HEADER_FORMAT = '<8sHH4xQQd24s'
+COLUMN_FORMAT = '<16s8sQ'             # name, dtype, byte offset
+COLUMN_ALIGNMENT = 64
+
+SNAPSHOT_COLUMNS = [
+    ('txid', 'S64'),
+    ('btc_value', '<f8'),
+    ('created_time', '<f8'),          # Epoch seconds
+    ('usd_value', '<f8'),             # Value when created
+    ('confidence', '<f4'),
+]
+
+# Each source table's default database and how its rows map onto the snapshot columns
+SNAPSHOT_SOURCES = {
+    'utxo_data': {
+        'database': 'mvrv_bitcoin.db',
+        'select': "SELECT txid, value_btc, moved_timestamp, value_usd, 1.0 FROM utxo_data ORDER BY id",
+        'insert': f"""
+            INSERT OR REPLACE INTO utxo_data (txid, value_btc, moved_timestamp, value_usd, moved_timestamp_epoch)
+            VALUES (?1, ?2, ?3, ?4, {EPOCH_SQL.format(column='?3')})
+        """,
+    },
+    'my_utxo_discoveries': {
+        'database': 'my_bitcoin_analysis.db',
+        'select': """
+            SELECT transaction_id, btc_value, discovered_at, usd_value_when_created, confidence_score
+            FROM my_utxo_discoveries ORDER BY id
+        """,
+        'insert': f"""
+            INSERT OR REPLACE INTO my_utxo_discoveries
+            (transaction_id, btc_value, discovered_at, usd_value_when_created, confidence_score, my_quality_rating,
+             discovered_at_epoch)
+            VALUES (?1, ?2, ?3, ?4, ?5, ?6, {EPOCH_SQL.format(column='?3')})
+        """,
+    },
+}
+
+# Rows summed per step, bounding the temporaries a reduction allocates
+SUM_CHUNK_ROWS = 1_000_000
+
+
+def _align(offset):
+    return (offset + COLUMN_ALIGNMENT - 1) // COLUMN_ALIGNMENT * COLUMN_ALIGNMENT
+
+
+def _layout(rows):
+    """Byte offset of every column for a snapshot of `rows` rows"""
+    offset = _align(struct.calcsize(HEADER_FORMAT) + struct.calcsize(COLUMN_FORMAT) * len(SNAPSHOT_COLUMNS))
+    layout = []
+    for name, dtype in SNAPSHOT_COLUMNS:
+        layout.append((name, dtype, offset))
+        offset = _align(offset + np.dtype(dtype).itemsize * rows)
+    return layout, offset
+
+
+def default_snapshot_path(db_path, source):
+    """Snapshots sit next to their database: my_bitcoin_analysis.my_utxo_discoveries.utxosnap"""
+    return f"{os.path.splitext(db_path)[0]}.{source}.utxosnap"
+
+
+def table_fingerprint(connections, source):
+    """(row count, max id) of a source table, used to tell whether a snapshot is stale"""
+    count, max_id = connections.connection().execute(
+        f"SELECT COUNT(*), COALESCE(MAX(id), 0) FROM {source}"
+    ).fetchone()
+    return count, max_id
+
+
+def export_snapshot(connections, source, path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Stream a UTXO table into a snapshot file; returns the row count"""
+    spec = SNAPSHOT_SOURCES[source]
+    start = time.perf_counter()
+    
+    # One read transaction so the count, ids and rows all agree
+    with connections.transaction('DEFERRED') as cursor:
+        rows, max_id = table_fingerprint(connections, source)
+        layout, file_size = _layout(rows)
+        
+        with open(path + '.tmp', 'wb') as handle:
+            handle.write(struct.pack(HEADER_FORMAT, SNAPSHOT_MAGIC, SNAPSHOT_VERSION, len(layout), rows, max_id,
+                                     time.time(), source.encode()))
+            for name, dtype, offset in layout:
+                handle.write(struct.pack(COLUMN_FORMAT, name.encode(), dtype.encode(), offset))
+            handle.truncate(file_size)
+        
+        columns = {
+            name: np.memmap(path + '.tmp', dtype=dtype, mode='r+', offset=offset, shape=(rows,))
+            for name, dtype, offset in layout
+        } if rows else {}
+        
+        cursor.execute(spec['select'])
+        written = 0
+        while written < rows:
+            chunk = cursor.fetchmany(chunk_size)
+            if not chunk:
+                break
+            end = written + len(chunk)
+            txids, btc, created, usd, confidence = zip(*chunk)
+            
+            columns['txid'][written:end] = np.array(txids, dtype='S64')
+            columns['btc_value'][written:end] = btc
+            columns['created_time'][written:end] = [to_epoch(moment) for moment in created]
+            columns['usd_value'][written:end] = usd
+            columns['confidence'][written:end] = [1.0 if c is None else c for c in confidence]
+            written = end
+        
+        for column in columns.values():
+            column.flush()
+        del columns
+    
+    os.replace(path + '.tmp', path)
+    print(f"💾 Snapshot of {source}: {rows:,} UTXOs → {path} in {time.perf_counter() - start:.2f}s")
+    return rows
+
+
+class UtxoSnapshot:
+    """Read-only, memory-mapped view of a snapshot file"""
+    
+    def __init__(self, path):
+        self.path = path
+        
+        with open(path, 'rb') as handle:
+            header = handle.read(struct.calcsize(HEADER_FORMAT))
+            magic, version, column_count, rows, max_id, created_at, source = struct.unpack(HEADER_FORMAT, header)
+            
+            if magic != SNAPSHOT_MAGIC:
+                raise ValueError(f"{path} is not a UTXO snapshot")
+            if version != SNAPSHOT_VERSION:
+                raise ValueError(f"{path} is snapshot version {version}, expected {SNAPSHOT_VERSION}")
+            
+            directory = [
+                struct.unpack(COLUMN_FORMAT, handle.read(struct.calcsize(COLUMN_FORMAT)))
+                for _ in range(column_count)
+            ]
+        
+        self.rows = rows
+        self.source_max_id = max_id
+        self.created_at = created_at
+        self.source = source.rstrip(b'\0').decode()
+        self.columns = {}
+        for name, dtype, offset in directory:
+            name, dtype = name.rstrip(b'\0').decode(), dtype.rstrip(b'\0').decode()
+            self.columns[name] = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=(rows,)) if rows else np.empty(0, dtype)
+    
+    def __len__(self):
+        return self.rows
+    
+    def __getitem__(self, name):
+        return self.columns[name]
+    
+    def matches(self, fingerprint):
+        """True if the snapshot was taken from a table with this (count, max id)"""
+        return (self.rows, self.source_max_id) == tuple(fingerprint)
+    
+    def realized_value(self, weighted=False, min_confidence=None):
+        """Sum of creation-time USD values, optionally confidence-weighted and filtered"""
+        usd = self.columns['usd_value']
+        confidence = self.columns['confidence']
+        total = 0.0
+        
+        for start in range(0, self.rows, SUM_CHUNK_ROWS):
+            end = start + SUM_CHUNK_ROWS
+            values = usd[start:end]
+            if weighted or min_confidence is not None:
+                weights = confidence[start:end].astype(np.float64)
+                if min_confidence is not None:
+                    values = np.where(weights > min_confidence, values, 0.0)
+                if weighted:
+                    values = values * weights
+            total += float(np.sum(values))
+        
+        return total
+    
+    def iter_rows(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        """(txid, btc, ISO created time, usd, confidence) tuples, a chunk at a time"""
+        for start in range(0, self.rows, chunk_size):
+            end = start + chunk_size
+            yield from zip(
+                (txid.decode() for txid in self.columns['txid'][start:end]),
+                self.columns['btc_value'][start:end].tolist(),
+                (utc_iso(t) for t in self.columns['created_time'][start:end].tolist()),
+                self.columns['usd_value'][start:end].tolist(),
+                self.columns['confidence'][start:end].astype(np.float64).tolist()
+            )
+
+
+def import_snapshot(connections, path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Load a snapshot back into its source table; returns the row count"""
+    snapshot = UtxoSnapshot(path)
+    spec = SNAPSHOT_SOURCES[snapshot.source]
+    
+    if snapshot.source == 'my_utxo_discoveries':
+        rows = ((txid, btc, created, usd, confidence, min(int(confidence * 10), 10))
+                for txid, btc, created, usd, confidence in snapshot.iter_rows(chunk_size))
+    else:
+        rows = ((txid, btc, created, usd) for txid, btc, created, usd, _ in snapshot.iter_rows(chunk_size))
+    
+    imported, seconds = connections.bulk_write(spec['insert'], rows, chunk_size)
+    print(f"📥 Imported {imported:,} UTXOs into {snapshot.source} in {seconds:.2f}s")
+    return imported
+
+
+def open_fresh_snapshot(connections, db_path, source):
+    """The snapshot next to db_path if it still matches the table, else None"""
+    path = default_snapshot_path(db_path, source)
+    if not os.path.exists(path):
+        return None
+    
+    try:
+        snapshot = UtxoSnapshot(path)
+    except (ValueError, struct.error, OSError) as error:
+        print(f"⚠️ Ignoring unreadable snapshot {path}: {error}")
+        return None
+    
+    return snapshot if snapshot.matches(table_fingerprint(connections, source)) else None
@@ -0,0 +1,243 @@
+"""
+Incremental UTXO Set Tracker
+Walks blocks in height order, adding new outputs at their creation price and removing
+spent ones, so realized cap is maintained in O(outputs touched) per block instead of resampled
+"""
+
+import time
+
+from async_harvester import block_page_starts
+
+SATOSHIS_PER_BTC = 100_000_000
+
+# Blocks this close to the tip may still be reorganized away, so we wait for them to bury
+DEFAULT_REORG_SAFETY = 6
+
+# Outputs that can never be spent don't belong in the UTXO set
+UNSPENDABLE_SCRIPT_TYPES = {'op_return', 'provably_unspendable'}
+
+# CoinGecko's BTC prices start 2013-04-28. Outputs of earlier blocks have no market price to look up
+# and are booked at PRE_MARKET_PRICE: a cost basis of cents to ~$100 on a few million coins, well under
+# 0.1% of today's realized cap, and without it tracking from genesis could never get past block 0
+PRICED_FROM = 1367107200
+PRE_MARKET_PRICE = 0.0
+
+
+class BlockDelta:
+    """Outputs created and outpoints spent by one block"""
+    
+    def __init__(self, height, block_hash, timestamp):
+        self.height = height
+        self.block_hash = block_hash
+        self.timestamp = timestamp
+        self.created = []   # (txid, vout, value_sats)
+        self.spent = []     # (txid, vout)
+    
+    @classmethod
+    def from_transactions(cls, height, block_hash, timestamp, transactions):
+        delta = cls(height, block_hash, timestamp)
+        for tx in transactions:
+            for prevout in tx.get('vin', []):
+                if not prevout.get('is_coinbase') and 'txid' in prevout:
+                    delta.spent.append((prevout['txid'], prevout['vout']))
+            
+            for position, output in enumerate(tx.get('vout', [])):
+                if output.get('value', 0) <= 0 or output.get('scriptpubkey_type') in UNSPENDABLE_SCRIPT_TYPES:
+                    continue
+                delta.created.append((tx['txid'], position, output['value']))
+        return delta
+
+
+class UtxoSetTracker:
+    def __init__(self, connections, blockchain, price_lookup, start_height=None,
+                 reorg_safety=DEFAULT_REORG_SAFETY, priced_from=PRICED_FROM):
+        self.connections = connections
+        self.blockchain = blockchain            # BlockchainIntegration-style client
+        self.price_lookup = price_lookup        # timestamp -> USD price (or None)
+        self.start_height = start_height        # Only used when there is no checkpoint yet
+        self.reorg_safety = reorg_safety
+        self.priced_from = priced_from          # Blocks before this epoch are booked at PRE_MARKET_PRICE
+        self.caught_up = False                  # Whether the last catch_up reached the buried tip
+        
+        self.setup_tables()
+        self.state = self.load_checkpoint()
+    
+    def setup_tables(self):
+        """Create the UTXO set and checkpoint tables"""
+        with self.connections.transaction() as cursor:
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS utxo_set (
+                    txid TEXT NOT NULL,
+                    vout INTEGER NOT NULL,
+                    value_sats INTEGER NOT NULL,
+                    created_height INTEGER NOT NULL,
+                    created_time INTEGER NOT NULL,
+                    price_usd REAL NOT NULL,
+                    PRIMARY KEY (txid, vout)
+                ) WITHOUT ROWID
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS utxo_tracker_state (
+                    id INTEGER PRIMARY KEY CHECK (id = 1),
+                    start_height INTEGER NOT NULL,
+                    last_height INTEGER NOT NULL,
+                    last_hash TEXT,
+                    last_block_time INTEGER,
+                    realized_cap REAL NOT NULL,
+                    supply_sats INTEGER NOT NULL,
+                    utxo_count INTEGER NOT NULL,
+                    untracked_spends INTEGER NOT NULL,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+    
+    def load_checkpoint(self):
+        """Last committed tracker state, or None if tracking hasn't started"""
+        row = self.connections.connection().execute("""
+            SELECT start_height, last_height, last_hash, last_block_time, realized_cap,
+                   supply_sats, utxo_count, untracked_spends
+            FROM utxo_tracker_state WHERE id = 1
+        """).fetchone()
+        
+        if row is None:
+            return None
+        
+        keys = ('start_height', 'last_height', 'last_hash', 'last_block_time', 'realized_cap',
+                'supply_sats', 'utxo_count', 'untracked_spends')
+        return dict(zip(keys, row))
+    
+    def next_height(self):
+        """Height of the next block to apply"""
+        if self.state:
+            return self.state['last_height'] + 1
+        if self.start_height is not None:
+            return self.start_height
+        return None
+    
+    def tracks_full_history(self):
+        """True once the set was built from genesis, so realized cap needs no scaling (it may still be behind)"""
+        return bool(self.state) and self.state['start_height'] == 0 and self.state['untracked_spends'] == 0
+    
+    @property
+    def realized_cap(self):
+        return self.state['realized_cap'] if self.state else 0.0
+    
+    @property
+    def supply_btc(self):
+        return self.state['supply_sats'] / SATOSHIS_PER_BTC if self.state else 0.0
+    
+    def fetch_block_delta(self, height):
+        """Download one block's transactions and reduce them to a BlockDelta"""
+        block_hash = self.blockchain.get_block_hash(height)
+        block = self.blockchain.get_block(block_hash) if block_hash else None
+        if not block:
+            return None
+        
+        transactions = []
+        for start_index in block_page_starts(block):
+            page = self.blockchain.get_block_transactions_page(block_hash, start_index)
+            if not page:
+                return None  # A partial block would corrupt the set
+            transactions.extend(page)
+        
+        if len(transactions) != block.get('tx_count', len(transactions)):
+            return None
+        return BlockDelta.from_transactions(height, block_hash, block['timestamp'], transactions)
+    
+    def apply_block(self, delta):
+        """Apply one block's delta and checkpoint it atomically; returns False if it can't be priced"""
+        expected = self.next_height()
+        if expected is not None and delta.height != expected:
+            raise ValueError(f"Expected block {expected}, got {delta.height}")
+        
+        if not delta.created:
+            price = 0.0
+        elif delta.timestamp < self.priced_from:
+            price = PRE_MARKET_PRICE
+        else:
+            price = self.price_lookup(delta.timestamp)
+            if not price:
+                print(f"⏸️ No price for block {delta.height} yet, pausing the UTXO tracker")
+                return False
+        
+        state = dict(self.state) if self.state else {
+            'start_height': delta.height, 'realized_cap': 0.0, 'supply_sats': 0,
+            'utxo_count': 0, 'untracked_spends': 0
+        }
+        
+        with self.connections.transaction() as cursor:
+            # Outputs first, so spends of outputs created earlier in the same block resolve
+            cursor.executemany("""
+                INSERT OR REPLACE INTO utxo_set (txid, vout, value_sats, created_height, created_time, price_usd)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [(txid, vout, value, delta.height, delta.timestamp, price) for txid, vout, value in delta.created])
+            
+            cursor.execute("CREATE TEMP TABLE IF NOT EXISTS spent_outpoints (txid TEXT, vout INTEGER)")
+            cursor.execute("DELETE FROM spent_outpoints")
+            cursor.executemany("INSERT INTO spent_outpoints VALUES (?, ?)", delta.spent)
+            
+            spent_count, spent_sats, spent_cost = cursor.execute("""
+                SELECT COUNT(*), COALESCE(SUM(u.value_sats), 0),
+                       COALESCE(SUM(u.value_sats * u.price_usd), 0.0)
+                FROM spent_outpoints s JOIN utxo_set u ON u.txid = s.txid AND u.vout = s.vout
+            """).fetchone()
+            cursor.execute("""
+                DELETE FROM utxo_set WHERE (txid, vout) IN (SELECT txid, vout FROM spent_outpoints)
+            """)
+            
+            created_sats = sum(value for _, _, value in delta.created)
+            state['realized_cap'] += (created_sats * price - spent_cost) / SATOSHIS_PER_BTC
+            state['supply_sats'] += created_sats - spent_sats
+            state['utxo_count'] += len(delta.created) - spent_count
+            state['untracked_spends'] += len(delta.spent) - spent_count
+            state.update(last_height=delta.height, last_hash=delta.block_hash, last_block_time=delta.timestamp)
+            
+            cursor.execute("""
+                INSERT OR REPLACE INTO utxo_tracker_state
+                (id, start_height, last_height, last_hash, last_block_time, realized_cap,
+                 supply_sats, utxo_count, untracked_spends, updated_at)
+                VALUES (1, ?, ?, ?, ?, ?, ?, ?, ?, datetime('now'))
+            """, (state['start_height'], state['last_height'], state['last_hash'], state['last_block_time'],
+                  state['realized_cap'], state['supply_sats'], state['utxo_count'], state['untracked_spends']))
+        
+        self.state = state
+        return True
+    
+    def catch_up(self, max_blocks=None):
+        """Apply every buried block since the last checkpoint; returns how many were applied"""
+        tip = self.blockchain.get_tip_height()
+        if tip is None:
+            print("😓 Couldn't reach the chain tip, UTXO tracker stays where it was")
+            return 0
+        
+        height = self.next_height()
+        if height is None:
+            height = tip - self.reorg_safety  # Nothing configured: start tracking from now on
+        
+        last_safe = tip - self.reorg_safety
+        applied = 0
+        started = time.time()
+        
+        while height <= last_safe and (max_blocks is None or applied < max_blocks):
+            delta = self.fetch_block_delta(height)
+            if delta is None:
+                print(f"😓 Block {height} is unavailable, UTXO tracker will resume there")
+                break
+            if not self.apply_block(delta):
+                break
+            applied += 1
+            height += 1
+        
+        self.caught_up = height > last_safe
+        
+        if applied:
+            print(f"⛓️ UTXO tracker applied {applied} blocks in {time.time() - started:.1f}s → "
+                  f"height {self.state['last_height']}, realized cap ${self.realized_cap/1e9:.2f}B "
+                  f"across {self.state['utxo_count']:,} UTXOs")
+        return applied
+    
+    def recompute_realized_cap(self):
+        """Full-table realized cap, for checking the running total"""
+        return self.connections.connection().execute(
+            "SELECT COALESCE(SUM(value_sats * price_usd), 0.0) FROM utxo_set"
+        ).fetchone()[0] / SATOSHIS_PER_BTC